@@ -250,7 +250,8 @@ def _iter_backup_files() -> Iterable[Path]:
     projects_dir = artifacts / "projects"
     if projects_dir.exists():
         for path in projects_dir.rglob("*"):
-            if path.is_file():
+            # Ingest artifacts (<upload>.ingest/) are rebuilt from the upload.
+            if path.is_file() and not path.parent.name.endswith(".ingest"):
                 yield path
 
 
@@ -3,13 +3,16 @@ from __future__ import annotations
 import gzip
 import hashlib
 import json
+import mmap
 import os
 import pickle
 import tempfile
+import threading
 import time
+from collections import OrderedDict
 from datetime import date
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 import pandas as pd
 
@@ -19,8 +22,15 @@ import pandas as pd
 # - DataFrame -> Parquet (fast)
 # - Complex Python objects (datetime/numpy/pandas scalars) -> Pickle
 #   - optionally gzip compress large pickles (level 1) for space
+# - Large numpy-backed objects (weekly progress matrix) -> Pickle protocol 5
+#   with the array buffers in a raw sidecar, memory-mapped on load
 # - Metadata -> JSON.gz (small)
 #
+# Keys: entries are keyed by the file's content (SHA-256), not its path or
+# mtime, so re-uploading identical bytes, or the same export in two projects,
+# hits the same entries. The hash is memoized per (path, size, mtime) in the
+# process; uploads seed it (remember_content_hash) as they hash while writing.
+#
 # Atomicity / partial writes:
 # - We write files, then create a COMMIT marker last.
 # - Load requires COMMIT + required files, so partial dirs are ignored.
@@ -34,7 +44,7 @@ import pandas as pd
 #   CHRONOPLAN_CACHE_PICKLE_GZIP_MIN_MB      compress pickle blobs >= N MB (default 5)
 # ============================================================
 
-CACHE_VERSION = 5
+CACHE_VERSION = 7
 
 _DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "chronoplan_cache"
 _CACHE_DIR = Path(os.getenv("CHRONOPLAN_CACHE_DIR") or _DEFAULT_CACHE_DIR)
@@ -85,10 +95,6 @@ def _now_ts() -> float:
     return time.time()
 
 
-def _safe_stem(text: str) -> str:
-    return "".join(ch if ch.isalnum() or ch in ("-", "_", ".") else "_" for ch in text).strip("._")[:80]
-
-
 def _mapping_json(mapping: dict | None) -> str:
     if not mapping:
         return ""
@@ -100,19 +106,63 @@ def mapping_digest(mapping: dict | None) -> str:
     return hashlib.sha1(raw).hexdigest()[:12]
 
 
-def file_fingerprint(path: str) -> str:
+_HASH_CHUNK = 1 << 20
+_HASH_MEMO_SIZE = 1024
+_HASH_LOCK = threading.Lock()
+_CONTENT_HASHES: "OrderedDict[tuple[str, int, int], str]" = OrderedDict()
+
+
+def _stat_key(path: str) -> tuple[str, int, int]:
     st = os.stat(path)
     mtime_ns = getattr(st, "st_mtime_ns", int(st.st_mtime * 1_000_000_000))
-    return f"{st.st_size}_{mtime_ns}"
+    return (os.path.abspath(path), st.st_size, mtime_ns)
+
+
+def _remember(key: tuple[str, int, int], digest: str) -> None:
+    with _HASH_LOCK:
+        _CONTENT_HASHES[key] = digest
+        _CONTENT_HASHES.move_to_end(key)
+        while len(_CONTENT_HASHES) > _HASH_MEMO_SIZE:
+            _CONTENT_HASHES.popitem(last=False)
+
+
+def remember_content_hash(path: str | Path, digest: str) -> None:
+    """Record the SHA-256 of a file just written (hashed while streaming it)."""
+    _remember(_stat_key(str(path)), digest)
+
+
+def content_hash(path: str | Path) -> str:
+    """SHA-256 (hex) of the file's bytes, read in chunks once per file version."""
+    key = _stat_key(str(path))
+    with _HASH_LOCK:
+        digest = _CONTENT_HASHES.get(key)
+    if digest is not None:
+        return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _remember(key, digest)
+    return digest
+
+
+def file_fingerprint(path: str) -> str:
+    return content_hash(path)
 
 
 def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    _atomic_write_chunks(path, [data])
+
+
+def _atomic_write_chunks(path: Path, chunks: Iterable[bytes | memoryview]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
     tmp_path = Path(tmp_name)
     try:
         with os.fdopen(fd, "wb") as f:
-            f.write(data)
+            for chunk in chunks:
+                f.write(chunk)
             f.flush()
             os.fsync(f.fileno())
         os.replace(tmp_path, path)
@@ -168,6 +218,40 @@ def _read_pickle_auto(path_base: Path) -> Any:
     return _pickle_loads(raw.read_bytes())
 
 
+_BUFFER_ALIGN = 64
+
+
+def _write_pickle_buffers(path_base: Path, obj: Any) -> None:
+    """Pickle ``obj`` (protocol 5) to <base>.pkl with its contiguous buffers in <base>.bin."""
+    buffers: list[pickle.PickleBuffer] = []
+    head = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raws = [b.raw() for b in buffers]
+    spans: list[tuple[int, int]] = []
+    chunks: list[bytes | memoryview] = []
+    offset = 0
+    for raw in raws:
+        pad = -offset % _BUFFER_ALIGN
+        if pad:
+            chunks.append(b"\0" * pad)
+            offset += pad
+        spans.append((offset, raw.nbytes))
+        chunks.append(raw)
+        offset += raw.nbytes
+    _atomic_write_chunks(path_base.with_suffix(".bin"), chunks)
+    _atomic_write_bytes(path_base.with_suffix(".pkl"), _pickle_dumps({"head": head, "spans": spans}))
+
+
+def _read_pickle_buffers(path_base: Path) -> Any:
+    """Inverse of _write_pickle_buffers; the buffers stay memory-mapped (read-only)."""
+    index = _pickle_loads(path_base.with_suffix(".pkl").read_bytes())
+    spans = index["spans"]
+    if not spans:
+        return pickle.loads(index["head"])
+    with open(path_base.with_suffix(".bin"), "rb") as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return pickle.loads(index["head"], buffers=[view[start : start + size] for start, size in spans])
+
+
 def _commit_path(cache_dir: Path) -> Path:
     return cache_dir / _COMMIT_FILE
 
@@ -182,29 +266,31 @@ def _commit(cache_dir: Path) -> None:
 
 def _dir_for_dashboard(path: str) -> Path:
     fp = file_fingerprint(path)
-    stem = _safe_stem(Path(path).name)
-    return _ensure_cache_dir() / f"{stem}.{fp}.v{CACHE_VERSION}.dashboard"
+    return _ensure_cache_dir() / f"{fp}.v{CACHE_VERSION}.dashboard"
 
 
 def _dir_for_headers(path: str, mapping: dict | None) -> Path:
     fp = file_fingerprint(path)
-    stem = _safe_stem(Path(path).name)
     md = mapping_digest(mapping)
-    return _ensure_cache_dir() / f"{stem}.{fp}.v{CACHE_VERSION}.headers.{md}"
+    return _ensure_cache_dir() / f"{fp}.v{CACHE_VERSION}.headers.{md}"
 
 
 def _dir_for_schedprev(path: str, mapping: dict | None, today: date) -> Path:
     fp = file_fingerprint(path)
-    stem = _safe_stem(Path(path).name)
     md = mapping_digest(mapping)
-    return _ensure_cache_dir() / f"{stem}.{fp}.v{CACHE_VERSION}.schedprev.{md}.{today.isoformat()}"
+    return _ensure_cache_dir() / f"{fp}.v{CACHE_VERSION}.schedprev.{md}.{today.isoformat()}"
 
 
 def _dir_for_wbs(path: str, mapping: dict | None, today: date) -> Path:
     fp = file_fingerprint(path)
-    stem = _safe_stem(Path(path).name)
     md = mapping_digest(mapping)
-    return _ensure_cache_dir() / f"{stem}.{fp}.v{CACHE_VERSION}.wbs.{md}.{today.isoformat()}"
+    return _ensure_cache_dir() / f"{fp}.v{CACHE_VERSION}.wbs.{md}.{today.isoformat()}"
+
+
+def _dir_for_weekly(path: str, mapping: dict | None, today: date) -> Path:
+    fp = file_fingerprint(path)
+    md = mapping_digest(mapping)
+    return _ensure_cache_dir() / f"{fp}.v{CACHE_VERSION}.weekly.{md}.{today.isoformat()}"
 
 
 def _meta_path(cache_dir: Path) -> Path:
@@ -404,7 +490,6 @@ def load_dashboard_cache(path: str) -> Optional[dict[str, Any]]:
             not isinstance(meta, dict)
             or meta.get("cache_version") != CACHE_VERSION
             or meta.get("kind") != "dashboard"
-            or meta.get("path") != path
             or meta.get("fingerprint") != fp
         ):
             return None
@@ -504,7 +589,6 @@ def load_headers_cache(path: str, mapping: dict | None) -> Optional[dict[str, An
             not isinstance(meta, dict)
             or meta.get("cache_version") != CACHE_VERSION
             or meta.get("kind") != "headers"
-            or meta.get("path") != path
             or meta.get("fingerprint") != fp
             or meta.get("mapping_digest") != mapping_digest(mapping)
         ):
@@ -578,7 +662,6 @@ def load_schedule_preview_cache(path: str, mapping: dict | None, today: date) ->
             not isinstance(meta, dict)
             or meta.get("cache_version") != CACHE_VERSION
             or meta.get("kind") != "schedprev"
-            or meta.get("path") != path
             or meta.get("fingerprint") != fp
             or meta.get("mapping_digest") != mapping_digest(mapping)
             or meta.get("today") != today.isoformat()
@@ -610,6 +693,7 @@ def save_wbs_cache(
     schedule_info: dict,
     preview_rows: list,
     detected_tables: list,
+    table_mismatch: dict | None = None,
 ) -> None:
     if not _is_cache_enabled():
         return
@@ -632,7 +716,10 @@ def save_wbs_cache(
     }
     _atomic_write_bytes(_meta_path(cache_dir), _gzip_json_dumps(meta))
 
-    _write_pickle_maybe_compress(cache_dir / "wbs", {"packs": packs, "detected_tables": detected_tables})
+    _write_pickle_maybe_compress(
+        cache_dir / "wbs",
+        {"packs": packs, "detected_tables": detected_tables, "table_mismatch": table_mismatch},
+    )
     _write_pickle_maybe_compress(cache_dir / "preview", preview_rows)
     _write_pickle_maybe_compress(cache_dir / "schedule", {"schedule_lookup": schedule_lookup, "schedule_info": schedule_info})
 
@@ -662,7 +749,6 @@ def load_wbs_cache(path: str, mapping: dict | None, today: date) -> Optional[dic
             not isinstance(meta, dict)
             or meta.get("cache_version") != CACHE_VERSION
             or meta.get("kind") != "wbs"
-            or meta.get("path") != path
             or meta.get("fingerprint") != fp
             or meta.get("mapping_digest") != mapping_digest(mapping)
             or meta.get("today") != today.isoformat()
@@ -679,6 +765,7 @@ def load_wbs_cache(path: str, mapping: dict | None, today: date) -> Optional[dic
             **meta,
             "packs": wbs.get("packs"),
             "detected_tables": wbs.get("detected_tables"),
+            "table_mismatch": wbs.get("table_mismatch"),
             "preview_rows": preview_rows,
             "schedule_lookup": schedule.get("schedule_lookup"),
             "schedule_info": schedule.get("schedule_info"),
@@ -687,6 +774,69 @@ def load_wbs_cache(path: str, mapping: dict | None, today: date) -> Optional[dic
         return None
 
 
+def save_weekly_cache(path: str, mapping: dict | None, today: date, *, matrix: Any) -> None:
+    if not _is_cache_enabled():
+        return
+    try:
+        fp = file_fingerprint(path)
+    except Exception:
+        return
+
+    cache_dir = _dir_for_weekly(path, mapping, today)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    meta = {
+        "cache_version": CACHE_VERSION,
+        "kind": "weekly",
+        "created_at_ts": _now_ts(),
+        "path": path,
+        "fingerprint": fp,
+        "mapping_digest": mapping_digest(mapping),
+        "today": today.isoformat(),
+    }
+    _atomic_write_bytes(_meta_path(cache_dir), _gzip_json_dumps(meta))
+
+    # Uncompressed on purpose: the matrix is memory-mapped on load, so a hit
+    # costs the unpickle of its small parts and the activity rows read later.
+    _write_pickle_buffers(cache_dir / "matrix", matrix)
+
+    _commit(cache_dir)
+    _maybe_periodic_cleanup()
+
+
+def load_weekly_cache(path: str, mapping: dict | None, today: date) -> Optional[dict[str, Any]]:
+    if not _is_cache_enabled():
+        return None
+    try:
+        fp = file_fingerprint(path)
+    except Exception:
+        return None
+
+    cache_dir = _dir_for_weekly(path, mapping, today)
+    if not cache_dir.exists() or not _is_committed(cache_dir):
+        return None
+
+    meta_path = _meta_path(cache_dir)
+    if not meta_path.exists():
+        return None
+
+    try:
+        meta = _gzip_json_loads(meta_path.read_bytes())
+        if (
+            not isinstance(meta, dict)
+            or meta.get("cache_version") != CACHE_VERSION
+            or meta.get("kind") != "weekly"
+            or meta.get("fingerprint") != fp
+            or meta.get("mapping_digest") != mapping_digest(mapping)
+            or meta.get("today") != today.isoformat()
+        ):
+            return None
+
+        return {**meta, "matrix": _read_pickle_buffers(cache_dir / "matrix")}
+    except Exception:
+        return None
+
+
 def clear_cache_dir() -> None:
     _rm_tree(_ensure_cache_dir())
     _ensure_cache_dir()
@@ -706,3 +856,7 @@ def schedule_preview_cache_path(path: str, mapping: dict | None, today: date) ->
 
 def wbs_cache_path(path: str, mapping: dict | None, today: date) -> Path:
     return _meta_path(_dir_for_wbs(path, mapping, today))
+
+
+def weekly_cache_path(path: str, mapping: dict | None, today: date) -> Path:
+    return _meta_path(_dir_for_weekly(path, mapping, today))
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from time import time
+from typing import Any, Callable
+
+import excel_cache
+import wbs_app.extract_wbs_json_calamine as extractor
+
+# ============================================================
+# Background extraction jobs
+#
+# A new upload (projects.store_project_upload) or a page rerun submits the file;
+# a small pool runs the extraction pipeline off the Streamlit script thread and
+# the page polls job_status() from an st.fragment until the job is done.
+#
+# - Single-flight: one job per file content (SHA-256), column mapping and
+#   reporting day, whichever session, page or project asks first; later
+#   submits get the same job id, also for a copy of the file at another path.
+#   A failed job stays the answer for its key (page reruns show its error)
+#   until a submit asks to retry: a new upload or mapping (retry=True).
+# - Threads, not processes: the parsed workbook and everything derived from it
+#   land in the extractor's process-wide WorkbookSession registry, shared by
+#   every page and session, and the job keeps the pipeline results. The xlsx
+#   parse itself already fans out to processes (WBS_EXTRACT_WORKERS).
+# - Disk cache: results (schedule, preview, WBS, Activity ID check) and the
+#   weekly progress matrix go to excel_cache, keyed by content hash,
+#   mapping digest and day, so a restarted server or another replica answers
+#   from disk without opening the workbook.
+#
+# Optional env vars:
+#   WBS_JOB_WORKERS   jobs running at once (default 2)
+#   WBS_JOB_KEEP      finished jobs kept for polling and reuse (default 16)
+# ============================================================
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+STAGES = ("parse", "schedule", "wbs", "preview", "compare", "weekly")
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = (os.getenv(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+_WORKERS = max(_env_int("WBS_JOB_WORKERS", 2), 1)
+_KEEP = max(_env_int("WBS_JOB_KEEP", 16), 1)
+
+
+class ExtractionJob:
+    """One run of the pipeline for a file version, mapping and day."""
+
+    def __init__(
+        self,
+        key: tuple,
+        path: str,
+        column_mapping: dict | None,
+        today: date,
+        ingest: bool,
+        previous_path: str | None = None,
+    ):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.path = path
+        self.previous_path = previous_path
+        self.column_mapping = column_mapping
+        self.today = today
+        self.ingest = ingest
+        self.status = QUEUED
+        self.stage: str | None = None
+        self.stages_done = 0
+        self.submitted = time()
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.error: str | None = None
+        self.result: dict[str, Any] | None = None
+        self.trace: dict | None = None
+        self._done = threading.Event()
+        self._callbacks: list[Callable[["ExtractionJob"], None]] | None = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def pending(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn: Callable[["ExtractionJob"], None]) -> None:
+        """Call ``fn(job)`` once the job has finished, on its worker thread (now, if it already has).
+
+        Callbacks run before wait() returns.
+        """
+        with self._callbacks_lock:
+            if self._callbacks is not None:
+                self._callbacks.append(fn)
+                return
+        self._call(fn)
+
+    def _call(self, fn: Callable[["ExtractionJob"], None]) -> None:
+        try:
+            fn(self)
+        except Exception as exc:
+            logging.warning(f"EXTRACTION job {self.id} callback failed: {exc}")
+
+    def status_dict(self) -> dict[str, Any]:
+        end = self.finished or time()
+        return {
+            "id": self.id,
+            "path": self.path,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.stages_done / len(STAGES),
+            "elapsed_s": round(end - (self.started or self.submitted), 2),
+            "error": self.error,
+        }
+
+    def _enter(self, stage: str) -> None:
+        if self.stage is not None:
+            self.stages_done += 1
+        self.stage = stage
+
+    def run(self) -> None:
+        self.status = RUNNING
+        self.started = time()
+        extractor.TRACER.start_request("extract_job", file=os.path.basename(self.path))
+        try:
+            self._enter("parse")
+            self.result = self._load_cached() or self._extract()
+            self.stages_done = len(STAGES)
+            self.status = DONE
+        except Exception as exc:  # reported to the page through job_status()
+            self.error = f"{type(exc).__name__}: {exc}"
+            self.status = FAILED
+        finally:
+            self.trace = extractor.TRACER.end_request()
+            self.finished = time()
+            with self._callbacks_lock:
+                callbacks, self._callbacks = self._callbacks or [], None
+            for fn in callbacks:
+                self._call(fn)
+            self._done.set()
+
+    def _load_cached(self) -> dict[str, Any] | None:
+        with extractor.trace_span("disk_cache") as span:
+            cached = excel_cache.load_wbs_cache(self.path, self.column_mapping, self.today)
+            weekly = excel_cache.load_weekly_cache(self.path, self.column_mapping, self.today) if cached else None
+            span.set(hit=weekly is not None)
+        if weekly is None:
+            return None
+        if self.ingest and not extractor.ingest_is_current(self.path):
+            extractor.ingest_workbook(self.path)
+        return {
+            "schedule_lookup": cached["schedule_lookup"],
+            "schedule_info": cached["schedule_info"],
+            "packs": cached["packs"],
+            "preview_rows": cached["preview_rows"],
+            "table_mismatch": cached["table_mismatch"],
+            "detected_tables": cached["detected_tables"],
+            "weekly_matrix": weekly["matrix"],
+        }
+
+    def _extract(self) -> dict[str, Any]:
+        mapping = self.column_mapping
+        session = extractor.open_workbook_session(self.path, previous_path=self.previous_path)
+        if self.ingest:
+            extractor.ingest_workbook(self.path, session=session)
+        else:
+            session.catalog()
+        self._enter("schedule")
+        lookup, info = extractor.build_schedule_lookup(None, today=self.today, column_mapping=mapping, session=session)
+        self._enter("wbs")
+        packs = extractor.extract_all_wbs(
+            None, schedule_lookup=lookup, schedule_info=info, column_mapping=mapping, session=session
+        )
+        self._enter("preview")
+        preview_rows = extractor.build_preview_rows(
+            None,
+            table_type="activity_summary",
+            prefer_first_table=True,
+            column_mapping=mapping,
+            session=session,
+        )
+        self._enter("compare")
+        mismatch = extractor.compare_activity_ids(None, column_mapping=mapping, session=session)
+        detected = extractor.detect_expected_tables(None, session=session) if not packs else []
+        self._enter("weekly")
+        matrix = extractor.build_weekly_progress_matrix(None, today=self.today, column_mapping=mapping, session=session)
+        try:
+            with extractor.trace_span("disk_cache_save"):
+                excel_cache.save_wbs_cache(
+                    self.path,
+                    mapping,
+                    self.today,
+                    packs=packs,
+                    schedule_lookup=lookup,
+                    schedule_info=info,
+                    preview_rows=preview_rows,
+                    detected_tables=detected,
+                    table_mismatch=mismatch,
+                )
+                excel_cache.save_weekly_cache(self.path, mapping, self.today, matrix=matrix)
+        except Exception as exc:  # the results stand without the disk copy
+            logging.warning(f"EXTRACTION cache write failed for {self.path}: {exc}")
+        return {
+            "schedule_lookup": lookup,
+            "schedule_info": info,
+            "packs": packs,
+            "preview_rows": preview_rows,
+            "table_mismatch": mismatch,
+            "detected_tables": detected,
+            "weekly_matrix": matrix,
+        }
+
+
+_LOCK = threading.Lock()
+_JOBS: "OrderedDict[str, ExtractionJob]" = OrderedDict()
+_BY_KEY: dict[tuple, str] = {}
+_POOL: ThreadPoolExecutor | None = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="wbs-extract")
+    return _POOL
+
+
+def _prune() -> None:
+    finished = [job_id for job_id, job in _JOBS.items() if not job.pending]
+    for job_id in finished[: max(len(finished) - _KEEP, 0)]:
+        job = _JOBS.pop(job_id)
+        if _BY_KEY.get(job.key) == job_id:
+            _BY_KEY.pop(job.key, None)
+
+
+def submit_extraction(
+    path: str,
+    column_mapping: dict | None = None,
+    today: date | None = None,
+    ingest: bool = False,
+    previous_path: str | None = None,
+    retry: bool = False,
+) -> ExtractionJob:
+    """The job for this file content, mapping and day: the live or finished one, else a new one.
+
+    ``ingest`` also writes the columnar artifact (upload time). ``previous_path``
+    is the upload this file replaces, so a new job re-extracts incrementally
+    from it (see open_workbook_session). A job without ``ingest`` is not
+    reused when ``ingest`` is asked for. A failed job is returned again (page
+    reruns) unless ``retry`` asks for a new run.
+    """
+    path = os.path.abspath(str(path))
+    today = today or date.today()
+    key = (excel_cache.file_fingerprint(path), extractor._mapping_key(column_mapping), today.isoformat())
+    with _LOCK:
+        job = _JOBS.get(_BY_KEY.get(key, ""))
+        if job is not None and (job.ingest or not ingest) and not (retry and job.status == FAILED):
+            _JOBS.move_to_end(job.id)
+            return job
+        job = ExtractionJob(key, path, copy.deepcopy(column_mapping), today, ingest, previous_path)
+        _JOBS[job.id] = job
+        _BY_KEY[key] = job.id
+        _prune()
+    _pool().submit(job.run)
+    return job
+
+
+def get_job(job_id: str | None) -> ExtractionJob | None:
+    with _LOCK:
+        return _JOBS.get(job_id or "")
+
+
+def job_status(job_id: str | None) -> dict[str, Any] | None:
+    """Status for polling: status, current stage, progress (0..1), elapsed seconds, error."""
+    job = get_job(job_id)
+    return job.status_dict() if job is not None else None
+
+
+def clear_jobs() -> None:
+    """Forget finished jobs (running ones complete in the background)."""
+    with _LOCK:
+        for job_id in [job_id for job_id, job in _JOBS.items() if not job.pending]:
+            job = _JOBS.pop(job_id)
+            if _BY_KEY.get(job.key) == job_id:
+                _BY_KEY.pop(job.key, None)
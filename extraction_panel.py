@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import streamlit as st
+
+from extraction_jobs import QUEUED, RUNNING, job_status
+
+_STAGE_LABELS = {
+    "parse": "Reading workbook",
+    "schedule": "Computing schedule",
+    "wbs": "Building WBS",
+    "preview": "Loading activities",
+    "compare": "Checking Activity IDs",
+    "weekly": "Building weekly progress",
+}
+
+
+def render_extraction_progress(
+    job_id: str,
+    *,
+    poll_seconds: float = 1.0,
+) -> None:
+    """Progress of a background extraction job, polled without rerunning the page.
+
+    The whole page reruns once the job has finished (or is gone), so the caller
+    can render its results; until then it should stop after this call.
+    """
+
+    @st.fragment(run_every=poll_seconds)
+    def _poll() -> None:
+        status = job_status(job_id)
+        if status is None or status["status"] not in (QUEUED, RUNNING):
+            st.rerun()
+        if status["status"] == QUEUED:
+            text = "Waiting for a free extraction worker..."
+        else:
+            stage = _STAGE_LABELS.get(status["stage"] or "", status["stage"] or "Starting")
+            text = f"{stage}... ({status['elapsed_s']:.0f}s)"
+        st.progress(min(max(float(status["progress"]), 0.0), 1.0), text=text)
+
+    _poll()
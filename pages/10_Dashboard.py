@@ -1,15 +1,10 @@
 from datetime import datetime, date
-from time import perf_counter
 import time
-import os
 from pathlib import Path
 from typing import Any
 import html
 
 from wbs_app.extract_wbs_json_calamine import (
-    build_schedule_lookup,
-    build_preview_rows,
-    build_weekly_progress,
     parse_percent_float,
     as_text,
     get_table_headers,
@@ -18,6 +13,8 @@ from wbs_app.extract_wbs_json_calamine import (
     SUMMARY_OPTIONAL_FIELDS,
     ASSIGN_REQUIRED_FIELDS,
     ASSIGN_OPTIONAL_FIELDS,
+    TRACER,
+    trace_span,
 )
 
 import plotly.graph_objects as go
@@ -38,9 +35,14 @@ from access_guard import check_access_or_redirect
 from billing_store import access_status, get_account_by_email
 from charts import s_curve
 from data import demo_series, load_from_excel, sample_dashboard_data
+from excel_cache import file_fingerprint, load_dashboard_cache, save_dashboard_cache
 from services_kpis import compute_kpis, extract_dates_labels
 from ui import inject_theme
 from activity_filters import build_activity_filter_sidebar
+from perf_panel import render_perf_panel
+from extraction_jobs import FAILED, submit_extraction
+from extraction_panel import render_extraction_progress
+from snapshot_history import activity_history
 from shared_excel import (
     set_default_excel_if_missing,
 )
@@ -55,8 +57,6 @@ from projects import (
     store_project_upload,
 )
 
-WEEKLY_PROGRESS_CACHE_VERSION = 2
-
 
 page_override = st.session_state.get("_page_override")
 page_source = st.session_state.get("_page_source")
@@ -264,77 +264,32 @@ def _excel_template_bytes():
             return path.read_bytes(), path.name
     return None, None
 
-def _time_call(func, *args, **kwargs):
-    start = perf_counter()
-    result = func(*args, **kwargs)
-    return result, (perf_counter() - start) * 1000.0
-
-def _render_perf_stats(stats: dict[str, float]) -> None:
-    if not stats:
-        st.sidebar.caption("No timings captured yet.")
-        return
-    st.sidebar.markdown("**Perf timings (ms)**")
-    for label, value in stats.items():
-        st.sidebar.markdown(f"- {label}: {value:.1f}")
-
-def _file_cache_key(path: str | None) -> tuple[float, int] | None:
+def _file_cache_key(path: str | None) -> str | None:
+    # Content hash: identical bytes (a re-upload, another project's copy) share cache entries.
     if not path:
         return None
     try:
-        stat = os.stat(path)
+        return file_fingerprint(path)
     except OSError:
         return None
-    return (stat.st_mtime, stat.st_size)
-
-@st.cache_data(show_spinner=False)
-def _cached_load_from_excel(path: str, file_key: tuple[float, int] | None):
-    _ = file_key
-    return load_from_excel(path)
-
-@st.cache_data(show_spinner=False)
-def _cached_schedule_lookup(
-    path: str,
-    file_key: tuple[float, int] | None,
-    column_mapping: dict | None,
-    today_key: str,
-):
-    _ = file_key
-    today = date.fromisoformat(today_key)
-    return build_schedule_lookup(path, today=today, column_mapping=column_mapping)
-
-@st.cache_data(show_spinner=False)
-def _cached_preview_rows(
-    path: str,
-    file_key: tuple[float, int] | None,
-    prefer_first_table: bool,
-    column_mapping: dict | None,
-):
-    _ = file_key
-    return build_preview_rows(
-        path,
-        table_type="activity_summary",
-        prefer_first_table=prefer_first_table,
-        column_mapping=column_mapping,
-    )
 
 @st.cache_data(show_spinner=False)
-def _cached_weekly_progress(
-    path: str,
-    file_key: tuple[float, int] | None,
-    activity_id: str,
-    column_mapping: dict | None,
-    today_key: str,
-    version: int = WEEKLY_PROGRESS_CACHE_VERSION,
-):
+def _cached_load_from_excel(path: str, file_key: str | None):
     _ = file_key
-    _ = version  # bump to invalidate cache when weekly logic changes
-    today = date.fromisoformat(today_key)
-    return build_weekly_progress(
-        path,
-        activity_id,
-        today=today,
-        column_mapping=column_mapping,
-    )
+    cached = load_dashboard_cache(path)
+    if cached is not None:
+        return cached["data"]
+    excel_data = load_from_excel(path)
+    if excel_data is not None:
+        save_dashboard_cache(path, excel_data)
+    return excel_data
+
+def _weekly_progress(job, activity_id: str):
+    # The job's all-activities matrix (computed or loaded from the disk cache); a row slice per activity.
+    matrix = (job.result or {}).get("weekly_matrix") if job is not None else None
+    if matrix is None:
+        return [], {}
+    return matrix.series(activity_id)
 
 def _render_excel_format_help():
     with st.sidebar.expander("Excel format guide", expanded=False):
@@ -504,8 +459,8 @@ def _maybe_open_mapping_dialog(shared_path: str | None) -> None:
     _sync_mapping_for_upload()
     mapping = _init_column_mapping_state()
 
-    summary_headers = get_table_headers(shared_path, "activity_summary")
-    assign_headers = get_table_headers(shared_path, "resource_assignments")
+    summary_headers = get_table_headers(shared_path, "activity_summary", header_probe=True)
+    assign_headers = get_table_headers(shared_path, "resource_assignments", header_probe=True)
     summary_missing = _missing_required_fields(
         summary_headers[0] if summary_headers else None,
         "activity_summary",
@@ -624,6 +579,7 @@ TOOLTIPS = {
     "spi": "Schedule Performance Index. Values above 100% indicate faster-than-planned execution.",
     "weekly_momentum": "Weekly planned, actual, and forecasted progress increments. Use it to detect short-term acceleration or slowdown.",
     "schedule_gap": "Evolution of schedule variance over time. A declining trend signals increasing schedule risk.",
+    "progress_trend": "Planned and earned progress of the selected WBS level at each uploaded export, with SPI on the right axis.",
     "activity_mix": "Distribution of activities by execution status at the selected WBS level.",
     "wbs_selector": "Filters all indicators and charts to the selected WBS level.",
     "schedule": "Planned progress at the reporting date for this activity.",
@@ -1325,6 +1281,76 @@ def weekly_sv_fig(data, current_week: str | date | None):
     return base_layout(fig, height=280)
 
 
+def progress_trend_fig(history):
+    x = [d.to_pydatetime() for d in history.index]
+    labels = [d.strftime("%d %b %Y") for d in history.index]
+
+    def _vals(col):
+        return [None if v != v else float(v) for v in history[col]]
+
+    spi_pct = [None if v is None else v * 100 for v in _vals("spi")]
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=_vals("schedule"),
+            mode="lines+markers",
+            name="Planned %",
+            line=dict(color="#4b6ff4", width=3),
+            marker=dict(size=6),
+            customdata=labels,
+            hovertemplate="%{customdata}<br>Planned: %{y:.1f}%<extra></extra>",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=_vals("earned"),
+            mode="lines+markers",
+            name="Earned %",
+            line=dict(color="#2fc192", width=3),
+            marker=dict(size=6),
+            customdata=labels,
+            hovertemplate="%{customdata}<br>Earned: %{y:.1f}%<extra></extra>",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=spi_pct,
+            mode="lines+markers",
+            name="SPI",
+            yaxis="y2",
+            line=dict(color="#f0aa3c", width=2, dash="dot"),
+            marker=dict(size=5),
+            customdata=labels,
+            hovertemplate="%{customdata}<br>SPI: %{y:.1f}%<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title_text="",
+        xaxis=dict(showgrid=False, tickfont=dict(size=12), tickformat="%d %b"),
+        yaxis=dict(
+            title="%",
+            showgrid=True,
+            gridcolor="rgba(255,255,255,0.08)",
+            tickfont=dict(size=13),
+            range=[0, 105],
+        ),
+        yaxis2=dict(
+            title="SPI %",
+            overlaying="y",
+            side="right",
+            showgrid=False,
+            tickfont=dict(size=12),
+            rangemode="tozero",
+        ),
+        legend=dict(x=1, y=1.12, xanchor="right", orientation="h"),
+        margin=dict(t=28, b=40, r=56),
+    )
+    return base_layout(fig, height=260)
+
+
 def activities_status_fig(data: dict, error_msg: str | None = None, apply_layout: bool = True):
     labels = list(data.keys())
     values = [float(v) if isinstance(v, (int, float)) else 0.0 for v in data.values()]
@@ -1401,19 +1427,15 @@ page = "S-Curve" if page_override == "S-Curve" else "Dashboard"
 
 # Apply theme for both local pages
 inject_theme()
-perf_stats: dict[str, float] = {}
+TRACER.start_request("dashboard", page=page)
 
 # ---------- Data (dashboard) ----------
 excel_data = None
 selected_sheet = None
 if page == "Dashboard" and shared_path:
     try:
-        (excel_data, ms) = _time_call(
-            _cached_load_from_excel,
-            shared_path,
-            file_cache_key,
-        )
-        perf_stats["excel_load"] = ms
+        with trace_span("excel_load"):
+            excel_data = _cached_load_from_excel(shared_path, file_cache_key)
     except Exception as e:
         st.sidebar.warning(f"Excel read error: {e}")
 
@@ -1427,25 +1449,26 @@ selected_row = None
 activity_filter = None
 
 if shared_path:
+    # Extraction runs in the background (extraction_jobs); poll until it is done.
     try:
-        (schedule_lookup, schedule_info_dash), ms = _time_call(
-            _cached_schedule_lookup,
+        extraction_job = submit_extraction(
             shared_path,
-            file_cache_key,
             column_mapping=st.session_state.get("column_mapping"),
-            today_key=today_cache_key,
+            today=date.fromisoformat(today_cache_key),
         )
-        perf_stats["schedule_lookup"] = ms
-        (activity_rows, ms) = _time_call(
-            _cached_preview_rows,
-            shared_path,
-            file_cache_key,
-            True,
-            column_mapping=st.session_state.get("column_mapping"),
-        )
-        perf_stats["preview_rows"] = ms
     except Exception as e:
+        extraction_job = None
         st.sidebar.warning(f"Excel read error: {e}")
+    if extraction_job is not None and extraction_job.pending:
+        render_extraction_progress(extraction_job.id)
+        TRACER.end_request()
+        st.stop()
+    if extraction_job is not None and extraction_job.status == FAILED:
+        st.sidebar.warning(f"Excel read error: {extraction_job.error}")
+    elif extraction_job is not None:
+        schedule_lookup = extraction_job.result["schedule_lookup"]
+        schedule_info_dash = extraction_job.result["schedule_info"]
+        activity_rows = extraction_job.result["preview_rows"]
 
 if activity_rows:
     activity_filter = build_activity_filter_sidebar(activity_rows)
@@ -1593,15 +1616,8 @@ def render_dashboard():
             )
         if shared_path and selected_row:
             activity_key = selected_row.get("activity_id") or selected_row.get("label", "")
-            (weekly_series, weekly_info), ms = _time_call(
-                _cached_weekly_progress,
-                shared_path,
-                file_cache_key,
-                activity_key,
-                column_mapping=st.session_state.get("column_mapping"),
-                today_key=today_cache_key,
-            )
-            perf_stats["weekly_progress_dashboard"] = ms
+            with trace_span("weekly_progress", activity=activity_key):
+                weekly_series, weekly_info = _weekly_progress(extraction_job, activity_key)
             if weekly_series:
                 local_weekly_progress = weekly_series
                 local_current_week = (
@@ -1763,6 +1779,22 @@ def render_dashboard():
         )
         render_weekly_warnings(local_weekly_info)
 
+    if project and project.get("id") and activity_filter and selected_row:
+        trend_key = selected_row.get("activity_id") or selected_row.get("label", "")
+        with trace_span("progress_trend", activity=trend_key):
+            trend = activity_history(project["id"], trend_key)
+        if len(trend) >= 2:
+            with st.container():
+                st.markdown(
+                    f"<div class='chart-heading'>▸ Progress Trend <span class='info-badge' title='{html.escape(TOOLTIPS['progress_trend'], quote=True)}'>ℹ</span></div>",
+                    unsafe_allow_html=True,
+                )
+                st.plotly_chart(
+                    progress_trend_fig(trend),
+                    width="stretch",
+                    config={"displayModeBar": False, "responsive": False},
+                )
+
     bottom = st.columns([1.7, 1.0])
     with bottom[0]:
         with st.container():
@@ -1840,15 +1872,8 @@ def render_s_curve_page():
             selected_row = activity_filter["activity_rows_map"].get(selected_key)
         if shared_path and selected_row:
             activity_key = selected_row.get("activity_id") or selected_row.get("label", "")
-            (weekly_series, weekly_info), ms = _time_call(
-                _cached_weekly_progress,
-                shared_path,
-                file_cache_key,
-                activity_key,
-                column_mapping=st.session_state.get("column_mapping"),
-                today_key=today_cache_key,
-            )
-            perf_stats["weekly_progress_scurve"] = ms
+            with trace_span("weekly_progress", activity=activity_key):
+                weekly_series, weekly_info = _weekly_progress(extraction_job, activity_key)
             local_current_week = (
                 weekly_info.get("current_week_date")
                 or weekly_info.get("week_date")
@@ -2133,7 +2158,9 @@ def render_s_curve_page():
 
 
 
-if page == "Dashboard":
-    render_dashboard()
-elif page == "S-Curve":
-    render_s_curve_page()
+with trace_span("render"):
+    if page == "Dashboard":
+        render_dashboard()
+    elif page == "S-Curve":
+        render_s_curve_page()
+render_perf_panel(TRACER.end_request())
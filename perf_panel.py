@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import streamlit as st
+
+
+def _flatten(record: dict, total_ms: float, depth: int = 0, rows: list[dict] | None = None) -> list[dict]:
+    rows = [] if rows is None else rows
+    attrs = record.get("attrs") or {}
+    rows.append(
+        {
+            "stage": f"{'  ' * depth}{record.get('name', '')}",
+            "ms": round(float(record.get("ms", 0.0)), 1),
+            "share": f"{100.0 * float(record.get('ms', 0.0)) / total_ms:.0f}%" if total_ms else "",
+            "details": ", ".join(f"{k}={v}" for k, v in attrs.items()),
+        }
+    )
+    for child in record.get("children") or []:
+        _flatten(child, total_ms, depth + 1, rows)
+    return rows
+
+
+def _stage_totals(record: dict, totals: dict[str, list[float]] | None = None) -> dict[str, list[float]]:
+    totals = {} if totals is None else totals
+    for child in record.get("children") or []:
+        # Self time: a stage's duration minus the stages nested in it.
+        nested = sum(float(c.get("ms", 0.0)) for c in child.get("children") or [])
+        entry = totals.setdefault(child.get("name", ""), [0, 0.0])
+        entry[0] += 1
+        entry[1] += max(float(child.get("ms", 0.0)) - nested, 0.0)
+        _stage_totals(child, totals)
+    return totals
+
+
+def render_perf_panel(
+    trace: dict | None,
+    *,
+    sidebar: Any | None = None,
+    title: str = "Perf trace",
+) -> None:
+    """Sidebar breakdown of one request trace (WBS_TRACE=1): span tree and time per stage."""
+    if not trace:
+        return
+    sidebar = sidebar or st.sidebar
+    total_ms = float(trace.get("ms", 0.0))
+    with sidebar.expander(f"{title} ({total_ms:.0f} ms)", expanded=False):
+        st.dataframe(_flatten(trace, total_ms), width="stretch", hide_index=True)
+        totals = _stage_totals(trace)
+        if totals:
+            st.markdown("**Self time by stage (ms)**")
+            st.dataframe(
+                [
+                    {"stage": name, "calls": calls, "ms": round(ms, 1)}
+                    for name, (calls, ms) in sorted(totals.items(), key=lambda item: -item[1][1])
+                ],
+                width="stretch",
+                hide_index=True,
+            )
+        st.download_button(
+            "Download trace (JSONL)",
+            json.dumps(trace, ensure_ascii=False, default=str) + "\n",
+            file_name=f"trace_{trace.get('name', 'request')}.jsonl",
+            mime="application/x-ndjson",
+            key=f"perf_trace_download__{trace.get('name', 'request')}",
+        )
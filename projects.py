@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+import os
 import shutil
-from datetime import datetime, timezone
+import tempfile
+from datetime import date, datetime, timezone
 from pathlib import Path
 import uuid
 from filelock import FileLock
@@ -14,6 +17,10 @@ PROJECT_LIMIT = 3
 PROJECTS_PATH = Path("artifacts") / "projects.json"
 PROJECTS_DIR = Path("artifacts") / "projects"
 PROJECTS_LOCK_PATH = Path("artifacts") / "projects.json.lock"
+# Uploads are stored once per content (SHA-256) under PROJECTS_DIR / UPLOADS_SUBDIR
+# and shared by every project that uploaded the same bytes.
+UPLOADS_SUBDIR = "_uploads"
+_UPLOAD_CHUNK = 1 << 20
 
 def org_id_from_email(email: str | None) -> str | None:
     if not email or "@" not in email:
@@ -67,17 +74,22 @@ def _now_iso() -> str:
 def _load_projects() -> list[dict]:
     lock = FileLock(str(PROJECTS_LOCK_PATH), timeout=10)
     with lock:
-        if not PROJECTS_PATH.exists():
-            return []
-        try:
-            data = json.loads(PROJECTS_PATH.read_text(encoding="utf-8"))
-        except Exception:
-            return []
-        if isinstance(data, dict):
-            data = data.get("projects", [])
-        if not isinstance(data, list):
-            return []
-        return [p for p in data if isinstance(p, dict)]
+        return _read_projects()
+
+
+def _read_projects() -> list[dict]:
+    # Caller holds the projects lock (FileLock is not re-entrant).
+    if not PROJECTS_PATH.exists():
+        return []
+    try:
+        data = json.loads(PROJECTS_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return []
+    if isinstance(data, dict):
+        data = data.get("projects", [])
+    if not isinstance(data, list):
+        return []
+    return [p for p in data if isinstance(p, dict)]
 
 
 def _save_projects(projects: list[dict]) -> None:
@@ -103,9 +115,63 @@ def _new_project_id(projects: list[dict]) -> str:
             return candidate
 
 
-def _project_path(project_id: str, suffix: str) -> Path:
+def _uploads_dir() -> Path:
+    return PROJECTS_DIR / UPLOADS_SUBDIR
+
+
+def _store_upload_content(uploaded, suffix: str) -> tuple[Path, str]:
+    """Write the upload to the content-addressed store, hashing it as it streams.
+
+    Identical bytes already stored are kept as they are (same path and mtime),
+    so every cache keyed on them still hits.
+    """
     safe_suffix = suffix if suffix.startswith(".") else f".{suffix}"
-    return PROJECTS_DIR / project_id / f"latest{safe_suffix}"
+    uploads_dir = _uploads_dir()
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_name = tempfile.mkstemp(prefix="upload.", suffix=".tmp", dir=str(uploads_dir))
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            uploaded.seek(0)
+            for chunk in iter(lambda: uploaded.read(_UPLOAD_CHUNK), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        content_hash = digest.hexdigest()
+        target_path = uploads_dir / f"{content_hash}{safe_suffix.lower()}"
+        if not target_path.exists():
+            os.replace(tmp_path, target_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    try:
+        from excel_cache import remember_content_hash
+
+        remember_content_hash(target_path, content_hash)
+    except Exception as exc:
+        logging.warning(f"UPLOAD content hash not recorded for {target_path}: {exc}")
+    return target_path, content_hash
+
+
+def _release_upload(path: str | None) -> None:
+    """Delete a stored upload (and its ingest artifact) unless a project still uses it.
+
+    The check and the delete run under the projects lock, so a project saving
+    a reference to the same file meanwhile either keeps it or sees it gone
+    (store_project_upload then writes it again).
+    """
+    if not path:
+        return
+    lock = FileLock(str(PROJECTS_LOCK_PATH), timeout=10)
+    with lock:
+        if any(p.get("file_path") == path for p in _read_projects()):
+            return
+        try:
+            prior = Path(path)
+            if prior.exists():
+                prior.unlink()
+        except OSError:
+            pass
+    _remove_ingest_artifact(path)
 
 
 def project_mapping_key(project_id: str | None, file_key: str | None) -> str | None:
@@ -157,6 +223,8 @@ def create_project(name: str | None, owner_id: str | int | None = None, org_id:
         "file_key": None,
         "mapping": None,
         "mapping_key": None,
+        "content_hash": None,
+        "snapshot_date": None,
     }
     projects.append(project)
     _save_projects(projects)
@@ -234,6 +302,7 @@ def delete_project(
         project_dir = PROJECTS_DIR / project_id
         if project_dir.exists():
             shutil.rmtree(project_dir, ignore_errors=True)
+        _release_upload(project.get("file_path"))
     return True
 
 
@@ -345,6 +414,61 @@ def _apply_project_mapping(project: dict) -> None:
     st.session_state["mapping_skipped"] = False
 
 
+def _start_project_extraction(
+    path: Path,
+    mapping: dict,
+    *,
+    project_id: str | None = None,
+    snapshot_date: str | None = None,
+    file_name: str | None = None,
+    ingest: bool = True,
+    previous_path: str | None = None,
+) -> None:
+    # Ingest + extract in the background; the pages poll the same (single-flight) job.
+    # With a project, the results are also recorded as its snapshot for that day.
+    # An upload or a new mapping retries a file version whose last run failed.
+    # previous_path: the project's prior upload, re-extracted from incrementally.
+    try:
+        from extraction_jobs import submit_extraction
+
+        day = date.fromisoformat(snapshot_date) if snapshot_date else date.today()
+        job = submit_extraction(
+            str(path),
+            column_mapping=mapping,
+            today=day,
+            ingest=ingest,
+            previous_path=previous_path,
+            retry=True,
+        )
+        if project_id:
+            job.add_done_callback(lambda done: _record_project_snapshot(project_id, day, file_name, done))
+    except Exception as exc:
+        logging.warning(f"EXTRACTION failed to start for {path}: {exc}")
+
+
+def _record_project_snapshot(project_id: str, day: date, file_name: str | None, job) -> None:
+    if job.result is None:
+        return
+    from snapshot_history import record_snapshot
+
+    record_snapshot(
+        project_id,
+        day,
+        job.result["preview_rows"],
+        job.result["schedule_lookup"],
+        file_name=file_name,
+    )
+
+
+def _remove_ingest_artifact(path: str) -> None:
+    try:
+        from wbs_app.extract_wbs_json_calamine import remove_ingest_artifact
+
+        remove_ingest_artifact(path)
+    except Exception:
+        pass
+
+
 def store_project_upload(project: dict | None, uploaded, user: dict | None = None) -> str | None:
     if user:
         from access_guard import assert_can_edit
@@ -363,21 +487,9 @@ def store_project_upload(project: dict | None, uploaded, user: dict | None = Non
     project_id = project.get("id")
     if not project_id:
         return st.session_state.get("shared_excel_path")
-    target_path = _project_path(project_id, suffix)
-    target_path.parent.mkdir(parents=True, exist_ok=True)
-    data = uploaded.getvalue()
-    target_path.write_bytes(data)
+    target_path, content_hash = _store_upload_content(uploaded, suffix)
+    snapshot_date = date.today().isoformat()
     prior_path = project.get("file_path")
-    if prior_path and prior_path != str(target_path):
-        try:
-            prior = Path(prior_path)
-            if prior.exists():
-                prior.unlink()
-        except OSError:
-            pass
-    st.session_state["shared_excel_path"] = str(target_path)
-    st.session_state["shared_excel_key"] = file_key
-    st.session_state["shared_excel_name"] = uploaded.name
     mapping_key = project_mapping_key(project_id, file_key)
     update_project(
         project_id,
@@ -387,7 +499,25 @@ def store_project_upload(project: dict | None, uploaded, user: dict | None = Non
         file_key=file_key,
         mapping={"activity_summary": {}, "resource_assignments": {}},
         mapping_key=mapping_key,
+        content_hash=content_hash,
+        snapshot_date=snapshot_date,
+    )
+    if not target_path.exists():
+        # Released by another project before this one referenced the same bytes.
+        _store_upload_content(uploaded, suffix)
+    _start_project_extraction(
+        target_path,
+        {"activity_summary": {}, "resource_assignments": {}},
+        project_id=project_id,
+        snapshot_date=snapshot_date,
+        file_name=uploaded.name,
+        previous_path=prior_path,
     )
+    if prior_path and prior_path != str(target_path):
+        _release_upload(prior_path)
+    st.session_state["shared_excel_path"] = str(target_path)
+    st.session_state["shared_excel_key"] = file_key
+    st.session_state["shared_excel_name"] = uploaded.name
     st.session_state["column_mapping"] = {"activity_summary": {}, "resource_assignments": {}}
     st.session_state["mapping_source_key"] = mapping_key
     st.session_state["mapping_open"] = False
@@ -407,4 +537,14 @@ def persist_project_mapping(project_id: str | None, mapping: dict, mapping_key:
         owner_key = _normalize_owner_id(projects[idx].get("owner_id"))
     if not owner_key:
         return
-    update_project(project_id, owner_id=owner_key, mapping=mapping, mapping_key=mapping_key, user=user)
+    project = update_project(project_id, owner_id=owner_key, mapping=mapping, mapping_key=mapping_key, user=user)
+    # Re-record the current upload's snapshot with the new mapping (same snapshot day).
+    if project and project.get("file_path") and project.get("snapshot_date") and Path(project["file_path"]).exists():
+        _start_project_extraction(
+            Path(project["file_path"]),
+            mapping,
+            project_id=project_id,
+            snapshot_date=project["snapshot_date"],
+            file_name=project.get("file_name"),
+            ingest=False,
+        )
@@ -52,6 +52,7 @@ def cached_table_headers(
         file_path,
         table_type,
         column_mapping=mapping,
+        header_probe=True,
     )
 
 
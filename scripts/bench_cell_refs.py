@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Measure what lazy cell references save in build_preview_rows and
+build_schedule_lookup (SCHEDULE_CELL_REFS=1).
+
+Cell references are CellRef coordinates; the "eager" figures render every one
+of them to its A1 string, which is what the extractor used to do per row.
+
+Outputs:
+- stdout (build time, A1 rendering time and pickled size, lazy vs eager)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+
+def _refs(value, out: list) -> list:
+    if isinstance(value, extractor.CellRef):
+        out.append(value)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _refs(v, out)
+    elif isinstance(value, list):
+        for v in value:
+            _refs(v, out)
+    return out
+
+
+def _render(value):
+    if isinstance(value, extractor.CellRef):
+        return value.a1
+    if isinstance(value, dict):
+        return {k: _render(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v) for v in value]
+    return value
+
+
+def _report(name: str, build) -> None:
+    t0 = perf_counter()
+    lazy = build()
+    build_ms = (perf_counter() - t0) * 1000.0
+    refs = _refs(lazy, [])
+    t0 = perf_counter()
+    for ref in refs:
+        ref.a1
+    render_ms = (perf_counter() - t0) * 1000.0
+    eager = _render(lazy)
+    lazy_kb = len(pickle.dumps(lazy)) / 1024
+    eager_kb = len(pickle.dumps(eager)) / 1024
+    print(f"{name}: build {build_ms:.0f} ms, rendering its {len(refs)} refs: {render_ms:.0f} ms")
+    print(f"{' ' * len(name)}  pickled {eager_kb:.0f} KB eager -> {lazy_kb:.0f} KB lazy")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xlsx", help="Workbook to use (default: generate a synthetic one)")
+    parser.add_argument("--activities", type=int, default=10000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--today", default="2026-10-12")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.xlsx
+    if not path:
+        from synthetic_p6 import write_workbook
+
+        tmp_dir = tempfile.TemporaryDirectory(prefix="chronoplan-bench-")
+        path = str(Path(tmp_dir.name) / "synthetic.xlsx")
+        write_workbook(path, activities=args.activities, weeks=args.weeks)
+    today = date.fromisoformat(args.today)
+    previous = os.environ.get("SCHEDULE_CELL_REFS")
+    os.environ["SCHEDULE_CELL_REFS"] = "1"
+    try:
+        session = extractor.open_workbook_session(path)
+        session.catalog()
+        _report("preview rows", lambda: extractor.build_preview_rows(None, session=session))
+        _report(
+            "preview rows (first table)",
+            lambda: extractor.build_preview_rows(None, prefer_first_table=True, session=session),
+        )
+        _report("schedule lookup", lambda: extractor.build_schedule_lookup(None, today=today, session=session)[0])
+    finally:
+        if previous is None:
+            os.environ.pop("SCHEDULE_CELL_REFS", None)
+        else:
+            os.environ["SCHEDULE_CELL_REFS"] = previous
+        extractor.clear_workbook_sessions()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
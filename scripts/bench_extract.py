@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Extraction benchmark suite on synthetic P6 workbooks, with stored baselines.
+
+Workloads are synthetic_p6 workbooks (activity count, WBS depth, week span,
+noise columns); --xlsx benchmarks a given file instead. Cases:
+- extract_all_wbs
+- build_schedule_lookup
+- build_preview_rows (first activity summary table, as the pages call it)
+- build_weekly_progress (all-activities matrix + one activity slice)
+
+Every case runs cold (fresh WorkbookSession, xlsx parse included) in its own
+process, so peak RSS is the case's own. Stage timings come from the
+extractor's span tracer (best run; a stage's time includes its nested stages).
+
+--save-baseline stores the results per workload in the baseline file;
+--check compares against it and exits with status 1 when a wall time or peak
+RSS grew by more than --threshold. Baselines are machine-specific: save them
+on the machine that runs the checks.
+
+Outputs:
+- stdout (wall time, peak RSS and stage timings per case; regressions)
+- the baseline JSON file (with --save-baseline)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+DEFAULT_BASELINE = REPO_ROOT / "scripts" / "bench_baseline.json"
+
+WORKLOADS = {
+    "small": {"activities": 300, "weeks": 52, "depth": 4, "noise": 0},
+    "medium": {"activities": 2000, "weeks": 104, "depth": 5, "noise": 10},
+    "large": {"activities": 5000, "weeks": 156, "depth": 5, "noise": 10},
+}
+
+
+def _extract(path: str, today: date) -> None:
+    extractor.extract_all_wbs(path)
+
+
+def _schedule_lookup(path: str, today: date) -> None:
+    extractor.build_schedule_lookup(path, today=today)
+
+
+def _preview_rows(path: str, today: date) -> None:
+    extractor.build_preview_rows(path, table_type="activity_summary", prefer_first_table=True)
+
+
+def _weekly_progress(path: str, today: date) -> None:
+    matrix = extractor.build_weekly_progress_matrix(path, today=today)
+    activity_id = next(iter(matrix.activity_index), "")
+    extractor.build_weekly_progress(path, activity_id, today=today)
+
+
+CASES = {
+    "extract_all_wbs": _extract,
+    "build_schedule_lookup": _schedule_lookup,
+    "build_preview_rows": _preview_rows,
+    "build_weekly_progress": _weekly_progress,
+}
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _stage_ms(trace: dict, stages: dict[str, float] | None = None) -> dict[str, float]:
+    stages = {} if stages is None else stages
+    for child in trace.get("children", []):
+        stages[child["name"]] = round(stages.get(child["name"], 0.0) + child["ms"], 1)
+        _stage_ms(child, stages)
+    return stages
+
+
+def run_case(case: str, path: str, repeat: int, today: date) -> dict:
+    """Best-of-``repeat`` cold run of one case in this process."""
+    tracer = extractor.Tracer(enabled=True, path="", echo=False)
+    extractor.TRACER = tracer
+    best_ms = None
+    best_trace = None
+    for _ in range(repeat):
+        extractor.clear_workbook_sessions()
+        tracer.start_request(case)
+        t0 = perf_counter()
+        CASES[case](path, today)
+        elapsed = (perf_counter() - t0) * 1000.0
+        trace = tracer.end_request()
+        if best_ms is None or elapsed < best_ms:
+            best_ms, best_trace = elapsed, trace
+    peak = _peak_rss_mb()
+    return {
+        "wall_ms": round(best_ms, 1),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "stages": _stage_ms(best_trace or {}),
+    }
+
+
+def _run_case_process(case: str, path: str, repeat: int, today: date) -> dict:
+    cmd = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--run-case",
+        case,
+        "--xlsx",
+        path,
+        "--repeat",
+        str(repeat),
+        "--today",
+        today.isoformat(),
+    ]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _machine() -> dict:
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+def _print_results(name: str, results: dict) -> None:
+    for case, result in results.items():
+        rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+        print(f"  {case:<22} {result['wall_ms']:>9.0f} ms  peak RSS {rss}")
+        stages = sorted(result["stages"].items(), key=lambda item: -item[1])
+        print("    " + ", ".join(f"{stage} {ms:.0f}" for stage, ms in stages))
+
+
+def check_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regression messages for cases whose wall time or peak RSS grew past the threshold."""
+    problems = []
+    for case, result in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric in ("wall_ms", "peak_rss_mb"):
+            now, then = result.get(metric), base.get(metric)
+            if now is None or not then:
+                continue
+            if now > then * (1.0 + threshold):
+                problems.append(f"{case} {metric}: {then} -> {now} (+{(now / then - 1.0) * 100.0:.0f}%)")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=["small", "medium"])
+    parser.add_argument("--xlsx", help="Benchmark this workbook instead of the synthetic workloads")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--today", default="2026-10-12")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on a regression against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed growth (0.25 = 25%%)")
+    parser.add_argument("--run-case", choices=list(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    today = date.fromisoformat(args.today)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.xlsx, args.repeat, today)))
+        return
+
+    baseline_path = Path(args.baseline)
+    stored = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    stored_workloads = stored.get("workloads", {})
+    if args.check and stored and stored.get("machine") != _machine():
+        print(f"warning: baseline was recorded on {stored.get('machine')}")
+
+    tmp_dir = tempfile.TemporaryDirectory(prefix="chronoplan-bench-")
+    problems: list[str] = []
+    measured: dict[str, dict] = {}
+    try:
+        if args.xlsx:
+            targets = [(Path(args.xlsx).stem, args.xlsx, {"xlsx": str(args.xlsx)})]
+        else:
+            from synthetic_p6 import write_workbook
+
+            targets = []
+            for name in args.workloads:
+                params = WORKLOADS[name]
+                path = str(Path(tmp_dir.name) / f"{name}.xlsx")
+                write_workbook(path, today=today, **params)
+                targets.append((name, path, params))
+
+        for name, path, params in targets:
+            print(f"{name}: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB) {params}")
+            results = {case: _run_case_process(case, path, args.repeat, today) for case in args.cases}
+            _print_results(name, results)
+            measured[name] = {"params": params, "cases": results}
+            if args.check:
+                base = stored_workloads.get(name, {})
+                if base.get("params") != params:
+                    print(f"  no baseline for {name} with these parameters")
+                    continue
+                problems.extend(f"{name} {p}" for p in check_regressions(results, base["cases"], args.threshold))
+    finally:
+        tmp_dir.cleanup()
+
+    if args.save_baseline:
+        stored_workloads.update(measured)
+        baseline_path.write_text(
+            json.dumps({"machine": _machine(), "workloads": stored_workloads}, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"baseline saved: {baseline_path}")
+    if problems:
+        print(f"regressions (threshold {args.threshold * 100.0:.0f}%):")
+        for problem in problems:
+            print(f"  {problem}")
+        raise SystemExit(1)
+    if args.check:
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
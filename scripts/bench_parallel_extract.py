@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Measure how extraction scales with WBS_EXTRACT_WORKERS.
+
+For each worker count:
+- parse: _load_workbook_fast (wanted sheets parsed in parallel)
+- extract: extract_all_wbs on a fresh session with WBS_SCAN_ALL_BLOCKS=1
+  (parse + schedule lookup + summary tree + per-sheet block scan)
+
+Every worker count must produce the same packs; the script checks that.
+
+Outputs:
+- stdout (best-of-N time and speedup per worker count)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+
+def _best_ms(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn()
+        elapsed = (perf_counter() - t0) * 1000.0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _extract(path: str):
+    extractor.clear_workbook_sessions()
+    return extractor.extract_all_wbs(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xlsx", help="Workbook to use (default: generate a synthetic one)")
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=156)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.xlsx
+    if not path:
+        from synthetic_p6 import write_workbook
+
+        tmp_dir = tempfile.TemporaryDirectory(prefix="chronoplan-bench-")
+        path = str(Path(tmp_dir.name) / "synthetic.xlsx")
+        write_workbook(path, activities=args.activities, weeks=args.weeks)
+    print(f"workbook: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB), cpus: {os.cpu_count()}")
+    os.environ["WBS_SCAN_ALL_BLOCKS"] = "1"
+    os.environ["WBS_EXTRACT_EXECUTOR"] = args.executor
+    try:
+        reference = None
+        base = None
+        for workers in args.workers:
+            os.environ["WBS_EXTRACT_WORKERS"] = str(workers)
+            packs = repr(_extract(path))
+            if reference is None:
+                reference = packs
+            elif packs != reference:
+                raise SystemExit(f"{workers} workers changed the extracted packs")
+            parse_ms = _best_ms(lambda: extractor._load_workbook_fast(path), args.repeat)
+            extract_ms = _best_ms(lambda: _extract(path), args.repeat)
+            if base is None:
+                base = (parse_ms, extract_ms)
+            print(
+                f"{workers:>2} {args.executor} workers: parse {parse_ms:.0f} ms ({base[0] / parse_ms:.2f}x), "
+                f"extract {extract_ms:.0f} ms ({base[1] / extract_ms:.2f}x)"
+            )
+    finally:
+        extractor.clear_workbook_sessions()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
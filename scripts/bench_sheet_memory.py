@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Compare peak/retained memory of the workbook loader against the old row layout.
+
+Each mode parses the workbook in a fresh subprocess:
+- columnar: current _load_workbook_fast (per-column arrays + null mask)
+- rows: previous layout (DataFrame -> values.tolist() -> _nan_to_none per cell)
+
+Peak is the process RSS high-water mark during the parse; retained is the size of
+the live allocations still held by the parsed workbook (tracemalloc, separate run).
+
+Outputs:
+- stdout (peak RSS, retained size and parse time per mode)
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm", encoding="utf-8") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _load_rows(path: str):
+    import pandas as pd
+
+    import wbs_app.extract_wbs_json_calamine as extractor
+
+    xl = pd.ExcelFile(path, engine="calamine")
+    wanted = {w.lower() for w in extractor.WANTED_SHEETS}
+    sheets = []
+    for name in xl.sheet_names:
+        if any(w in name.lower() for w in wanted):
+            df0 = xl.parse(sheet_name=name, header=None, dtype=object)
+            sheets.append([[extractor._nan_to_none(v) for v in row] for row in df0.values.tolist()])
+    return sheets
+
+
+def _child(mode: str, path: str, traced: bool) -> None:
+    import wbs_app.extract_wbs_json_calamine as extractor
+
+    load = extractor._load_workbook_fast if mode == "columnar" else _load_rows
+    gc.collect()
+    if traced:
+        tracemalloc.start()
+        wb = load(path)
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(json.dumps({"retained_mb": round(retained / (1024 * 1024), 1)}))
+        return
+    base = _rss_mb()
+    t0 = perf_counter()
+    wb = load(path)
+    elapsed = (perf_counter() - t0) * 1000.0
+    print(json.dumps({"parse_ms": round(elapsed, 1), "peak_mb": round(_peak_mb() - base, 1)}))
+    del wb
+
+
+def _run_child(mode: str, path: str, traced: bool) -> dict:
+    cmd = [sys.executable, __file__, "--child", mode, "--xlsx", path]
+    if traced:
+        cmd.append("--traced")
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xlsx", help="Workbook to parse (default: generate a synthetic one)")
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=260)
+    parser.add_argument("--child", choices=["columnar", "rows"], help=argparse.SUPPRESS)
+    parser.add_argument("--traced", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.xlsx, args.traced)
+        return
+
+    tmp_dir = None
+    path = args.xlsx
+    if not path:
+        from synthetic_p6 import write_workbook
+
+        tmp_dir = tempfile.TemporaryDirectory(prefix="chronoplan-bench-")
+        path = str(Path(tmp_dir.name) / "synthetic.xlsx")
+        write_workbook(path, activities=args.activities, weeks=args.weeks)
+    print(f"workbook: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    try:
+        for mode in ("rows", "columnar"):
+            stats = _run_child(mode, path, traced=False)
+            stats.update(_run_child(mode, path, traced=True))
+            print(
+                f"{mode:>9}: peak +{stats['peak_mb']:.1f} MB, "
+                f"retained {stats['retained_mb']:.1f} MB, parse {stats['parse_ms']:.0f} ms"
+            )
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
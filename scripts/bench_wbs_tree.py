@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Time to_wbs_tree on a full-size Activities summary and measure what the tree
+keeps alive (compact tree vs the same tree as nested dicts).
+
+The summary frame is read straight from the synthetic workbook's "Activities"
+sheet (every row, no detection window), with a schedule lookup entry and cell
+references for every activity, so the metric columns and tooltips are built
+for each row.
+
+Outputs:
+- stdout (best-of-N to_wbs_tree time, node count, retained/pickled size of both shapes)
+"""
+from __future__ import annotations
+
+import argparse
+import pickle
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+
+def _summary_frame(path: str) -> pd.DataFrame:
+    ws = extractor._load_workbook_fast(path)["Activities"]
+    rows = list(ws.iter_rows(min_row=3, max_row=ws.max_row, min_col=1, max_col=ws.max_column, values_only=True))
+    columns = extractor.make_unique_columns([str(x).strip() if x is not None else "" for x in rows[0]])
+    return pd.DataFrame(rows[1:], columns=columns)
+
+
+def _count(node) -> int:
+    return 1 + sum(_count(child) for child in node.get("children", []))
+
+
+def _retained_mb(build) -> tuple:
+    tracemalloc.start()
+    try:
+        obj = build()
+        current, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return obj, current / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="chronoplan-bench-") as tmp_dir:
+        from synthetic_p6 import write_workbook
+
+        path = str(Path(tmp_dir) / "synthetic.xlsx")
+        write_workbook(path, activities=args.activities, weeks=4)
+        df = _summary_frame(path)
+
+    lookup = {}
+    for i, raw_id in enumerate(df["Activity ID"].tolist()):
+        lookup[str(raw_id).strip()] = {
+            "value": float(i % 100),
+            "display": f"{i % 100:.2f}%",
+            "budgeted_units": float(df["Budgeted Labor Units"].iat[i]),
+            "week_cell": f"'Ressource Assign. Budgeted'!K{i + 2}",
+            "budget_cell": f"'Ressource Assign. Budgeted'!E{i + 2}",
+        }
+    meta = {"sheet": "Activities", "range": "", "data_row_start": 4, "data_col_start": 1}
+
+    best = None
+    tree: dict = {}
+    for _ in range(args.repeat):
+        t0 = perf_counter()
+        tree = extractor.to_wbs_tree(df, "Activity ID", schedule_lookup=lookup, schedule_info={}, source_meta=meta)
+        elapsed = (perf_counter() - t0) * 1000.0
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"rows: {len(df)}, nodes: {_count(tree)}")
+    print(f"to_wbs_tree: {best:.0f} ms")
+
+    # Rebuild under tracemalloc: what stays allocated is the compact tree itself.
+    tree, compact_mb = _retained_mb(
+        lambda: extractor.to_wbs_tree(df, "Activity ID", schedule_lookup=lookup, schedule_info={}, source_meta=meta)
+    )
+    nested, nested_mb = _retained_mb(tree.to_dict)
+    print(f"retained: nested {nested_mb:.1f} MB, compact {compact_mb:.1f} MB")
+    print(
+        f"pickled: nested {len(pickle.dumps(nested)) / (1024 * 1024):.1f} MB, "
+        f"compact {len(pickle.dumps(tree)) / (1024 * 1024):.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
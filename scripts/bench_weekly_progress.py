@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Time the all-activities weekly progress matrix against per-activity slicing.
+
+- build: WeeklyProgressMatrix for every activity (tables already loaded)
+- switch: build_weekly_progress for one activity once the matrix exists
+  (what a WBS selection change on the Dashboard / S-Curve pages costs)
+
+Outputs:
+- stdout (build time, average/max switch time)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xlsx", help="Workbook to use (default: generate a synthetic one)")
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=156)
+    parser.add_argument("--switches", type=int, default=50)
+    parser.add_argument("--today", default="2026-10-12")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.xlsx
+    if not path:
+        from synthetic_p6 import write_workbook
+
+        tmp_dir = tempfile.TemporaryDirectory(prefix="chronoplan-bench-")
+        path = str(Path(tmp_dir.name) / "synthetic.xlsx")
+        write_workbook(path, activities=args.activities, weeks=args.weeks)
+    print(f"workbook: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    today = date.fromisoformat(args.today)
+    try:
+        session = extractor.open_workbook_session(path)
+        for field in ("Cum Budgeted Units", "Cum Actual Units", "Cum Remaining Early Units"):
+            extractor._load_resource_assignments_table(None, field, session=session)
+
+        t0 = perf_counter()
+        matrix = extractor.build_weekly_progress_matrix(None, today=today, session=session)
+        build_ms = (perf_counter() - t0) * 1000.0
+        print(
+            f"build: {build_ms:.0f} ms "
+            f"({len(matrix.activity_index)} activities x {len(matrix.week_dates)} weeks)"
+        )
+
+        ids = list(matrix.activity_index)
+        step = max(1, len(ids) // max(1, args.switches))
+        timings = []
+        for activity_id in ids[::step][: args.switches]:
+            t0 = perf_counter()
+            extractor.build_weekly_progress(None, activity_id, today=today, session=session)
+            timings.append((perf_counter() - t0) * 1000.0)
+        if timings:
+            print(f"switch: avg {sum(timings) / len(timings):.2f} ms, max {max(timings):.2f} ms")
+    finally:
+        extractor.clear_workbook_sessions()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
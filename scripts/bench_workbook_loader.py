@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Time the direct python-calamine loader against the previous pandas-based one.
+
+- pandas: pd.ExcelFile(engine="calamine").parse(...) per wanted sheet, then _Sheet.from_frame
+- calamine: current _load_workbook_fast (CalamineWorkbook, chunked columnar packing)
+
+Both loaders must produce the same cells; the script checks that before timing.
+
+Outputs:
+- stdout (best-of-N parse time per loader)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+
+def _load_pandas(path: str):
+    xl = pd.ExcelFile(path, engine="calamine")
+    wanted = {w.lower() for w in extractor.WANTED_SHEETS}
+    selected = [s for s in xl.sheet_names if any(w in s.lower() for w in wanted)] or xl.sheet_names
+    return extractor._Workbook(
+        [
+            extractor._Sheet.from_frame(str(name), xl.parse(sheet_name=name, header=None, dtype=object))
+            for name in selected
+        ]
+    )
+
+
+def _cells(wb) -> list:
+    return [
+        (
+            ws.title,
+            list(ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column, values_only=True)),
+        )
+        for ws in wb.worksheets
+    ]
+
+
+def _best_ms(fn, path: str, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn(path)
+        elapsed = (perf_counter() - t0) * 1000.0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xlsx", help="Workbook to parse (default: generate a synthetic one)")
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--weeks", type=int, default=156)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.xlsx
+    if not path:
+        from synthetic_p6 import write_workbook
+
+        tmp_dir = tempfile.TemporaryDirectory(prefix="chronoplan-bench-")
+        path = str(Path(tmp_dir.name) / "synthetic.xlsx")
+        write_workbook(path, activities=args.activities, weeks=args.weeks)
+    print(f"workbook: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    try:
+        if _cells(_load_pandas(path)) != _cells(extractor._load_workbook_fast(path)):
+            raise SystemExit("loaders disagree on cell values")
+        pandas_ms = _best_ms(_load_pandas, path, args.repeat)
+        calamine_ms = _best_ms(extractor._load_workbook_fast, path, args.repeat)
+        print(f"  pandas: {pandas_ms:.0f} ms")
+        print(f"calamine: {calamine_ms:.0f} ms ({pandas_ms / calamine_ms:.2f}x)")
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+Write a synthetic P6-style export workbook for benchmarks and manual tests.
+
+Layout matches what the extractor expects:
+- "Activities": indented WBS/activity tree with the summary columns
+- "Ressource Assign. Budgeted/Actual/Remaining": weekly cumulative units
+
+Parameterized by activity count, WBS depth, week span and "noise" columns
+(extra P6 fields the extractor must skip: durations, floats, codes, notes).
+Noise values come from their own random stream, so the schedule data for a
+given seed is the same with or without noise columns.
+
+Outputs:
+- the .xlsx path given on the command line
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from openpyxl import Workbook
+
+ASSIGN_SHEETS = [
+    ("Ressource Assign. Budgeted", "Cum Budgeted Units"),
+    ("Ressource Assign. Actual", "Cum Actual Units"),
+    ("Ressource Assign. Remaining", "Cum Remaining Early Units"),
+]
+NOISE_FIELDS = [
+    "Original Duration",
+    "Remaining Duration",
+    "Total Float",
+    "Primary Resource",
+    "Calendar",
+    "Activity Type",
+    "WBS Code",
+    "Resource ID",
+    "Actual Start",
+    "Notebook Topic",
+]
+
+
+def _week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def noise_headers(count: int) -> list[str]:
+    headers = []
+    for i in range(count):
+        name = NOISE_FIELDS[i % len(NOISE_FIELDS)]
+        headers.append(name if i < len(NOISE_FIELDS) else f"{name} {i // len(NOISE_FIELDS) + 1}")
+    return headers
+
+
+def noise_values(count: int, rnd: random.Random) -> list:
+    values: list = []
+    for i in range(count):
+        kind = i % 4
+        if rnd.random() < 0.15:
+            values.append(None)
+        elif kind == 0:
+            values.append(rnd.randint(0, 400))
+        elif kind == 1:
+            values.append(round(rnd.uniform(-50, 50), 1))
+        elif kind == 2:
+            values.append(f"R{rnd.randint(1, 60):03d}")
+        else:
+            values.append(datetime(2025, 1, 1) + timedelta(days=rnd.randint(0, 900)))
+    return values
+
+
+def build_tree(activities: int, depth: int, rnd: random.Random) -> list[tuple[int, str, bool]]:
+    """(level, activity_id, is_leaf) rows in display order."""
+    rows: list[tuple[int, str, bool]] = []
+    counter = [0]
+
+    def add(level: int, prefix: str) -> None:
+        if level == depth or counter[0] >= activities:
+            counter[0] += 1
+            rows.append((level, f"{prefix}-A{counter[0]:05d}", True))
+            return
+        rows.append((level, prefix, False))
+        for i in range(rnd.randint(2, 4)):
+            if counter[0] >= activities:
+                break
+            add(level + 1, f"{prefix}.{i + 1}")
+
+    add(0, "PRJ")
+    while counter[0] < activities:
+        add(1, f"PRJ.X{counter[0]}")
+    return rows
+
+
+def write_workbook(
+    path: str | Path,
+    activities: int = 300,
+    weeks: int = 100,
+    depth: int = 4,
+    today: date = date(2026, 10, 12),
+    seed: int = 1,
+    noise: int = 0,
+) -> list[tuple[int, str, bool]]:
+    """Write the workbook and return the generated tree rows."""
+    rnd = random.Random(seed)
+    noise_rnd = random.Random(seed + 1)
+    extra = noise_headers(noise)
+    rows = build_tree(activities, depth, rnd)
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("Activities")
+    ws.append(["Project export - Activities"])
+    ws.append([])
+    ws.append(
+        [
+            "Activity ID",
+            "Activity Name",
+            "Activity Status",
+            "BL Project Finish",
+            "Finish",
+            "Units % Complete",
+            "Variance - BL Project Finish Date",
+            "Budgeted Labor Units",
+        ]
+        + extra
+    )
+    budgets: dict[str, float] = {}
+    for level, activity_id, leaf in rows:
+        bl_finish = datetime(2026, 1, 1) + timedelta(days=rnd.randint(0, 500))
+        budget = float(rnd.randint(10, 1000))
+        budgets[activity_id] = budget
+        ws.append(
+            [
+                "  " * level + activity_id,
+                f"Task {activity_id}" if leaf else None,
+                rnd.choice(["Completed", "In Progress", "Not Started"]) if leaf else None,
+                bl_finish,
+                bl_finish + timedelta(days=rnd.randint(-20, 40)),
+                round(rnd.random(), 4),
+                rnd.randint(-30, 30),
+                budget,
+            ]
+            + noise_values(noise, noise_rnd)
+        )
+
+    this_week = _week_start(today)
+    first = this_week - timedelta(weeks=weeks // 2)
+    week_dates = [first + timedelta(weeks=i) for i in range(weeks)]
+    for sheet_name, field in ASSIGN_SHEETS:
+        if field == "Cum Actual Units":
+            sheet_weeks = [w for w in week_dates if w <= this_week]
+        elif field == "Cum Remaining Early Units":
+            sheet_weeks = [w for w in week_dates if w >= this_week]
+        else:
+            sheet_weeks = week_dates
+        sheet = wb.create_sheet(sheet_name)
+        sheet.append(
+            ["Activity ID", "Activity Name", "Start", "Finish", "Budgeted Units", "Spreadsheet Field"]
+            + extra
+            + [datetime.combine(w, datetime.min.time()) for w in sheet_weeks]
+        )
+        for level, activity_id, leaf in rows:
+            budget = budgets[activity_id]
+            cum = 0.0
+            values = []
+            for _ in sheet_weeks:
+                cum = min(budget, cum + budget * rnd.random() * 0.05)
+                values.append(round(cum, 2))
+            sheet.append(
+                [
+                    "  " * level + activity_id,
+                    f"Task {activity_id}" if leaf else None,
+                    datetime(2025, 6, 1),
+                    datetime(2027, 1, 1),
+                    budget,
+                    field,
+                ]
+                + noise_values(noise, noise_rnd)
+                + values
+            )
+    wb.create_sheet("Notes").append(["ignored"])
+    wb.save(str(path))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output")
+    parser.add_argument("--activities", type=int, default=300)
+    parser.add_argument("--weeks", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--noise", type=int, default=0, help="Extra non-schedule columns per sheet")
+    args = parser.parse_args()
+    rows = write_workbook(args.output, args.activities, args.weeks, args.depth, seed=args.seed, noise=args.noise)
+    print(f"wrote {args.output} ({len(rows)} rows, {args.weeks} weeks, {args.noise} noise columns)")
+
+
+if __name__ == "__main__":
+    main()
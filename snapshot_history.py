@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from wbs_app.extract_wbs_json_calamine import parse_percent_float
+
+# ============================================================
+# Project snapshot history
+#
+# Each upload replaces the project's workbook (the previous one is deleted
+# unless another project uses it), so the activity metrics of every export
+# are kept here instead, append-only:
+#
+#   artifacts/projects/<id>/history/<YYYY-MM-DD>.arrow
+#
+# One Arrow IPC (feather, lz4) file per snapshot date, one row per activity:
+# earned and schedule % (as the Dashboard shows them), budgeted units, planned
+# and forecast finish, variance days and WBS level. A second upload on the
+# same day replaces that day's file. pyarrow is optional: without it no
+# snapshot is recorded and the queries return empty frames.
+#
+# Queries read every snapshot once (memory-mapped) into one frame cached per
+# project until a snapshot file changes, with row positions per activity, so
+# an activity's history or a roll-up is a slice, not a file scan.
+# ============================================================
+
+HISTORY_VERSION = 1
+PROJECTS_DIR = Path("artifacts") / "projects"
+
+METRICS = ("earned", "schedule", "spi", "sv", "budgeted_units", "planned_finish", "forecast_finish", "variance_days")
+
+_SNAPSHOT_COLUMNS = (
+    "activity_id",
+    "level",
+    "earned",
+    "schedule",
+    "budgeted_units",
+    "planned_finish",
+    "forecast_finish",
+    "variance_days",
+)
+_CACHE_SIZE = 8
+
+
+def history_dir(project_id: str) -> Path:
+    return PROJECTS_DIR / str(project_id) / "history"
+
+
+def _number(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return math.nan
+
+
+def _percent(value: Any) -> float:
+    if value is None or value == "":
+        return math.nan
+    if isinstance(value, str) and not value.strip():
+        return math.nan
+    return float(parse_percent_float(value))
+
+
+def _datetimes(values: pd.Series) -> pd.Series:
+    # Dates and date text only: a bare number is not a date here.
+    dated = values.map(lambda v: isinstance(v, (str, date)))
+    return pd.to_datetime(values.where(dated), errors="coerce", format="mixed").astype("datetime64[s]")
+
+
+def snapshot_frame(preview_rows: list[dict], schedule_lookup: dict | None) -> pd.DataFrame:
+    """One row per activity (first occurrence of its ID) with the metrics the Dashboard shows."""
+    lookup = schedule_lookup or {}
+    seen: set[str] = set()
+    cols: dict[str, list] = {name: [] for name in _SNAPSHOT_COLUMNS}
+    for row in preview_rows or []:
+        activity_id = str(row.get("activity_id") or row.get("label") or "").strip()
+        if not activity_id or activity_id in seen:
+            continue
+        seen.add(activity_id)
+        sched = (lookup.get(activity_id) or {}).get("value")
+        cols["activity_id"].append(activity_id)
+        cols["level"].append(int(row.get("level") or 0))
+        cols["earned"].append(_percent(row.get("units_complete")))
+        cols["schedule"].append(
+            float(sched) if isinstance(sched, (int, float)) and not isinstance(sched, bool) else math.nan
+        )
+        cols["budgeted_units"].append(_number(row.get("budgeted_units")))
+        cols["planned_finish"].append(row.get("bl_project_finish"))
+        cols["forecast_finish"].append(row.get("finish"))
+        cols["variance_days"].append(_number(row.get("variance_days")))
+    return pd.DataFrame(
+        {
+            "activity_id": pd.Series(cols["activity_id"], dtype=object),
+            "level": np.array(cols["level"], dtype=np.int16),
+            "earned": np.array(cols["earned"], dtype=np.float64),
+            "schedule": np.array(cols["schedule"], dtype=np.float64),
+            "budgeted_units": np.array(cols["budgeted_units"], dtype=np.float64),
+            "planned_finish": _datetimes(pd.Series(cols["planned_finish"], dtype=object)),
+            "forecast_finish": _datetimes(pd.Series(cols["forecast_finish"], dtype=object)),
+            "variance_days": np.array(cols["variance_days"], dtype=np.float64),
+        }
+    )
+
+
+def record_snapshot(
+    project_id: str,
+    snapshot_date: date,
+    preview_rows: list[dict],
+    schedule_lookup: dict | None,
+    *,
+    file_name: str | None = None,
+) -> Path | None:
+    """Write (or replace) the project's snapshot for ``snapshot_date``.
+
+    Returns the snapshot file, or None when pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+    frame = snapshot_frame(preview_rows, schedule_lookup)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.set_column(0, "activity_id", table.column("activity_id").dictionary_encode())
+    meta = {
+        "version": HISTORY_VERSION,
+        "snapshot_date": snapshot_date.isoformat(),
+        "file_name": file_name,
+        "recorded_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+    }
+    table = table.replace_schema_metadata({"chronoplan": json.dumps(meta)})
+    target_dir = history_dir(project_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target = target_dir / f"{snapshot_date.isoformat()}.arrow"
+    tmp = target_dir / f".{target.name}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        feather.write_feather(table, str(tmp), compression="lz4")
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return target
+
+
+def _snapshot_files(project_id: str) -> list[tuple[date, Path, tuple]]:
+    try:
+        entries = list(os.scandir(history_dir(project_id)))
+    except FileNotFoundError:
+        return []
+    files = []
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        if ext != ".arrow" or not entry.is_file():
+            continue
+        try:
+            day = date.fromisoformat(stem)
+        except ValueError:
+            continue
+        stat = entry.stat()
+        files.append((day, Path(entry.path), (entry.name, stat.st_mtime_ns, stat.st_size)))
+    return sorted(files)
+
+
+def list_snapshots(project_id: str) -> list[date]:
+    return [day for day, _, _ in _snapshot_files(project_id)]
+
+
+class _History:
+    """Every snapshot of a project in one frame, with row positions per activity and roll-ups per level."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.rollups: dict[int, pd.DataFrame] = {}
+        self.positions: dict[str, np.ndarray] = (
+            {str(k): v for k, v in frame.groupby("activity_id", observed=True, sort=False).indices.items()}
+            if len(frame)
+            else {}
+        )
+
+
+_LOCK = threading.Lock()
+_CACHE: "OrderedDict[str, tuple[tuple, _History]]" = OrderedDict()
+
+
+def _read_history(files: list[tuple[date, Path, tuple]]) -> _History:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    tables = []
+    for day, path, _ in files:
+        table = feather.read_table(str(path), memory_map=True)
+        table = table.replace_schema_metadata(None).cast(
+            pa.schema([f.with_type(pa.string()) if f.name == "activity_id" else f for f in table.schema])
+        )
+        tables.append(table.append_column("snapshot_date", pa.array([day] * table.num_rows, type=pa.date32())))
+    frame = pa.concat_tables(tables, promote_options="permissive").to_pandas(date_as_object=False)
+    frame["activity_id"] = frame["activity_id"].astype("category")
+    return _History(frame)
+
+
+def _history(project_id: str) -> _History | None:
+    files = _snapshot_files(project_id)
+    if not files:
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    key = str(history_dir(project_id).resolve())
+    signature = tuple(sig for _, _, sig in files)
+    with _LOCK:
+        cached = _CACHE.get(key)
+        if cached is not None and cached[0] == signature:
+            _CACHE.move_to_end(key)
+            return cached[1]
+    history = _read_history(files)
+    with _LOCK:
+        _CACHE[key] = (signature, history)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return history
+
+
+def _with_ratios(frame: pd.DataFrame) -> pd.DataFrame:
+    schedule = frame["schedule"].where(frame["schedule"] != 0)
+    frame["spi"] = frame["earned"] / schedule
+    frame["sv"] = frame["earned"] - frame["schedule"]
+    return frame[list(METRICS)]
+
+
+def _empty() -> pd.DataFrame:
+    frame = pd.DataFrame({name: pd.Series(dtype="float64") for name in METRICS})
+    frame.index = pd.DatetimeIndex([], name="snapshot_date")
+    return frame
+
+
+def activity_history(project_id: str, activity_id: str) -> pd.DataFrame:
+    """One activity's metrics per snapshot date (oldest first); empty if never recorded."""
+    history = _history(project_id)
+    rows = history.positions.get(str(activity_id).strip()) if history is not None else None
+    if rows is None:
+        return _empty()
+    frame = history.frame.iloc[rows].set_index("snapshot_date").sort_index()
+    return _with_ratios(frame.copy())
+
+
+def rollup_history(project_id: str, level: int = 0) -> pd.DataFrame:
+    """Project metrics per snapshot date from the activities at WBS ``level``.
+
+    Earned and schedule % are budget-weighted (plain means for a snapshot
+    without budgets), budgets summed, planned/forecast finish the latest one, variance
+    the worst one.
+    """
+    history = _history(project_id)
+    if history is None:
+        return _empty()
+    rollup = history.rollups.get(level)
+    if rollup is None:
+        rollup = history.rollups[level] = _rollup(history.frame[history.frame["level"] == level])
+    return rollup.copy()
+
+
+def _rollup(frame: pd.DataFrame) -> pd.DataFrame:
+    if frame.empty:
+        return _empty()
+    # Budget-weighted on the dates whose snapshot has budgets, plain means on the others.
+    weights = frame["budgeted_units"].where(frame["budgeted_units"] > 0)
+    budgeted = weights.notna().groupby(frame["snapshot_date"]).transform("any")
+    weights = weights.fillna(0.0).where(budgeted, 1.0)
+    parts = pd.DataFrame(
+        {
+            "snapshot_date": frame["snapshot_date"],
+            "budgeted_units": frame["budgeted_units"],
+            "earned_w": frame["earned"] * weights,
+            "earned_n": weights.where(frame["earned"].notna(), 0.0),
+            "schedule_w": frame["schedule"] * weights,
+            "schedule_n": weights.where(frame["schedule"].notna(), 0.0),
+        }
+    )
+    out = parts.groupby("snapshot_date").sum(min_count=1)
+    out["earned"] = out["earned_w"] / out["earned_n"].where(out["earned_n"] > 0)
+    out["schedule"] = out["schedule_w"] / out["schedule_n"].where(out["schedule_n"] > 0)
+    dates = frame.groupby("snapshot_date").agg(
+        planned_finish=("planned_finish", "max"),
+        forecast_finish=("forecast_finish", "max"),
+        variance_days=("variance_days", "min"),
+    )
+    return _with_ratios(out.join(dates).sort_index())
+
+
+def clear_history_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
@@ -8,6 +8,24 @@ without starting Streamlit UI rendering.
 
 from __future__ import annotations
 
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# pages/2_WBS.py puts both the repo root and wbs_app/ on sys.path before
+# running wbs_app/wbs_app.py, so ``wbs_app`` must still resolve to the package.
+_WBS_PAGE_IMPORTS = """
+import ast, sys
+root, wbs_dir = sys.argv[1], sys.argv[2]
+sys.path = [root, wbs_dir] + [p for p in sys.path if p not in (root, wbs_dir)]
+tree = ast.parse(open(wbs_dir + "/wbs_app.py", encoding="utf-8").read())
+imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+exec(compile(ast.Module(body=imports, type_ignores=[]), "wbs_app.py", "exec"), {})
+import wbs_app
+assert hasattr(wbs_app, "__path__"), wbs_app
+"""
 
 def test_imports() -> None:
     import pandas as pd
@@ -26,6 +44,18 @@ def test_imports() -> None:
     assert fig is not None
 
 
+def test_wbs_page_imports() -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", _WBS_PAGE_IMPORTS, str(ROOT), str(ROOT / "wbs_app")],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+
+
 if __name__ == "__main__":
     test_imports()
+    test_wbs_page_imports()
     print("PASS")
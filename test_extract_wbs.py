@@ -0,0 +1,1120 @@
+#!/usr/bin/env python3
+"""
+Extractor checks on a small generated workbook.
+
+Covers:
+- parse-once WorkbookSession reuse across entry points
+- table catalog memoized once per session
+- columnar sheet store round-trips cell values
+- direct calamine loader matches pandas' ExcelFile.parse cells
+- header probe answers get_table_headers without a full parse
+- table detection keeps every table of a sheet, several of one type included
+- header matching (variant index, memoized normalizers) agrees with plain matching
+- week index: bisect week lookup, planned (shifted) weeks, weeks out of range
+- weekly progress matrix: one build per session, series are row slices
+- to_wbs_tree column-wise metrics (fallback columns, variance/impact, tips)
+- compact WBS tree: dict views, label edits, pickling, to_dict
+- cell references kept as coordinates, rendered to A1 text on demand
+- first-table preview rows: same rows as the cell-by-cell walk, 10k in < 1 s
+- parallel extraction (process and thread pools) matches the serial result
+- tracing: nested stage spans, JSONL export, no-op when disabled
+- re-upload: only changed rows recomputed, same result as a fresh extraction
+- batch mode: directory input, one NDJSON line per table, failures reported
+- ingest artifact: cold sessions load it instead of the xlsx, same results
+- background extraction jobs: single-flight per file version, status polling,
+  failed jobs retried on request, results served from the disk cache after a restart
+- snapshot history: one file per snapshot date, activity and roll-up queries
+- content-addressed uploads: one stored file and one cache entry per content
+
+Notes:
+- The workbook is written with openpyxl into a temp dir (no artifacts/ needed).
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+REPO_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import pandas as pd  # noqa: E402
+from openpyxl import Workbook, load_workbook  # noqa: E402
+
+import excel_cache  # noqa: E402
+import extraction_jobs  # noqa: E402
+import projects as projects_module  # noqa: E402
+import snapshot_history  # noqa: E402
+import wbs_app.extract_wbs_json_calamine as extractor  # noqa: E402
+
+TODAY = date(2026, 10, 12)
+
+
+def _write_workbook(path: Path) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Activities"
+    ws.append(
+        [
+            "Activity ID",
+            "Activity Name",
+            "Activity Status",
+            "BL Project Finish",
+            "Finish",
+            "Units % Complete",
+            "Variance - BL Project Finish Date",
+            "Budgeted Labor Units",
+        ]
+    )
+    rows = [
+        ("PRJ", None, None, 0.5, 300.0),
+        ("  PRJ.1", None, None, 0.6, 200.0),
+        ("    A100", "Excavation", "In Progress", 0.75, 120.0),
+        ("    A110", "Foundations", "Not Started", 0.4, 80.0),
+        ("  PRJ.2", None, None, 0.25, 100.0),
+        ("    A200", "Steel", "Not Started", 0.25, 100.0),
+    ]
+    for activity_id, name, status, pct, budget in rows:
+        ws.append([activity_id, name, status, datetime(2027, 1, 4), datetime(2027, 1, 11), pct, -5, budget])
+
+    weeks = [datetime.combine(TODAY - timedelta(weeks=3 - i), datetime.min.time()) for i in range(6)]
+    for sheet_name, field in (
+        ("Ressource Assign. Budgeted", "Cum Budgeted Units"),
+        ("Ressource Assign. Actual", "Cum Actual Units"),
+        ("Ressource Assign. Remaining", "Cum Remaining Early Units"),
+    ):
+        sheet = wb.create_sheet(sheet_name)
+        sheet.append(["Activity ID", "Budgeted Units", "Spreadsheet Field"] + weeks)
+        for activity_id, _, _, _, budget in rows:
+            values = [round(budget * (i + 1) / 6, 2) for i in range(len(weeks))]
+            sheet.append([activity_id, budget, field] + values)
+    wb.save(path)
+
+
+def test_workbook_session_reuse() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+
+        print("[1] same file -> same live session")
+        session = extractor.open_workbook_session(str(xlsx))
+        assert extractor.open_workbook_session(str(xlsx)) is session
+
+        print("[2] every entry point accepts the session")
+        lookup, info = extractor.build_schedule_lookup(None, today=TODAY, session=session)
+        assert info["status"] == "ok", info
+        rows = extractor.build_preview_rows(None, prefer_first_table=True, session=session)
+        assert [r["activity_id"] for r in rows][:3] == ["PRJ", "PRJ.1", "A100"]
+        packs = extractor.extract_all_wbs(None, lookup, info, session=session)
+        assert packs and packs[0]["wbs"]["activity_id"] == "PRJ"
+        series, _ = extractor.build_weekly_progress(None, "A100", today=TODAY, session=session)
+        assert series
+        assert extractor.get_table_headers(None, "resource_assignments", session=session)
+        assert len(extractor.detect_expected_tables(None, session=session)) == 4
+        ids = extractor.compare_activity_ids(None, session=session)
+        assert ids["summary_only"] == ids["assign_only"] == []
+        assert [(t["unique"], t["only_in_table"], t["missing_from_table"]) for t in ids["tables"]] == [(6, 0, 0)] * 4
+
+        print("[3] table catalog is built once per session")
+        catalog = session.catalog()
+        assert session.catalog() is catalog
+        fields = sorted(f for t in catalog for f in t["spreadsheet_fields"])
+        assert fields == ["Cum Actual Units", "Cum Budgeted Units", "Cum Remaining Early Units"], fields
+
+        print("[4] path-based calls share the same parse")
+        assert extractor.build_preview_rows(str(xlsx), prefer_first_table=True) == rows
+
+        print("[5] a rewritten file gets a fresh session")
+        stat = xlsx.stat()
+        os.utime(xlsx, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert extractor.open_workbook_session(str(xlsx)) is not session
+
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_columnar_sheet_roundtrip() -> None:
+    stamp = datetime(2026, 10, 12)
+    rows = [
+        ["Activity ID", "Budgeted Units", stamp],
+        ["A100", 10, 2.5],
+        ["A110", None, 3],
+        [" ", 4.0, float("nan")],
+    ]
+    sheet = extractor._Sheet.from_rows("Ressource Assign. Budgeted", rows)
+
+    print("[1] iter_rows/cell keep the original values and types")
+    got = list(sheet.iter_rows(min_row=1, max_row=5, min_col=1, max_col=4, values_only=True))
+    assert got[0] == ("Activity ID", "Budgeted Units", stamp, None)
+    assert got[2] == ("A110", None, 3, None) and type(got[2][2]) is int
+    assert got[3] == (" ", 4.0, None, None) and type(got[3][1]) is float
+    assert got[4] == (None, None, None, None)
+    assert sheet.cell(row=2, column=3).value == 2.5
+
+    print("[2] numeric columns expose zero-copy float views")
+    assert sheet.column_is_numeric(2)
+    view = sheet.column(2, min_row=2)
+    assert view.base is not None and view[0] == 10.0
+    assert list(sheet.null_mask(2, min_row=2)) == [False, True, False]
+
+    print("PASS")
+
+
+def test_calamine_loader_matches_pandas() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        sheet = Workbook()
+        sheet.active.title = "Ressource Assign. Notes"
+        sheet.active.cell(row=3, column=2, value="NA")
+        sheet.active.cell(row=4, column=4, value=12.0)
+        sheet.save(tmp_path / "sparse.xlsx")
+
+        for path in (xlsx, tmp_path / "sparse.xlsx"):
+            print(f"[1] {path.name}: same cells as pandas")
+            wb = extractor._load_workbook_fast(str(path))
+            xl = pd.ExcelFile(path, engine="calamine")
+            assert [ws.title for ws in wb.worksheets] == xl.sheet_names
+            for ws in wb.worksheets:
+                df = xl.parse(sheet_name=ws.title, header=None, dtype=object)
+                expected = [[extractor._nan_to_none(v) for v in row] for row in df.values.tolist()]
+                got = [
+                    list(r)
+                    for r in ws.iter_rows(
+                        min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column, values_only=True
+                    )
+                ]
+                assert got == expected, ws.title
+                assert [type(v) for r in got for v in r] == [type(v) for r in expected for v in r]
+        print("PASS")
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_header_probe_matches_full_parse() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    fast_cols = extractor._FAST_SCAN_COLS
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+
+        print("[1] probe returns the same (headers, meta) as a full parse")
+        probed = [
+            extractor.get_table_headers(str(xlsx), t, header_probe=True)
+            for t in ("activity_summary", "resource_assignments")
+        ]
+        assert not extractor._SESSIONS, "probe must not open a full session"
+        probe = extractor.open_header_probe(str(xlsx))
+        assert probe.header_probe and probe.probe_complete()
+        full = [extractor.get_table_headers(str(xlsx), t) for t in ("activity_summary", "resource_assignments")]
+        assert probed == full
+
+        print("[2] a live full session is reused by the probe")
+        assert extractor.open_header_probe(str(xlsx)) is extractor.open_workbook_session(str(xlsx))
+
+        print("[3] header rows cut by the probe window: full parse, then the probe reads far enough")
+        wide = tmp_path / "wide.xlsx"
+        _write_workbook(wide)
+        extractor._FAST_SCAN_COLS = 5
+        assert not extractor.open_header_probe(str(wide)).probe_complete()
+        full = extractor.get_table_headers(str(wide), "resource_assignments", header_probe=True)
+        assert len(full[0]) == 9 and str(wide) in extractor._SESSIONS
+        extractor.clear_workbook_sessions()
+        probe = extractor.open_header_probe(str(wide))
+        assert probe.probe_complete()
+        assert extractor.get_table_headers(str(wide), "resource_assignments", header_probe=True) == full
+        assert not extractor._SESSIONS
+        print("PASS")
+    finally:
+        extractor._FAST_SCAN_COLS = fast_cols
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_detect_tables_sharing_a_sheet() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "one_sheet.xlsx"
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Export"
+        weeks = [datetime.combine(TODAY - timedelta(weeks=1 - i), datetime.min.time()) for i in range(3)]
+        ws.append(["Activity ID", "Activity Name", "BL Project Finish", "Finish"])
+        ws.append(["A100", "Excavation", datetime(2027, 1, 4), datetime(2027, 1, 11)])
+        ws.append(["A200", "Steel", datetime(2027, 1, 4), datetime(2027, 1, 18)])
+        for field, ids in (("Cum Budgeted Units", ("A100", "A200")), ("Cum Actual Units", ("A100", "A300"))):
+            ws.append([])
+            ws.append(["Activity ID", "Budgeted Units", "Spreadsheet Field"] + weeks)
+            for activity_id in ids:
+                ws.append([activity_id, 10.0, field, 2.0, 4.0, 6.0])
+        wb.save(xlsx)
+        extractor.clear_workbook_sessions()
+
+        print("[1] every table on the sheet is detected, not just one per type")
+        tables = extractor.detect_expected_tables(str(xlsx))
+        assert [(t["type"], t["range"]) for t in tables] == [
+            ("activity_summary", "R1C1:R3C4"),
+            ("resource_assignments", "R5C1:R7C6"),
+            ("resource_assignments", "R9C1:R11C6"),
+        ]
+
+        print("[2] the per-table Activity ID report covers both assignments tables")
+        report = extractor.compare_activity_ids(str(xlsx))
+        assert [(t["range"], t["only_in_table"]) for t in report["tables"]] == [
+            ("R1C1:R3C4", 0),
+            ("R5C1:R7C6", 0),
+            ("R9C1:R11C6", 1),
+        ]
+        assert report["assign_only"] == ["A300"]
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _plain_norm_header(x) -> str:
+    # The header normalizer as it was before memoization (reference for the matchers).
+    text = str(x or "").strip().lower()
+    if not text:
+        return ""
+    text = re.sub(r"[^a-z0-9]+", " ", text.replace("%", " percent "))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _plain_find_idx(headers: list, candidates: list):
+    for cand in candidates:
+        for idx, h in enumerate(headers):
+            if _plain_norm_header(h) == _plain_norm_header(cand):
+                return idx
+    return None
+
+
+def test_header_matching() -> None:
+    header_rows = [
+        ["Activity ID", "Activity Name", "BL Project Finish", "Finish", "Units % Complete", "Budgeted Labor Units"],
+        ["ActivityID", "Baseline Project Finish", "Finish Date", "Percent Complete", "Start Date", "SpreadsheetField"],
+        ["  ACTIVITY   id ", "activity-name", "UNITS PERCENT COMPLETE", "budget units", "Spreadsheet  Field"],
+        ["Activité ID", "Écart", "Impact", "glissement", "Schedule %", "Earned %", "Planned Finish", "Forecast Finish"],
+        ["planned finish ", "FORECAST FINISH", "schedule  %", "earned %", "ECART", "impact", "Glissement"],
+        [None, "", " ", 1, 1.0, True, datetime(2026, 10, 12), "Finish", "Finish Date", "Activity ID", "Activity ID"],
+        ["Task Code", "Description", "% Complete", "Status", "Budgeted Units", "Cum Budgeted Units"],
+    ]
+    groups = (
+        extractor.SUMMARY_HEADER_GROUPS,
+        extractor.ASSIGN_HEADER_GROUPS,
+        extractor.SUMMARY_FIELD_VARIANTS,
+        extractor.ASSIGN_FIELD_VARIANTS,
+    )
+    required = [extractor._norm(c) for c in extractor.REQUIRED_COLS]
+
+    print("[1] header groups, required columns and suggested mappings match the plain matchers")
+    for headers in header_rows:
+        for group in groups:
+            names = {_plain_norm_header(h) for h in headers} - {""}
+            found = [key for key, opts in group.items() if any(_plain_norm_header(o) in names for o in opts)]
+            missing = [key for key in group if key not in found]
+            assert extractor._match_header_groups(headers, group) == (found, missing), (headers, found)
+        plain_required = all(rc in [re.sub(r"\s+", " ", str(h or "")).strip().lower() for h in headers] for rc in required)
+        assert extractor.has_all_required(headers) is plain_required, headers
+        for table_type in ("activity_summary", "resource_assignments"):
+            expected = {}
+            for canonical, names in extractor._table_field_variants(table_type).items():
+                idx = _plain_find_idx(headers, names)
+                if idx is not None:
+                    expected[canonical] = str(headers[idx]).strip()
+            assert extractor.suggest_column_mapping(headers, table_type) == expected, (headers, table_type)
+
+    print("[2] aliases, case/space/accent variants and mapped names")
+    assert extractor.suggest_column_mapping(header_rows[1], "activity_summary")["Activity ID"] == "ActivityID"
+    assert extractor.suggest_column_mapping(header_rows[2], "resource_assignments")["Budgeted Units"] == "budget units"
+    assert extractor.has_all_required(header_rows[4]) and not extractor.has_all_required(header_rows[3])
+    assert extractor._find_header_idx_norm(header_rows[6], ["task  CODE"]) == 0
+    assert extractor._find_header_idx_norm(header_rows[5], ["Activity ID"]) == 9
+    assert extractor._norm_header(1) == "1" and extractor._norm_header(1.0) == "1 0" and extractor._norm_header(True) == "true"
+    print("PASS")
+
+
+def test_week_index() -> None:
+    first = TODAY - timedelta(weeks=2)
+    headers = [
+        "Activity ID",
+        "Budgeted Units",
+        None,
+        datetime.combine(first + timedelta(days=2), datetime.min.time()),  # mid-week header
+        datetime.combine(first + timedelta(days=7), datetime.min.time()),
+        datetime.combine(first + timedelta(days=11), datetime.min.time()),  # same week: not its column
+        (first + timedelta(days=14)).isoformat(),  # date text
+        datetime.combine(first + timedelta(days=28), datetime.min.time()),  # a week without a column before it
+    ]
+    index = extractor._week_index(headers)
+
+    def linear(week, shift_days: int = 0):
+        return next(
+            (idx for idx, d in index.columns if extractor._week_start(d + timedelta(days=shift_days)) == week), None
+        )
+
+    print("[1] bisect finds the first column of each week, as a linear scan does")
+    assert [idx for idx, _ in index.columns] == [3, 4, 5, 6, 7]
+    weeks = [first + timedelta(weeks=k) for k in range(-2, 8)]
+    for shift_days in (0, extractor.PLANNED_WEEK_SHIFT_DAYS):
+        assert [index.column(w, shift_days) for w in weeks] == [linear(w, shift_days) for w in weeks]
+    assert index.column(first) == 3 and index.column(first + timedelta(weeks=1)) == 4
+    assert index.column(first + timedelta(weeks=2)) == 6 and index.column(first + timedelta(weeks=3)) is None
+
+    print("[2] planned (Cum Budgeted Units) headers count for the following week")
+    assert index.column(first, extractor.PLANNED_WEEK_SHIFT_DAYS) is None
+    assert index.column(first + timedelta(weeks=1), extractor.PLANNED_WEEK_SHIFT_DAYS) == 3
+    assert index.column(first + timedelta(weeks=5), extractor.PLANNED_WEEK_SHIFT_DAYS) == 7
+
+    print("[3] weeks before the first and after the last column have none")
+    assert index.column(first - timedelta(weeks=1)) is None and index.column(first + timedelta(weeks=5)) is None
+    assert index.column(first + timedelta(weeks=6), extractor.PLANNED_WEEK_SHIFT_DAYS) is None
+
+    print("[4] memoized per header values and types; unhashable headers still indexed")
+    assert extractor._week_index(list(headers)) is index
+    assert extractor._week_index(headers[:-1] + [1]) is not extractor._week_index(headers[:-1] + [1.0])
+    assert extractor._week_index(headers + [[1]]).column(first) == 3
+
+    print("[5] build_schedule_lookup reads the current week's planned column")
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+        for today, status, week_col in (
+            (TODAY, "ok", str(datetime.combine(TODAY - timedelta(weeks=1), datetime.min.time()))),
+            (TODAY + timedelta(days=3), "ok", str(datetime.combine(TODAY - timedelta(weeks=1), datetime.min.time()))),
+            (TODAY - timedelta(weeks=10), "week_not_found", None),
+            (TODAY + timedelta(weeks=10), "week_not_found", None),
+        ):
+            lookup, info = extractor.build_schedule_lookup(str(xlsx), today=today)
+            assert (info["status"], info["week_col"]) == (status, week_col), (today, info)
+            assert (lookup["A100"]["value"] is None) is (week_col is None)
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_weekly_progress_matrix() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+        session = extractor.open_workbook_session(str(xlsx))
+
+        print("[1] matrix is built once per session and reporting week")
+        matrix = extractor.build_weekly_progress_matrix(None, today=TODAY, session=session)
+        assert extractor.build_weekly_progress_matrix(None, today=TODAY, session=session) is matrix
+        assert set(matrix.activity_index) == {"PRJ", "PRJ.1", "A100", "A110", "PRJ.2", "A200"}
+        assert matrix.planned_pct.shape == (6, len(matrix.week_dates))
+
+        print("[2] build_weekly_progress slices the matrix row")
+        series, info = extractor.build_weekly_progress(None, "A100", today=TODAY, session=session)
+        assert info["status"] == "ok", info
+        row = matrix.row("A100")
+        assert [s["week_date"] for s in series] == matrix.week_dates
+        for k, point in enumerate(series):
+            if point["planned_cum"] is not None:
+                assert point["planned_cum"] == matrix.planned_cum_pct[row, k]
+        assert series[-1]["planned_cum"] == 100.0
+
+        print("[3] unknown activity keeps the per-activity status")
+        series, info = extractor.build_weekly_progress(None, "NOPE", today=TODAY, session=session)
+        assert info["status"] == "activity_not_found"
+        assert all(point["planned_cum"] is None for point in series[1:])
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_wbs_tree_metrics() -> None:
+    df = pd.DataFrame(
+        [
+            ["PRJ", datetime(2027, 1, 4), None, 0.5, 3],
+            ["  A100", " ", "12-Mar-27", "40%", None],
+        ],
+        columns=["Activity ID", "BL Project Finish", "Planned Finish", "Units % Complete", "Glissement"],
+    )
+    lookup = {
+        "PRJ": {"value": 50, "display": "50.00%", "budgeted_units": 200.0, "budget_cell": "S!B2"},
+        "A100": {"value": 25.0, "display": "25.00%", "budgeted_units": 50.0, "week_cell": "S!K3"},
+    }
+    meta = {"sheet": "Activities", "range": "A1:E3", "data_row_start": 2, "data_col_start": 1}
+    tree = extractor.to_wbs_tree(df, "Activity ID", schedule_lookup=lookup, source_meta=meta)
+
+    print("[1] root metrics")
+    root = tree["metrics"]
+    assert root["planned_finish"] == "04-Jan-27" and root["earned"] == 50 and root["ecart"] == 0
+    assert root["impact_display"] == "+0.00%" and root["glissement_display"] == "3d"
+    assert root["planned_tip"].endswith("- BL Project Finish: Activities!B2")
+
+    print("[2] blank cells fall back to the alternate column")
+    child = tree["children"][0]["metrics"]
+    assert child["planned_finish"] == "12-Mar-27"
+    assert child["planned_tip"].endswith("- Planned Finish: Activities!C3")
+    assert child["ecart"] == 15.0 and child["impact"] == 3.75
+    assert child["glissement"] is None and child["glissement_display"] == "?"
+    assert "- Schedule: S!K3" in child["ecart_tip"]
+
+    print("[3] compact tree views")
+    nested = tree.to_dict()
+    assert list(tree) == ["label", "level", "activity_id", "metrics", "children"]
+    assert list(root) == list(nested["metrics"]) and len(root) == 21
+    assert tree == nested and repr(tree) == repr(nested)
+    assert pickle.loads(pickle.dumps(tree)) == nested
+    tree["children"][0]["label"] = "A100 - Renamed"
+    assert tree.to_dict()["children"][0]["label"] == "A100 - Renamed"
+    print("PASS")
+
+
+def test_cell_refs_render_on_demand() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+        rows = extractor.build_preview_rows(str(xlsx), prefer_first_table=True)
+
+        print("[1] preview rows carry CellRef coordinates")
+        ref = rows[0]["units_complete_cell"]
+        assert isinstance(ref, extractor.CellRef)
+        assert str(ref) == ref.a1 == f"{ref}" and ref == ref.a1
+        assert pickle.loads(pickle.dumps(ref)) == ref
+
+        print("[2] A1 rendering")
+        assert extractor.CellRef("Activities", 12, 3).a1 == "Activities!C12"
+        assert extractor.CellRef("Ressource Assign. Budgeted", 2, 28).a1 == "'Ressource Assign. Budgeted'!AB2"
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+_PREVIEW_FIELDS = (
+    ("Activity Name", None),
+    ("Activity Status", "activity_status"),
+    ("Units % Complete", "units_complete"),
+    ("BL Project Finish", "bl_project_finish"),
+    ("Finish", "finish"),
+    ("Variance - BL Project Finish Date", "variance_days"),
+    ("Budgeted Labor Units", "budgeted_units"),
+)
+
+
+def _cell_walk_preview_rows(wb, mapping: dict) -> list[dict]:
+    """The original prefer_first_table algorithm: every row of every sheet, cell by cell."""
+    variants = extractor._table_field_variants("activity_summary")
+
+    def idx(header: list, canonical: str):
+        mapped = mapping.get(canonical)
+        return extractor._find_header_idx_norm(header, [mapped] if mapped else variants.get(canonical, [canonical]))
+
+    for ws in wb.worksheets:
+        max_r, max_c = ws.max_row, ws.max_column
+        for r in range(1, max_r + 1):
+            headers = [ws.cell(r, c).value for c in range(1, max_c + 1)]
+            nz = [i + 1 for i, v in enumerate(headers) if v not in (None, "", " ")]
+            if not nz:
+                continue
+            c1, c2 = min(nz), max(nz)
+            header = [ws.cell(r, c).value for c in range(c1, c2 + 1)]
+            id_idx = idx(header, "Activity ID")
+            if id_idx is None:
+                continue
+            cols = {name: idx(header, name) for name, _ in _PREVIEW_FIELDS}
+            r2 = r + 1
+            while r2 <= max_r and not all(ws.cell(r2, c).value in (None, "", " ") for c in range(c1, c2 + 1)):
+                r2 += 1
+            rows = []
+            for rr in range(r + 1, r2):
+                id_val = ws.cell(rr, c1 + id_idx).value
+                if id_val is None or str(id_val).strip() == "":
+                    continue
+                raw_id = str(id_val)
+                name_idx = cols["Activity Name"]
+                name_val = ws.cell(rr, c1 + name_idx).value if name_idx is not None else None
+                name_text = str(name_val).strip() if name_val is not None else ""
+                row = {
+                    "sheet": ws.title,
+                    "range": f"R{r}C{c1}:R{r2 - 1}C{c2}",
+                    "raw": raw_id,
+                    "label": name_text or raw_id.strip(),
+                    "display_label": f"{raw_id.strip()} - {name_text}".strip(" -"),
+                    "indent": len(raw_id) - len(raw_id.lstrip()),
+                    "activity_name": name_text,
+                    "activity_id": raw_id.strip(),
+                }
+                for name, key in _PREVIEW_FIELDS[1:]:
+                    c = cols[name]
+                    row[key] = ws.cell(rr, c1 + c).value if c is not None else None
+                for name, key in _PREVIEW_FIELDS[2:6]:
+                    c = cols[name]
+                    row[f"{key}_cell"] = extractor.CellRef(ws.title, rr, c1 + c) if c is not None else None
+                rows.append(row)
+            if rows:
+                levels = {sp: i for i, sp in enumerate(sorted({row["indent"] for row in rows}))}
+                for row in rows:
+                    row["level"] = levels[row["indent"]]
+                return rows
+    return []
+
+
+def test_first_table_preview_rows() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        xlsx = tmp_path / "offset.xlsx"
+        wb = Workbook()
+        notes = wb.active
+        notes.title = "Notes"
+        notes.append(["Exported from P6", None, "Activity"])
+        ws = wb.create_sheet("Export")
+        ws.append([])
+        ws.append([None, None, "Task Code", "Activity Name"])  # header row without data
+        ws.append([])
+        header = [None, None, "Task Code", "Activity Name", "Status", "Units % Complete", "BL Project Finish",
+                  "Finish", "Variance - BL Project Finish Date", "Budgeted Labor Units"]
+        ws.append(header)
+        data = [
+            ("PRJ", None, None, 0.5, 300),
+            ("  PRJ.1", "Civil", "In Progress", "60%", 200.0),
+            (None, "no id, still in the block", None, None, None),
+            ("    A100", " Excavation ", "In Progress", 0.75, 120.0),
+            ("    A110", None, "Not Started", None, 80),
+        ]
+        for activity_id, name, status, pct, budget in data:
+            ws.append([None, None, activity_id, name, status, pct, datetime(2027, 1, 4), "2027-01-11", -5, budget])
+        ws.append([])
+        ws.append([None, None, "Task Code", "Activity Name"])
+        ws.append([None, None, "Z999", "second block"])
+        wb.save(xlsx)
+        mapping = {"activity_summary": {"Activity ID": "Task Code", "Activity Status": "Status"}}
+
+        print("[1] same rows, field by field, as the cell-by-cell walk (blank rows, offset columns, mapped header)")
+        extractor.clear_workbook_sessions()
+        session = extractor.open_workbook_session(str(xlsx))
+        for column_mapping in (None, mapping):
+            rows = extractor.build_preview_rows(
+                None, prefer_first_table=True, column_mapping=column_mapping, session=session
+            )
+            expected = _cell_walk_preview_rows(session.wb, (column_mapping or {}).get("activity_summary", {}))
+            assert len(rows) == len(expected), (len(rows), len(expected))
+            for got, want in zip(rows, expected):
+                assert set(got) == set(want) and all(repr(got[k]) == repr(want[k]) for k in want), (got, want)
+        assert [row["activity_id"] for row in rows] == ["PRJ", "PRJ.1", "A100", "A110"]
+        assert rows[0]["range"] == "R4C3:R9C10" and rows[2]["units_complete_cell"] == "Export!F8"
+
+        print("[2] 10k activities in well under a second")
+        big = tmp_path / "big.xlsx"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Activities")
+        ws.append(header[2:])
+        for i in range(10_000):
+            ws.append([f"    A{i:05d}", f"Task {i}", "Not Started", 0.5, datetime(2027, 1, 4), datetime(2027, 1, 11), -3, 10.0])
+        wb.save(big)
+        session = extractor.open_workbook_session(str(big))
+        session.catalog()
+        t0 = perf_counter()
+        rows = extractor.build_preview_rows(None, prefer_first_table=True, column_mapping=mapping, session=session)
+        elapsed = perf_counter() - t0
+        assert len(rows) == 10_000 and elapsed < 1.0, elapsed
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_parallel_extraction_matches_serial() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved = {k: os.environ.get(k) for k in ("WBS_EXTRACT_WORKERS", "WBS_EXTRACT_EXECUTOR", "WBS_SCAN_ALL_BLOCKS")}
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        os.environ["WBS_SCAN_ALL_BLOCKS"] = "1"
+        results = {}
+        for workers, executor in (("1", "process"), ("2", "process"), ("2", "thread")):
+            print(f"[1] {workers} {executor} worker(s)")
+            os.environ["WBS_EXTRACT_WORKERS"] = workers
+            os.environ["WBS_EXTRACT_EXECUTOR"] = executor
+            extractor.clear_workbook_sessions()
+            wb = extractor._load_workbook_fast(str(xlsx))
+            cells = [
+                (ws.title, list(ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column, values_only=True)))
+                for ws in wb.worksheets
+            ]
+            results[(workers, executor)] = (cells, repr(extractor.extract_all_wbs(str(xlsx))))
+        serial = results[("1", "process")]
+        assert all(result == serial for result in results.values())
+        print("PASS")
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_tracing_spans() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved = extractor.TRACER
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+
+        print("[1] disabled tracer hands out the shared no-op span")
+        off = extractor.Tracer(enabled=False)
+        assert off.span("parse") is off.start_request("page") is extractor._NO_SPAN
+        assert off.end_request() is None and off.last() is None
+
+        print("[2] request trace nests the extraction stages")
+        trace_file = tmp_path / "trace.jsonl"
+        extractor.TRACER = extractor.Tracer(enabled=True, path=str(trace_file), echo=False)
+        extractor.TRACER.start_request("page")
+        extractor.extract_all_wbs(str(xlsx))
+        with extractor.trace_span("render"):
+            pass
+        trace = extractor.TRACER.end_request()
+        assert trace["name"] == "page" and [c["name"] for c in trace["children"]] == ["extract", "render"]
+        names = set()
+        stack = list(trace["children"])
+        while stack:
+            span = stack.pop()
+            names.add(span["name"])
+            stack.extend(span["children"])
+        assert {"open", "parse", "detect", "load_table", "lookup", "tree"} <= names
+
+        print("[3] finished requests are appended to the JSONL file")
+        lines = trace_file.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1 and json.loads(lines[0]) == json.loads(json.dumps(trace, default=str))
+        print("PASS")
+    finally:
+        extractor.TRACER = saved
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _span_attrs(trace: dict, name: str) -> list[dict]:
+    found = []
+    stack = list(trace["children"])
+    while stack:
+        span = stack.pop()
+        if span["name"] == name:
+            found.append(span["attrs"])
+        stack.extend(span["children"])
+    return found
+
+
+def _reupload(xlsx: Path, edit) -> None:
+    wb = load_workbook(xlsx)
+    edit(wb)
+    wb.save(xlsx)
+    stat = xlsx.stat()
+    os.utime(xlsx, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_incremental_reupload() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved = extractor.TRACER
+    try:
+        xlsx = tmp_path / "project.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+        extractor.TRACER = extractor.Tracer(enabled=True, path="", echo=False)
+
+        def extract() -> tuple[str, dict]:
+            extractor.TRACER.start_request("upload")
+            lookup, info = extractor.build_schedule_lookup(str(xlsx), today=TODAY)
+            packs = extractor.extract_all_wbs(str(xlsx), lookup, info)
+            return repr((lookup, info, packs)), extractor.TRACER.end_request()
+
+        def fresh() -> str:
+            extractor.clear_workbook_sessions()
+            return extract()[0]
+
+        extract()
+        print("[1] one edited value: tables and schedule scan carried over, one row recomputed")
+        _reupload(xlsx, lambda wb: wb["Activities"].cell(row=4, column=6, value=0.8))
+        result, trace = extract()
+        assert extractor.open_workbook_session(str(xlsx)).previous is not None
+        assert _span_attrs(trace, "detect")[0].get("reused") is True
+        assert _span_attrs(trace, "scan_table")[0].get("reused") is True
+        assert _span_attrs(trace, "metrics")[0]["recomputed"] == 1
+        assert "0.80%" not in result and "80.00%" in result
+        assert result == fresh()
+
+        print("[2] table moved down a row: full rebuild, same result as a fresh extraction")
+        extract()
+        _reupload(xlsx, lambda wb: wb["Activities"].insert_rows(1))
+        result, trace = extract()
+        assert _span_attrs(trace, "detect")[0].get("reused") is None
+        assert _span_attrs(trace, "metrics")[0]["recomputed"] == 6
+        assert result == fresh()
+        print("PASS")
+    finally:
+        extractor.TRACER = saved
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_batch_ndjson() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    try:
+        for name in ("p1/latest.xlsx", "p2/latest.xlsx"):
+            (tmp_path / name).parent.mkdir()
+            _write_workbook(tmp_path / name)
+        (tmp_path / "broken.xlsx").write_text("not a workbook", encoding="utf-8")
+        (tmp_path / "~$broken.xlsx").write_text("lock file", encoding="utf-8")
+        extractor.clear_workbook_sessions()
+
+        print("[1] directory input finds every workbook, lock files skipped")
+        paths = extractor.batch_inputs(str(tmp_path))
+        assert [Path(p).relative_to(tmp_path).as_posix() for p in paths] == [
+            "broken.xlsx",
+            "p1/latest.xlsx",
+            "p2/latest.xlsx",
+        ]
+
+        print("[2] one compact record per table, same packs as extract_all_wbs")
+        workers_env = os.environ.get("WBS_EXTRACT_WORKERS")
+        results = {r["file"]: r for r in extractor.extract_batch(paths, workers=2)}
+        assert set(results) == set(paths)
+        expected = json.loads(json.dumps(extractor.extract_all_wbs(paths[1]), default=extractor._json_default))
+        lines = results[paths[1]]["lines"]
+        assert len(lines) == len(expected) and "\n" not in lines[0] and ", " not in lines[0][:40]
+        record = json.loads(lines[0])
+        assert record.pop("file") == paths[1] and record == expected[0]
+        assert not extractor._SESSIONS or list(extractor._SESSIONS) == [os.path.abspath(paths[1])]
+
+        print("[3] a broken file is reported, not raised")
+        assert results[paths[0]]["error"] and not results[paths[0]]["lines"]
+        assert os.environ.get("WBS_EXTRACT_WORKERS") == workers_env
+        print("PASS")
+    finally:
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_ingest_artifact() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("SKIP (pyarrow not installed)")
+        return
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved = extractor.TRACER
+    try:
+        xlsx = tmp_path / "latest.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+        extractor.TRACER = extractor.Tracer(enabled=True, path="", echo=False)
+
+        def extract() -> tuple[str, dict]:
+            extractor.clear_workbook_sessions()
+            extractor.TRACER.start_request("page")
+            lookup, info = extractor.build_schedule_lookup(str(xlsx), today=TODAY)
+            packs = extractor.extract_all_wbs(str(xlsx), lookup, info)
+            headers = extractor.get_table_headers(str(xlsx), "resource_assignments")
+            return repr((lookup, info, packs, headers)), extractor.TRACER.end_request()
+
+        expected, _ = extract()
+        print("[1] ingest writes the sheets and a manifest of the tables next to the upload")
+        target = extractor.ingest_workbook(str(xlsx))
+        assert target == extractor.ingest_dir(str(xlsx)) and target.parent == tmp_path
+        manifest = json.loads((target / "manifest.json").read_text(encoding="utf-8"))
+        assert manifest["fingerprint"] == extractor._file_fingerprint(str(xlsx))
+        assert [t["range"] for t in manifest["tables"]] == [
+            t["range"] for t in extractor.detect_expected_tables(str(xlsx))
+        ]
+        assert all(t["week_columns"] for t in manifest["tables"] if t["type"] == "resource_assignments")
+
+        print("[2] cold session loads the artifact: no detection, same results")
+        result, trace = extract()
+        assert _span_attrs(trace, "parse")[0].get("source") == "ingest"
+        assert _span_attrs(trace, "detect")[0].get("reused") is True
+        assert result == expected
+
+        print("[3] a newer upload at the same path ignores the stale artifact")
+        _reupload(xlsx, lambda wb: wb["Activities"].cell(row=4, column=6, value=0.8))
+        result, trace = extract()
+        assert _span_attrs(trace, "parse")[0].get("source") is None
+        assert result != expected
+        extractor.remove_ingest_artifact(str(xlsx))
+        assert not target.exists()
+        print("PASS")
+    finally:
+        extractor.TRACER = saved
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_extraction_jobs() -> None:
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved_cache_dir = excel_cache._CACHE_DIR
+    saved_tracer = extractor.TRACER
+    try:
+        excel_cache._CACHE_DIR = tmp_path / "cache"
+        xlsx = tmp_path / "latest.xlsx"
+        _write_workbook(xlsx)
+        broken = tmp_path / "broken.xlsx"
+        broken.write_text("not a workbook", encoding="utf-8")
+        extractor.clear_workbook_sessions()
+        extraction_jobs.clear_jobs()
+
+        print("[1] one job per file version, mapping and day (a new one when ingest is asked for)")
+        job = extraction_jobs.submit_extraction(str(xlsx), today=TODAY)
+        assert extraction_jobs.submit_extraction(str(xlsx), today=TODAY) is job
+        assert job.wait(60) and job.status == extraction_jobs.DONE
+        status = extraction_jobs.job_status(job.id)
+        assert status["status"] == "done" and status["progress"] == 1.0 and status["error"] is None
+        assert extraction_jobs.submit_extraction(str(xlsx), today=TODAY + timedelta(days=7)) is not job
+        ingested = extraction_jobs.submit_extraction(str(xlsx), today=TODAY, ingest=True)
+        assert ingested is not job and ingested.wait(60) and ingested.status == extraction_jobs.DONE
+        assert extraction_jobs.submit_extraction(str(xlsx), today=TODAY) is ingested
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            assert extractor.ingest_is_current(str(xlsx)), "ingest skipped for a reused file version"
+
+        print("[2] results match the direct calls; the session is left warm")
+        lookup, info = extractor.build_schedule_lookup(str(xlsx), today=TODAY)
+        assert repr(job.result["packs"]) == repr(extractor.extract_all_wbs(str(xlsx), lookup, info))
+        assert job.result["schedule_lookup"] == lookup
+        assert extractor.open_workbook_session(str(xlsx)).path in extractor._SESSIONS
+
+        print("[3] a failure is reported through the status, retried only when asked")
+        failed = extraction_jobs.submit_extraction(str(broken), today=TODAY)
+        assert failed.wait(60) and failed.status == extraction_jobs.FAILED and failed.error
+        assert extraction_jobs.job_status(failed.id)["error"] == failed.error
+        assert extraction_jobs.submit_extraction(str(broken), today=TODAY) is failed
+        retry = extraction_jobs.submit_extraction(str(broken), today=TODAY, retry=True)
+        assert retry is not failed and retry.wait(60) and retry.status == extraction_jobs.FAILED
+        assert extraction_jobs.submit_extraction(str(broken), today=TODAY) is retry
+
+        print("[4] after a restart the disk cache answers without opening the workbook")
+        series = job.result["weekly_matrix"].series("A100")
+        assert series == extractor.build_weekly_progress(str(xlsx), "A100", today=TODAY)
+        extraction_jobs.clear_jobs()
+        extractor.clear_workbook_sessions()
+        extractor.TRACER = extractor.Tracer(enabled=True, path="", echo=False)
+        cached = extraction_jobs.submit_extraction(str(xlsx), today=TODAY)
+        assert cached is not job and cached.wait(60) and cached.status == extraction_jobs.DONE
+        assert not extractor._SESSIONS
+        assert _span_attrs(cached.trace, "disk_cache")[0]["hit"] is True
+        assert repr({k: v for k, v in cached.result.items() if k != "weekly_matrix"}) == repr(
+            {k: v for k, v in job.result.items() if k != "weekly_matrix"}
+        )
+        assert cached.result["weekly_matrix"].series("A100") == series
+        print("PASS")
+    finally:
+        excel_cache._CACHE_DIR = saved_cache_dir
+        extractor.TRACER = saved_tracer
+        extraction_jobs.clear_jobs()
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_snapshot_history() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("SKIP (pyarrow not installed)")
+        return
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved_dir = snapshot_history.PROJECTS_DIR
+    saved_cache_dir = excel_cache._CACHE_DIR
+    try:
+        snapshot_history.PROJECTS_DIR = tmp_path / "projects"
+        excel_cache._CACHE_DIR = tmp_path / "cache"
+        xlsx = tmp_path / "latest.xlsx"
+        _write_workbook(xlsx)
+        extractor.clear_workbook_sessions()
+        extraction_jobs.clear_jobs()
+        snapshot_history.clear_history_cache()
+
+        def record(day: date) -> extraction_jobs.ExtractionJob:
+            job = extraction_jobs.submit_extraction(str(xlsx), today=day)
+            job.add_done_callback(
+                lambda done: snapshot_history.record_snapshot(
+                    "p1", day, done.result["preview_rows"], done.result["schedule_lookup"], file_name="latest.xlsx"
+                )
+            )
+            assert job.wait(60) and job.status == extraction_jobs.DONE
+            return job
+
+        print("[1] job callbacks record one file per snapshot date")
+        first = record(TODAY - timedelta(weeks=1))
+        assert snapshot_history.list_snapshots("p1") == [TODAY - timedelta(weeks=1)]
+        second = record(TODAY)
+        assert snapshot_history.list_snapshots("p1") == [TODAY - timedelta(weeks=1), TODAY]
+
+        print("[2] activity history holds the Dashboard metrics per snapshot")
+        history = snapshot_history.activity_history("p1", "A100")
+        assert list(history.index.date) == [TODAY - timedelta(weeks=1), TODAY]
+        assert history["earned"].tolist() == [75.0, 75.0]
+        expected = [job.result["schedule_lookup"]["A100"]["value"] for job in (first, second)]
+        assert history["schedule"].tolist() == expected
+        assert history["spi"].tolist() == [75.0 / v for v in expected]
+        assert history["budgeted_units"].tolist() == [120.0, 120.0]
+        assert snapshot_history.activity_history("p1", "missing").empty
+
+        print("[3] the roll-up of the single top-level row is that row")
+        rollup = snapshot_history.rollup_history("p1")
+        root = snapshot_history.activity_history("p1", "PRJ")
+        pd.testing.assert_frame_equal(rollup, root, check_names=False, check_freq=False)
+
+        print("[4] re-recording a day replaces it; queries see the new file")
+        lookup = dict(second.result["schedule_lookup"], A100={"value": 50.0})
+        snapshot_history.record_snapshot("p1", TODAY, second.result["preview_rows"], lookup)
+        history = snapshot_history.activity_history("p1", "A100")
+        assert len(history) == 2 and history["schedule"].iloc[-1] == 50.0 and history["spi"].iloc[-1] == 1.5
+
+        print("[5] roll-ups weight by budget per snapshot, plain means for one without budgets")
+
+        def rows(budgets: tuple, earned: tuple) -> list[dict]:
+            return [
+                {"activity_id": activity_id, "level": 0, "units_complete": pct, "budgeted_units": budget}
+                for activity_id, budget, pct in zip(("X", "Y"), budgets, earned)
+            ]
+
+        schedule = {"X": {"value": 40.0}, "Y": {"value": 80.0}}
+        snapshot_history.record_snapshot("p2", TODAY - timedelta(weeks=1), rows((100.0, 300.0), (0.5, 1.0)), schedule)
+        snapshot_history.record_snapshot("p2", TODAY, rows((None, None), (0.6, 0.8)), schedule)
+        rollup = snapshot_history.rollup_history("p2")
+        assert rollup["earned"].tolist() == [87.5, 70.0] and rollup["schedule"].tolist() == [70.0, 60.0]
+        print("PASS")
+    finally:
+        snapshot_history.PROJECTS_DIR = saved_dir
+        excel_cache._CACHE_DIR = saved_cache_dir
+        snapshot_history.clear_history_cache()
+        extraction_jobs.clear_jobs()
+        extractor.clear_workbook_sessions()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def test_content_addressed_uploads() -> None:
+    import streamlit as st
+
+    tmp_path = Path(tempfile.mkdtemp(prefix="chronoplan-extract-"))
+    saved = (
+        projects_module.PROJECTS_PATH,
+        projects_module.PROJECTS_DIR,
+        projects_module.PROJECTS_LOCK_PATH,
+        snapshot_history.PROJECTS_DIR,
+        excel_cache._CACHE_DIR,
+    )
+    try:
+        projects_module.PROJECTS_PATH = tmp_path / "projects.json"
+        projects_module.PROJECTS_DIR = tmp_path / "projects"
+        projects_module.PROJECTS_LOCK_PATH = tmp_path / "projects.json.lock"
+        snapshot_history.PROJECTS_DIR = tmp_path / "projects"
+        excel_cache._CACHE_DIR = tmp_path / "cache"
+        extraction_jobs.clear_jobs()
+        xlsx = tmp_path / "export.xlsx"
+        _write_workbook(xlsx)
+        data = xlsx.read_bytes()
+        owner = "acct:sub:dedup"
+
+        def upload(project: dict, name: str) -> dict:
+            st.session_state.clear()
+            projects_module.store_project_upload(project, _Upload(name, data))
+            return projects_module.get_project(project["id"], owner_id=owner)
+
+        print("[1] two projects uploading the same bytes share one stored file")
+        first = upload(projects_module.create_project("A", owner_id=owner), "week41.xlsx")
+        stored = Path(first["file_path"])
+        mtime = stored.stat().st_mtime_ns
+        assert first["content_hash"] == excel_cache.content_hash(xlsx) and stored.name.startswith(first["content_hash"])
+        second = upload(projects_module.create_project("B", owner_id=owner), "copy.xlsx")
+        assert second["file_path"] == first["file_path"] and stored.stat().st_mtime_ns == mtime
+        assert len(list(stored.parent.glob("*.xlsx"))) == 1
+        job = extraction_jobs.submit_extraction(
+            str(stored), column_mapping={"activity_summary": {}, "resource_assignments": {}}
+        )
+        assert job.wait(60) and job.status == extraction_jobs.DONE
+
+        print("[2] disk cache entries are keyed by content, not path")
+        lookup, info = extractor.build_schedule_lookup(str(xlsx), today=TODAY)
+        excel_cache.save_schedule_preview_cache(
+            str(xlsx), None, TODAY, schedule_lookup=lookup, schedule_info=info, preview_rows=[]
+        )
+        hit = excel_cache.load_schedule_preview_cache(str(stored), None, TODAY)
+        assert hit is not None and hit["schedule_lookup"] == lookup
+
+        print("[3] a re-upload re-extracts from the prior upload; the stored file stays until its last project lets go")
+        _reupload(xlsx, lambda wb: wb["Activities"].cell(row=4, column=6, value=0.8))
+        data = xlsx.read_bytes()
+        first = upload(first, "week42.xlsx")
+        assert first["file_path"] != second["file_path"] and stored.exists()
+        job = extraction_jobs.submit_extraction(
+            first["file_path"], column_mapping={"activity_summary": {}, "resource_assignments": {}}
+        )
+        assert job.wait(60) and job.status == extraction_jobs.DONE
+        session = extractor.open_workbook_session(first["file_path"])
+        assert session.previous is not None, "re-upload under a new path did not get the prior snapshot"
+        assert projects_module.delete_project(second["id"], owner_id=owner)
+        assert not stored.exists() and Path(first["file_path"]).exists()
+        print("PASS")
+    finally:
+        for job_id in list(extraction_jobs._JOBS):
+            extraction_jobs.get_job(job_id).wait(60)
+        extraction_jobs.clear_jobs()
+        extractor.clear_workbook_sessions()
+        (
+            projects_module.PROJECTS_PATH,
+            projects_module.PROJECTS_DIR,
+            projects_module.PROJECTS_LOCK_PATH,
+            snapshot_history.PROJECTS_DIR,
+            excel_cache._CACHE_DIR,
+        ) = saved
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_workbook_session_reuse()
+    test_columnar_sheet_roundtrip()
+    test_calamine_loader_matches_pandas()
+    test_header_probe_matches_full_parse()
+    test_detect_tables_sharing_a_sheet()
+    test_header_matching()
+    test_week_index()
+    test_weekly_progress_matrix()
+    test_wbs_tree_metrics()
+    test_cell_refs_render_on_demand()
+    test_first_table_preview_rows()
+    test_parallel_extraction_matches_serial()
+    test_tracing_spans()
+    test_incremental_reupload()
+    test_batch_ndjson()
+    test_ingest_artifact()
+    test_extraction_jobs()
+    test_snapshot_history()
+    test_content_addressed_uploads()
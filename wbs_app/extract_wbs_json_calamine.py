@@ -1,17 +1,28 @@
 # extract_wbs_json_v7.py
 # Usage: python extract_wbs_json_v7.py Book1.xlsx --out wbs_all.json
 from __future__ import annotations
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-import argparse, json, re
+from typing import List, Dict, Any, Tuple, Callable
+import argparse, bisect, functools, glob, hashlib, json, re
 import os
+import pickle
+import shutil
+import sys
+import threading
 from time import perf_counter
+import numpy as np
 import pandas as pd
 from datetime import datetime, date, timedelta
+from python_calamine import CalamineWorkbook
 
 # --- Calamine-based workbook loader (fast, no openpyxl) ---
-# Uses pandas' calamine engine to read sheets as raw values, then exposes a tiny
-# openpyxl-like API used by the rest of this file (iter_rows, cell, max_row/max_column).
+# Reads sheets with python-calamine directly (same cell conversions as pandas'
+# calamine engine), then exposes a tiny openpyxl-like API used by the rest of this
+# file (iter_rows, cell, max_row/max_column).
 
 # Sheets to scan (keep narrow for speed)
 WANTED_SHEETS = [
@@ -59,24 +70,207 @@ class _Cell:
     def __init__(self, value):
         self.value = value
 
+_EXACT_FLOAT_INT = 2 ** 53
+
+def _is_null(v: Any) -> bool:
+    return v is None or (isinstance(v, float) and v != v)
+
+_TYPE_OF = np.frompyfunc(type, 1, 1)
+
+class _Column:
+    """One sheet column: float64 storage for mostly-numeric columns, object storage otherwise.
+
+    ``null`` flags empty cells (NaN/None). Numeric columns hold Python int/float
+    cells in ``values`` with an ``ints`` mask so integral values come back as int;
+    any other cell (header rows, notes, dates) lives in the sparse ``other`` dict.
+    """
+
+    __slots__ = ("values", "null", "ints", "other")
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        null: np.ndarray,
+        ints: np.ndarray | None = None,
+        other: Dict[int, Any] | None = None,
+    ):
+        self.values = values
+        self.null = null
+        self.ints = ints
+        self.other = other or {}
+
+    @property
+    def numeric(self) -> bool:
+        return self.values.dtype != object
+
+    @classmethod
+    def pack(
+        cls,
+        raw: Any,
+        types: np.ndarray | None = None,
+        integral_floats: bool = False,
+    ) -> "_Column":
+        """Pack one column of cell values.
+
+        ``types`` may carry precomputed ``type(v)`` per cell. ``integral_floats`` is
+        for raw calamine reads: integral floats come back as int (pandas' conversion)
+        and repeated labels/dates in object columns share one object.
+        """
+        raw = np.asarray(raw, dtype=object)
+        n = len(raw)
+        if types is None:
+            types = _TYPE_OF(raw) if n else np.empty(0, dtype=object)
+        is_float = np.equal(types, float)
+        is_int = np.equal(types, int)
+        null = np.equal(types, type(None))
+        number = is_float | is_int
+        values = np.full(n, np.nan)
+        float_ints = None
+        if number.any():
+            values[number] = raw[number].astype(np.float64)
+            nan = is_float & np.isnan(values)
+            null |= nan
+            number &= ~nan
+            if integral_floats:
+                float_ints = is_float & number & np.isfinite(values) & (values == np.trunc(values))
+        rest = np.flatnonzero(~(number | null | np.equal(types, str)))
+        for r in rest.tolist():
+            if _is_null(raw[r]):
+                null[r] = True
+        n_number = int(number.sum())
+        other_rows = np.flatnonzero(~(number | null))
+        if n_number and len(other_rows) <= n_number:
+            ints = is_int & number
+            if np.all(np.abs(values[ints]) < _EXACT_FLOAT_INT):
+                if float_ints is not None:
+                    ints |= float_ints
+                return cls(
+                    values,
+                    null,
+                    ints if ints.any() else None,
+                    {r: raw[r] for r in other_rows.tolist()},
+                )
+        values = raw.copy()
+        values[null] = None
+        if float_ints is not None:
+            for r in np.flatnonzero(float_ints).tolist():
+                values[r] = int(raw[r])
+        if integral_floats and n:
+            # Fresh reads create one object per cell; share repeated labels/dates.
+            shared: Dict[Any, Any] = {}
+            for r in np.flatnonzero(~null).tolist():
+                v = values[r]
+                if type(v) is not float:
+                    values[r] = shared.setdefault((type(v), v), v)
+        return cls(values, null)
+
+    @classmethod
+    def concat(cls, parts: List["_Column"]) -> "_Column":
+        """Join row chunks packed separately (see _load_sheet_calamine)."""
+        if len(parts) == 1:
+            return parts[0]
+        null = np.concatenate([p.null for p in parts])
+        if not all(p.numeric for p in parts):
+            values = np.empty(len(null), dtype=object)
+            start = 0
+            for p in parts:
+                n = len(p.null)
+                values[start : start + n] = p.to_list(0, n) if p.numeric else p.values
+                start += n
+            return cls(values, null)
+        values = np.concatenate([p.values for p in parts])
+        ints = None
+        if any(p.ints is not None for p in parts):
+            ints = np.concatenate(
+                [p.ints if p.ints is not None else np.zeros(len(p.null), dtype=bool) for p in parts]
+            )
+        other: Dict[int, Any] = {}
+        start = 0
+        for p in parts:
+            for r, v in p.other.items():
+                other[start + r] = v
+            start += len(p.null)
+        return cls(values, null, ints, other)
+
+    def to_list(self, r1: int, r2: int) -> list:
+        """Python values for rows [r1, r2) (0-based), None for empty cells."""
+        out = self.values[r1:r2].tolist()
+        if self.numeric:
+            null = self.null[r1:r2]
+            if null.any():
+                for i in np.flatnonzero(null).tolist():
+                    out[i] = None
+            if self.ints is not None:
+                ints = self.ints[r1:r2]
+                if ints.any():
+                    for i in np.flatnonzero(ints).tolist():
+                        out[i] = int(out[i])
+            for r, v in self.other.items():
+                if r1 <= r < r2:
+                    out[r - r1] = v
+        return out
+
+    def get(self, r: int) -> Any:
+        if self.null[r]:
+            return None
+        v = self.values[r]
+        if not self.numeric:
+            return v
+        if r in self.other:
+            return self.other[r]
+        if self.ints is not None and self.ints[r]:
+            return int(v)
+        return float(v)
+
 class _Sheet:
-    def __init__(self, title: str, data: list[list]):
+    """Columnar sheet store with the small openpyxl-like API used in this file."""
+
+    def __init__(self, title: str, columns: list[_Column], max_row: int, truncated: bool = False):
         self.title = title
-        self._data = data or []
-        self.max_row = len(self._data)
-        self.max_column = max((len(r) for r in self._data), default=0)
+        self._columns = columns
+        self.max_row = max_row
+        self.max_column = len(columns)
+        # True when the loader stopped at a row/column cap (header probes).
+        self.truncated = truncated
+
+    @classmethod
+    def from_rows(cls, title: str, data: list[list]) -> "_Sheet":
+        data = data or []
+        max_row = len(data)
+        max_col = max((len(r) for r in data), default=0)
+        columns = []
+        for c in range(max_col):
+            columns.append(_Column.pack([row[c] if c < len(row) else None for row in data]))
+        return cls(title, columns, max_row)
+
+    @classmethod
+    def from_frame(cls, title: str, df: pd.DataFrame) -> "_Sheet":
+        columns = [_Column.pack(df.iloc[:, c].to_numpy(dtype=object)) for c in range(df.shape[1])]
+        return cls(title, columns, df.shape[0])
+
+    def column(self, col: int, min_row: int = 1, max_row: int | None = None) -> np.ndarray:
+        """Zero-copy view of column ``col`` (1-based) rows min_row..max_row.
+
+        Numeric columns are float64 with NaN for empty and non-numeric cells (check
+        ``column_is_numeric``); other columns are object arrays with None for empty cells.
+        """
+        stop = self.max_row if max_row is None else min(max_row, self.max_row)
+        return self._columns[col - 1].values[max(min_row, 1) - 1 : max(stop, 0)]
+
+    def null_mask(self, col: int, min_row: int = 1, max_row: int | None = None) -> np.ndarray:
+        """Zero-copy view of the empty-cell mask matching ``column``."""
+        stop = self.max_row if max_row is None else min(max_row, self.max_row)
+        return self._columns[col - 1].null[max(min_row, 1) - 1 : max(stop, 0)]
+
+    def column_is_numeric(self, col: int) -> bool:
+        return self._columns[col - 1].numeric
 
     def cell(self, row: int, column: int):
         r = row - 1
         c = column - 1
-        if r < 0 or c < 0:
+        if r < 0 or c < 0 or r >= self.max_row or c >= self.max_column:
             return _Cell(None)
-        if r >= len(self._data):
-            return _Cell(None)
-        row_vals = self._data[r]
-        if c >= len(row_vals):
-            return _Cell(None)
-        return _Cell(row_vals[c])
+        return _Cell(self._columns[c].get(r))
 
     def iter_rows(self, min_row: int, max_row: int, min_col: int, max_col: int, values_only: bool = False):
         # openpyxl is 1-based inclusive; keep same.
@@ -84,15 +278,47 @@ class _Sheet:
         r2 = max(max_row, 0)
         c1 = max(min_col, 1)
         c2 = max(max_col, 0)
-        for r in range(r1, r2 + 1):
-            out = []
-            for c in range(c1, c2 + 1):
-                v = self.cell(r, c).value
-                out.append(v)
+        if r2 < r1 or c2 < c1:
+            for _ in range(r1, r2 + 1):
+                yield ()
+            return
+        # Rows past max_row / columns past max_column read as empty cells.
+        in_r2 = min(r2, self.max_row)
+        pad_rows = r2 - max(in_r2, r1 - 1)
+        cols = []
+        for c in range(c1, c2 + 1):
+            if c <= self.max_column and in_r2 >= r1:
+                cols.append(self._columns[c - 1].to_list(r1 - 1, in_r2))
+            else:
+                cols.append([None] * max(in_r2 - r1 + 1, 0))
+        for out in zip(*cols):
             if values_only:
-                yield tuple(out)
+                yield out
             else:
                 yield tuple(_Cell(v) for v in out)
+        empty = (None,) * (c2 - c1 + 1)
+        for _ in range(pad_rows):
+            yield empty if values_only else tuple(_Cell(None) for _ in empty)
+
+    def scan_masks(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(filled, text) row x column masks; see _sheet_scan_masks."""
+        filled = np.zeros((self.max_row, self.max_column), dtype=bool)
+        text = np.zeros((self.max_row, self.max_column), dtype=bool)
+        for c, col in enumerate(self._columns):
+            filled[:, c] = ~col.null
+            if col.numeric:
+                for r, v in col.other.items():
+                    if type(v) is str:
+                        filled[r, c] = v not in ("", " ")
+                        text[r, c] = filled[r, c]
+                continue
+            is_str = np.fromiter((type(v) is str for v in col.values), dtype=bool, count=self.max_row)
+            if is_str.any():
+                blank = np.isin(col.values[is_str], ["", " "])
+                idx = np.flatnonzero(is_str)
+                filled[idx[blank], c] = False
+                text[idx[~blank], c] = True
+        return filled, text
 
 class _Workbook:
     def __init__(self, sheets: list[_Sheet]):
@@ -102,43 +328,102 @@ class _Workbook:
     def __getitem__(self, name: str) -> _Sheet:
         return self._by_name[name]
 
-def _load_workbook_fast(input_xlsx: str):
-    """Load only needed sheets using calamine (fast)."""
-    # NOTE: ExcelFile lets calamine list sheet names quickly without parsing all.
-    xl = pd.ExcelFile(input_xlsx, engine="calamine")
-    wanted_lower = {w.lower() for w in WANTED_SHEETS}
-    sheet_names = xl.sheet_names
-
-    # Keep same behavior as before: only scan wanted sheets where possible.
-    selected = [s for s in sheet_names if any(w in (s or "").lower() for w in wanted_lower)]
-    # Fallback: if none matched (unexpected naming), load all to avoid breaking.
-    if not selected:
-        selected = sheet_names
-
-    sheets: list[_Sheet] = []
-    for name in selected:
-        df0 = xl.parse(sheet_name=name, header=None, dtype=object)
-        data = [[_nan_to_none(v) for v in row] for row in df0.values.tolist()]
-        sheets.append(_Sheet(str(name), data))
-    return _Workbook(sheets)
-
-_SCAN_MAX_COLS = int((os.getenv("EXCEL_SCAN_MAX_COLS") or "600").strip() or "600")
-_SCAN_MAX_ROWS = int((os.getenv("EXCEL_SCAN_MAX_ROWS") or "8000").strip() or "8000")
-# Applied to Cum Actual Units week columns to align with reporting week.
-PLANNED_WEEK_SHIFT_DAYS = 7
+# pandas' default NA strings: ExcelFile.parse turns these cells into NaN.
+_NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+_LOAD_CHUNK_ROWS = 4096
+
+def _convert_calamine_cell(value: Any) -> Any:
+    # Mirrors pandas' calamine reader + NA handling for header=None, dtype=object.
+    t = type(value)
+    if t is float:
+        as_int = int(value)
+        return as_int if as_int == value else value
+    if t is str:
+        return None if value in _NA_STRINGS else value
+    if isinstance(value, date):
+        return pd.Timestamp(value)
+    if isinstance(value, timedelta):
+        return pd.Timedelta(value)
+    return value
+
+def _convert_calamine_chunk(cells: np.ndarray) -> np.ndarray:
+    """Apply _convert_calamine_cell to a 2-D object chunk in place, except integral
+    floats (left to _Column.pack(integral_floats=True)); returns the cell types."""
+    types = _TYPE_OF(cells)
+    is_str = np.equal(types, str)
+    if is_str.any():
+        rows_idx, cols_idx = np.nonzero(is_str)
+        na = np.fromiter(
+            (v in _NA_STRINGS for v in cells[rows_idx, cols_idx]), dtype=bool, count=len(rows_idx)
+        )
+        if na.any():
+            cells[rows_idx[na], cols_idx[na]] = None
+            types[rows_idx[na], cols_idx[na]] = type(None)
+    simple = (
+        is_str
+        | np.equal(types, float)
+        | np.equal(types, int)
+        | np.equal(types, bool)
+        | np.equal(types, type(None))
+    )
+    for r, c in zip(*np.nonzero(~simple)):
+        v = _convert_calamine_cell(cells[r, c])
+        cells[r, c] = v
+        types[r, c] = type(v)
+    return types
+
+def _load_sheet_calamine(
+    sheet: Any,
+    max_rows: int | None = None,
+    max_cols: int | None = None,
+) -> _Sheet:
+    """Convert one calamine sheet into the columnar store, packing rows in chunks.
+
+    Rows are read from A1 (empty leading area kept) exactly like pandas does, and
+    each chunk is released once packed so raw cells never pile up next to the arrays.
+    """
+    rows = sheet.to_python(skip_empty_area=False, nrows=max_rows)
+    n_rows = len(rows)
+    n_cols = max((len(r) for r in rows), default=0)
+    truncated = max_rows is not None and n_rows >= max_rows
+    if max_cols is not None and n_cols > max_cols:
+        n_cols = max_cols
+        truncated = True
+    if not n_rows or not n_cols:
+        return _Sheet(str(sheet.name), [], 0, truncated)
+
+    parts: List[List[_Column]] = [[] for _ in range(n_cols)]
+    while rows:
+        chunk = rows[:_LOAD_CHUNK_ROWS]
+        del rows[:_LOAD_CHUNK_ROWS]
+        cells = np.empty((len(chunk), n_cols), dtype=object)
+        for i, row in enumerate(chunk):
+            width = min(len(row), n_cols)
+            cells[i, :width] = row[:width]
+        del chunk
+        types = _convert_calamine_chunk(cells)
+        for c in range(n_cols):
+            parts[c].append(_Column.pack(cells[:, c], types[:, c], integral_floats=True))
+    return _Sheet(str(sheet.name), [_Column.concat(p) for p in parts], n_rows, truncated)
+
+def _is_wanted_sheet(title: str | None) -> bool:
+    title_lower = (title or "").lower()
+    return any(w.lower() in title_lower for w in WANTED_SHEETS)
+
+# --- Tracing ---
+# Nested timing spans (open, parse, detect, load_table, lookup, tree, render...)
+# so a request's latency can be attributed to each stage. Off unless WBS_TRACE=1
+# (WBS_PROFILE=1 also prints each finished trace); when off, span() hands back a
+# shared no-op context manager. WBS_TRACE_FILE=path appends every finished
+# top-level span, children included, to that file as one JSON line.
+def _env_flag(name: str) -> bool:
+    return (os.getenv(name) or "").strip().lower() in {"1", "true", "yes", "on"}
 
 def _wbs_profile_enabled() -> bool:
-    raw = (os.getenv("WBS_PROFILE") or "").strip().lower()
-    return raw in {"1", "true", "yes", "on"}
-
-def _wbs_profile_rows() -> int:
-    raw = (os.getenv("WBS_PROFILE_ROWS") or "").strip()
-    if not raw:
-        return 200
-    try:
-        return max(int(raw), 0)
-    except ValueError:
-        return 200
+    return _env_flag("WBS_PROFILE")
 
 def _wbs_profile_skip_after() -> int:
     raw = (os.getenv("WBS_PROFILE_SKIP_AFTER") or "").strip()
@@ -149,6 +434,833 @@ def _wbs_profile_skip_after() -> int:
     except ValueError:
         return 0
 
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+_NO_SPAN = _NoSpan()
+
+class Span:
+    """One timed stage; entering it nests it under the thread's current span."""
+
+    __slots__ = ("name", "attrs", "start", "duration_ms", "children", "_tracer", "_t0")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration_ms = 0.0
+        self.children: List["Span"] = []
+        self._tracer = tracer
+        self._t0 = 0.0
+
+    def __enter__(self) -> "Span":
+        self._tracer._stack().append(self)
+        self.start = datetime.now().timestamp()
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        self.duration_ms = (perf_counter() - self._t0) * 1000.0
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        stack = self._tracer._stack()
+        if self not in stack:
+            # Dropped by start_request: its request never finished.
+            return False
+        # Spans still open inside this one (st.stop() mid-stage) are discarded.
+        while stack.pop() is not self:
+            pass
+        if stack:
+            stack[-1].children.append(self)
+        else:
+            self._tracer._finish(self)
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start": self.start,
+            "ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "children": [c.to_dict() for c in self.children],
+        }
+
+class Tracer:
+    """Collects finished span trees (per thread) and exports them."""
+
+    def __init__(self, enabled: bool | None = None, path: str | None = None, echo: bool | None = None, keep: int = 20):
+        self.path = path if path is not None else (os.getenv("WBS_TRACE_FILE") or "").strip() or None
+        self.echo = _wbs_profile_enabled() if echo is None else echo
+        if enabled is None:
+            enabled = _env_flag("WBS_TRACE") or self.echo or bool(self.path)
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finished: "deque[Dict[str, Any]]" = deque(maxlen=keep)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name: str, **attrs: Any) -> Span | _NoSpan:
+        if not self.enabled:
+            return _NO_SPAN
+        return Span(self, name, attrs)
+
+    def annotate(self, **attrs: Any) -> None:
+        """Add attributes to the innermost open span of this thread."""
+        if self.enabled:
+            stack = self._stack()
+            if stack:
+                stack[-1].attrs.update(attrs)
+
+    def start_request(self, name: str, **attrs: Any) -> Span | _NoSpan:
+        """Open the top-level span of a request (one page run).
+
+        Spans a previous run of this thread left open (st.stop()) are dropped.
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        self._stack().clear()
+        return Span(self, name, attrs).__enter__()
+
+    def end_request(self) -> Dict[str, Any] | None:
+        """Close the request span opened by start_request and return its trace."""
+        stack = self._stack() if self.enabled else []
+        if not stack:
+            return None
+        # This thread's own request: last() may already be another thread's.
+        root = stack[0]
+        root.__exit__(None, None, None)
+        return root.to_dict()
+
+    def last(self) -> Dict[str, Any] | None:
+        with self._lock:
+            return self._finished[-1] if self._finished else None
+
+    def recent(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._finished)
+
+    def _finish(self, span: Span) -> None:
+        record = span.to_dict()
+        with self._lock:
+            self._finished.append(record)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        if self.echo:
+            for line in format_trace(record):
+                print(f"wbs_profile {line}", flush=True)
+
+def format_trace(record: Dict[str, Any], depth: int = 0) -> List[str]:
+    """Indented ``name ms attrs`` lines of a finished span and its children."""
+    attrs = " ".join(f"{k}={v}" for k, v in record.get("attrs", {}).items())
+    lines = [f"{'  ' * depth}{record['name']} {record['ms']:.1f} ms {attrs}".rstrip()]
+    for child in record.get("children", []):
+        lines.extend(format_trace(child, depth + 1))
+    return lines
+
+TRACER = Tracer()
+
+def trace_span(name: str, **attrs: Any) -> Span | _NoSpan:
+    return TRACER.span(name, **attrs)
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Run the decorated function inside a ``name`` span."""
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            with Span(TRACER, name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+# --- Parallel extraction ---
+# Sheets are independent: with WBS_EXTRACT_WORKERS > 1 ("auto" = one per CPU) they
+# are parsed, and scanned for WBS blocks, in a process pool. Threads are used
+# when processes are unavailable or WBS_EXTRACT_EXECUTOR=thread. Results keep
+# the input order, so the output does not depend on the worker count.
+def _extract_workers() -> int:
+    raw = (os.getenv("WBS_EXTRACT_WORKERS") or "1").strip().lower()
+    if raw in {"0", "auto"}:
+        return os.cpu_count() or 1
+    try:
+        return max(int(raw), 1)
+    except ValueError:
+        return 1
+
+def _process_pool(workers: int) -> ProcessPoolExecutor | None:
+    """A process pool, or None when configured off or this host cannot run one
+    (sandboxed: no semaphores or no process support)."""
+    if (os.getenv("WBS_EXTRACT_EXECUTOR") or "process").strip().lower() == "thread":
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError):
+        return None
+
+def _submit(pool: Any, fn: Callable[[Any], Any], job: Any) -> Any:
+    # Worker processes start on submit; failing to start one is a pool
+    # failure, told apart from errors raised by ``fn`` (those come from result()).
+    try:
+        return pool.submit(fn, job)
+    except OSError as exc:
+        if isinstance(pool, ProcessPoolExecutor):
+            raise BrokenProcessPool(f"cannot start extraction workers: {exc}") from exc
+        raise
+
+def _parallel_map(fn: Callable[[Any], Any], jobs: List[Any], workers: int | None = None) -> List[Any]:
+    """[fn(job) for job in jobs], spread over the extraction workers."""
+    workers = min(_extract_workers() if workers is None else workers, len(jobs))
+    if workers <= 1:
+        return [fn(job) for job in jobs]
+    pool = _process_pool(workers)
+    if pool is not None:
+        try:
+            with pool:
+                futures = [_submit(pool, fn, job) for job in jobs]
+                return [future.result() for future in futures]
+        except (BrokenProcessPool, pickle.PicklingError):
+            # Workers died or the jobs cannot be sent to them: run them on threads.
+            pass
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, jobs))
+
+def _drain(pool: Any, fn: Callable[[Any], Any], remaining: deque, in_flight: Dict[Any, Any], workers: int):
+    while remaining or in_flight:
+        while remaining and len(in_flight) < 2 * workers:
+            job = remaining.popleft()
+            in_flight[_submit(pool, fn, job)] = job
+        finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in finished:
+            result = future.result()
+            yield in_flight.pop(future), result
+
+def _imap_unordered(fn: Callable[[Any], Any], jobs: List[Any], workers: int):
+    """(job, fn(job)) pairs as they finish, with at most 2 * workers jobs in flight.
+
+    Same pool choice and thread fallback as _parallel_map; jobs still running
+    when a process pool breaks are rerun on threads.
+    """
+    remaining = deque(jobs)
+    if workers <= 1:
+        while remaining:
+            job = remaining.popleft()
+            yield job, fn(job)
+        return
+    pool = _process_pool(workers)
+    if pool is not None:
+        in_flight: Dict[Any, Any] = {}
+        try:
+            with pool:
+                yield from _drain(pool, fn, remaining, in_flight, workers)
+            return
+        except (BrokenProcessPool, pickle.PicklingError):
+            remaining.extendleft(reversed(list(in_flight.values())))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from _drain(pool, fn, remaining, {}, workers)
+
+def _load_sheet_job(job: Tuple[str, str, int | None, int | None]) -> _Sheet:
+    path, name, max_rows, max_cols = job
+    cw = CalamineWorkbook.from_path(path)
+    try:
+        return _load_sheet_calamine(cw.get_sheet_by_name(name), max_rows=max_rows, max_cols=max_cols)
+    finally:
+        cw.close()
+
+@traced("parse")
+def _load_workbook_fast(
+    input_xlsx: str,
+    max_rows: int | None = None,
+    max_cols: int | None = None,
+    workers: int | None = None,
+):
+    """Load only needed sheets using python-calamine (fast).
+
+    ``max_rows``/``max_cols`` stop reading early; only callers that never look
+    past those limits (header probes) should pass them. Full loads parse the
+    sheets in parallel with ``workers`` > 1 (default: WBS_EXTRACT_WORKERS).
+    """
+    sheets = None
+    cw = CalamineWorkbook.from_path(input_xlsx)
+    try:
+        sheet_names = cw.sheet_names
+
+        # Keep same behavior as before: only scan wanted sheets where possible.
+        selected = [s for s in sheet_names if _is_wanted_sheet(s)]
+        # Fallback: if none matched (unexpected naming), load all to avoid breaking.
+        if not selected:
+            selected = sheet_names
+
+        workers = _extract_workers() if workers is None else workers
+        TRACER.annotate(sheets=len(selected), workers=workers, max_rows=max_rows)
+        if max_rows is not None or workers <= 1 or len(selected) <= 1:
+            sheets = []
+            for name in selected:
+                with trace_span("parse_sheet", sheet=name):
+                    sheets.append(
+                        _load_sheet_calamine(cw.get_sheet_by_name(name), max_rows=max_rows, max_cols=max_cols)
+                    )
+    finally:
+        cw.close()
+    if sheets is None:
+        sheets = _parallel_map(
+            _load_sheet_job, [(input_xlsx, name, max_rows, max_cols) for name in selected], workers
+        )
+    return _Workbook(sheets)
+
+def _file_fingerprint(path: str) -> str:
+    # Size + mtime: validates in-process sessions and the ingest artifact next to
+    # the file. Uploads are stored once per content, so re-uploading identical
+    # bytes keeps both; the disk caches (excel_cache) key on the content hash.
+    st = os.stat(path)
+    mtime_ns = getattr(st, "st_mtime_ns", int(st.st_mtime * 1_000_000_000))
+    return f"{st.st_size}_{mtime_ns}"
+
+def _mapping_key(mapping: dict | None) -> str:
+    if not mapping:
+        return ""
+    return json.dumps(mapping, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+# Derived entries a session hands to the session of the next upload of the same
+# file: detected tables, schedule-table scan, per-row lookup and tree state.
+_SNAPSHOT_KEYS = ("tables", "schedule_table", "schedule_rows", "tree_rows")
+
+class WorkbookSnapshot:
+    """What incremental re-extraction keeps of a replaced upload.
+
+    ``layout`` is the _layout_signature of its workbook: when the new upload has
+    the same one, table detection and the schedule-table scan carry over and
+    only rows whose values changed are recomputed. Otherwise everything is
+    rebuilt, as for a first upload.
+    """
+
+    __slots__ = ("layout", "derived")
+
+    def __init__(self, layout: Tuple[Any, ...], derived: Dict[Any, Any]):
+        self.layout = layout
+        self.derived = derived
+
+class WorkbookSession:
+    """Parse-once view of an xlsx shared by every extraction entry point.
+
+    Owns the parsed sheets, the detected-table list and any derived index
+    (loaded tables, name maps...) so a page rerun pays the xlsx parse once.
+    ``previous`` is what the session it replaced (same file, older upload)
+    left for incremental re-extraction. When the file was ingested
+    (ingest_workbook), sheets and tables come from its columnar artifact.
+    ``workers`` caps the parallel sheet parse and scan (default:
+    WBS_EXTRACT_WORKERS).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fingerprint: str | None = None,
+        wb: Any | None = None,
+        header_probe: bool = False,
+        previous: "WorkbookSnapshot | None" = None,
+        workers: int | None = None,
+    ):
+        self.path = str(path)
+        self.fingerprint = fingerprint or _file_fingerprint(self.path)
+        self.header_probe = header_probe
+        self.previous = previous
+        self.workers = workers
+        self._wb = wb
+        self._ingested_tables: List[Dict[str, Any]] | None = None
+        self._probe_window: Tuple[int, int] | None = None
+        self._lock = threading.RLock()
+        self._derived: Dict[Any, Any] = {}
+
+    @property
+    def wb(self) -> "_Workbook":
+        if self._wb is None:
+            with self._lock:
+                if self._wb is None:
+                    ingested = _load_ingested(self.path, self.fingerprint)
+                    if ingested is not None:
+                        # Full sheets, so header probes get them too (and are complete).
+                        self._wb, self._ingested_tables = ingested
+                    elif self.header_probe:
+                        max_rows, max_cols = self._probe_window = _probe_window(self.path)
+                        self._wb = _load_workbook_fast(self.path, max_rows=max_rows, max_cols=max_cols)
+                    else:
+                        self._wb = _load_workbook_fast(self.path, workers=self.workers)
+        return self._wb
+
+    def derived(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """Memoize a value computed from this workbook (computed once, under lock)."""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = factory()
+            return self._derived[key]
+
+    def remember(self, key: Any, value: Any) -> None:
+        """Record per-row state for the next upload of this file (see WorkbookSnapshot)."""
+        with self._lock:
+            self._derived[key] = value
+
+    def layout(self) -> Tuple[Any, ...]:
+        return self.derived(("layout",), lambda: _layout_signature(self.wb))
+
+    def reusable(self, key: Any, same_layout: bool = False) -> Any | None:
+        """The previous upload's value for ``key``, if any (and, with ``same_layout``,
+        only when both uploads have the same table layout)."""
+        previous = self.previous
+        if previous is None or key not in previous.derived:
+            return None
+        if same_layout and previous.layout != self.layout():
+            return None
+        return previous.derived[key]
+
+    def snapshot(self) -> "WorkbookSnapshot | None":
+        """What the next upload of this file can reuse (None if nothing was parsed)."""
+        if self._wb is None or self.header_probe:
+            return None
+        with self._lock:
+            derived = {k: v for k, v in self._derived.items() if k[0] in _SNAPSHOT_KEYS}
+        if not derived:
+            return None
+        return WorkbookSnapshot(self.layout(), derived)
+
+    def catalog(self) -> List[Dict[str, Any]]:
+        """Detected tables enriched with headers, field values and week columns."""
+        return self.derived(("catalog",), self._build_catalog)
+
+    def _build_catalog(self) -> List[Dict[str, Any]]:
+        wb = self.wb
+        tables = self._ingested_tables
+        if tables is None:
+            tables = self.reusable(("tables",), same_layout=True)
+        catalog = _build_table_catalog(wb, tables)
+        if not self.header_probe:
+            self.remember(("tables",), [_public_table(t) for t in catalog])
+            _remember_scan_bounds(self.path, catalog)
+        return catalog
+
+    def tables(self) -> List[Dict[str, Any]]:
+        return [_public_table(t) for t in self.catalog()]
+
+    def probe_complete(self) -> bool:
+        """Whether a header probe sees the same tables as a full parse.
+
+        The probe loads the first rows and columns of each sheet only (see
+        _probe_window); that is enough unless a cut-off sheet had no table
+        there, or a table's header row may run past the window's last column.
+        Tables running past its last row end there in the probe.
+        """
+        if not self.header_probe:
+            return True
+
+        def _complete() -> bool:
+            wb = self.wb
+            if self._probe_window is None:  # loaded whole from the ingest artifact
+                return True
+            max_cols = self._probe_window[1]
+            last_col: Dict[str, int] = {}
+            for t in self.catalog():
+                last_col[t["sheet"]] = max(last_col.get(t["sheet"], 0), _parse_range(t["range"])[3])
+            return all(
+                ws.title in last_col and last_col[ws.title] < max_cols for ws in wb.worksheets if ws.truncated
+            )
+
+        return self.derived(("probe_complete",), _complete)
+
+    def __repr__(self) -> str:
+        probe = ", header_probe=True" if self.header_probe else ""
+        return f"WorkbookSession({self.path!r}, fingerprint={self.fingerprint!r}{probe})"
+
+# Process-wide registry of live sessions (LRU, bounded: parsed P6 exports are large).
+_SESSION_CACHE_SIZE = max(int((os.getenv("WBS_SESSION_CACHE_SIZE") or "4").strip() or "4"), 1)
+_SESSIONS: "OrderedDict[str, WorkbookSession]" = OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+@traced("open")
+def open_workbook_session(input_xlsx: str, previous_path: str | None = None) -> WorkbookSession:
+    """Return the live session for this file, re-parsing only when its fingerprint changed.
+
+    A replaced session (new upload at the same path) hands its snapshot to the
+    new one, which then re-extracts incrementally. Uploads stored by content
+    get a new path each time: ``previous_path`` names the file this one
+    replaces, whose session (and scan bounds) carry over the same way.
+    """
+    key = os.path.abspath(str(input_xlsx))
+    fingerprint = _file_fingerprint(key)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is not None and session.fingerprint == fingerprint:
+            _SESSIONS.move_to_end(key)
+            TRACER.annotate(reused=True)
+            return session
+    if session is None and previous_path:
+        prior_key = os.path.abspath(str(previous_path))
+        if prior_key != key:
+            with _SESSIONS_LOCK:
+                session = _SESSIONS.get(prior_key)
+            _carry_scan_bounds(prior_key, key)
+    previous = session.snapshot() if session is not None else None
+    with _SESSIONS_LOCK:
+        current = _SESSIONS.get(key)
+        if current is not None and current.fingerprint == fingerprint:
+            return current
+        session = WorkbookSession(key, fingerprint, previous=previous)
+        TRACER.annotate(reused=False, previous=previous is not None)
+        _SESSIONS[key] = session
+        _SESSIONS.move_to_end(key)
+        while len(_SESSIONS) > _SESSION_CACHE_SIZE:
+            _SESSIONS.popitem(last=False)
+    return session
+
+# Header probes are small (fast detection window only); keep one per project card.
+_PROBE_CACHE_SIZE = 32
+_PROBES: "OrderedDict[str, WorkbookSession]" = OrderedDict()
+
+@traced("open")
+def open_header_probe(input_xlsx: str) -> WorkbookSession:
+    """Session for header/range lookups: the live full session if any, else a probe
+    that only reads the fast detection window of each wanted sheet."""
+    key = os.path.abspath(str(input_xlsx))
+    fingerprint = _file_fingerprint(key)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is not None and session.fingerprint == fingerprint:
+            TRACER.annotate(reused=True)
+            return session
+        probe = _PROBES.get(key)
+        if probe is not None and probe.fingerprint == fingerprint:
+            _PROBES.move_to_end(key)
+            TRACER.annotate(reused=True, header_probe=True)
+            return probe
+        probe = WorkbookSession(key, fingerprint, header_probe=True)
+        TRACER.annotate(reused=False, header_probe=True)
+        _PROBES[key] = probe
+        while len(_PROBES) > _PROBE_CACHE_SIZE:
+            _PROBES.popitem(last=False)
+    return probe
+
+# Per file: how far the last full detection found table headers, as (last header
+# row, last header column + 1). Header probes of a later upload of the same file
+# read that far, so headers past the default window do not force a full parse.
+_SCAN_BOUNDS_SIZE = 256
+_SCAN_BOUNDS: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+
+def _remember_scan_bounds(path: str, tables: List[Dict[str, Any]]) -> None:
+    rows = max((t["header_row"] for t in tables), default=0)
+    cols = max((_parse_range(t["range"])[3] + 1 for t in tables), default=0)
+    with _SESSIONS_LOCK:
+        _SCAN_BOUNDS[os.path.abspath(path)] = (rows, cols)
+        _SCAN_BOUNDS.move_to_end(os.path.abspath(path))
+        while len(_SCAN_BOUNDS) > _SCAN_BOUNDS_SIZE:
+            _SCAN_BOUNDS.popitem(last=False)
+
+def _carry_scan_bounds(src: str, dst: str) -> None:
+    """Start ``dst`` (a new upload replacing ``src``) from ``src``'s scan bounds."""
+    with _SESSIONS_LOCK:
+        bounds = _SCAN_BOUNDS.get(os.path.abspath(src))
+        dst = os.path.abspath(dst)
+        if bounds is not None and dst not in _SCAN_BOUNDS:
+            _SCAN_BOUNDS[dst] = bounds
+            while len(_SCAN_BOUNDS) > _SCAN_BOUNDS_SIZE:
+                _SCAN_BOUNDS.popitem(last=False)
+
+def _probe_window(path: str) -> Tuple[int, int]:
+    """(max_rows, max_cols) a header probe of ``path`` loads."""
+    with _SESSIONS_LOCK:
+        rows, cols = _SCAN_BOUNDS.get(os.path.abspath(path), (0, 0))
+    return (
+        min(max(_FAST_SCAN_ROWS, rows), _DETECT_MAX_ROWS),
+        min(max(_FAST_SCAN_COLS, cols), _DETECT_MAX_COLS),
+    )
+
+def clear_workbook_sessions() -> None:
+    with _SESSIONS_LOCK:
+        _SESSIONS.clear()
+        _PROBES.clear()
+
+def _session_for(input_xlsx: str | None, session: WorkbookSession | None) -> WorkbookSession:
+    if session is not None:
+        return session
+    if not input_xlsx:
+        raise ValueError("input_xlsx is required when session is not provided")
+    return open_workbook_session(input_xlsx)
+
+# ---------- Columnar ingest artifact ----------
+# ingest_workbook() runs at upload time: it parses the workbook once, detects
+# its tables and writes the parsed sheets next to the upload as Arrow IPC files
+# (<file>.ingest/), with a manifest holding the source fingerprint, the tables
+# (ranges, headers, week columns) and how each column was packed. Sessions load
+# that artifact instead of the xlsx while the fingerprint matches, and reuse its
+# tables instead of detecting them again. pyarrow is optional: without it no
+# artifact is written and every load parses the xlsx.
+INGEST_VERSION = 1
+_INGEST_SUFFIX = ".ingest"
+_INGEST_MANIFEST = "manifest.json"
+_INGEST_EXTRAS = "extras.arrow"
+
+# Cells that do not fit their column's dense array (text in numeric columns,
+# dates/numbers in text columns) go to one sparse table per artifact. Dates and
+# durations keep their unit; anything else round-trips through pickle.
+_EXTRA_STR, _EXTRA_FLOAT, _EXTRA_INT, _EXTRA_BOOL, _EXTRA_PICKLE = 0, 1, 2, 3, 4
+_EXTRA_TIME_UNITS = ("s", "ms", "us", "ns")
+_EXTRA_TIMESTAMP = 10  # + unit index
+_EXTRA_TIMEDELTA = 20  # + unit index
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+def ingest_dir(input_xlsx: str) -> Path:
+    """Where the columnar artifact of ``input_xlsx`` lives (next to it)."""
+    return Path(f"{input_xlsx}{_INGEST_SUFFIX}")
+
+def _extra_cell(v: Any) -> Tuple[int, float | None, int | None, str | None, bytes | None]:
+    t = type(v)
+    if t is str:
+        return _EXTRA_STR, None, None, v, None
+    if t is float:
+        return _EXTRA_FLOAT, v, None, None, None
+    if t is bool:
+        return _EXTRA_BOOL, None, int(v), None, None
+    if t is int and _INT64_MIN <= v <= _INT64_MAX:
+        return _EXTRA_INT, None, v, None, None
+    if t is pd.Timestamp and v.tz is None and v.unit in _EXTRA_TIME_UNITS:
+        return _EXTRA_TIMESTAMP + _EXTRA_TIME_UNITS.index(v.unit), None, int(v.asm8.view("i8")), None, None
+    if t is pd.Timedelta and v.unit in _EXTRA_TIME_UNITS:
+        return _EXTRA_TIMEDELTA + _EXTRA_TIME_UNITS.index(v.unit), None, int(v.asm8.view("i8")), None, None
+    return _EXTRA_PICKLE, None, None, None, pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _extra_values(kind: int, floats: np.ndarray, ints: np.ndarray, texts: np.ndarray, blobs: np.ndarray) -> list:
+    if kind == _EXTRA_STR:
+        return texts.tolist()
+    if kind == _EXTRA_FLOAT:
+        return floats.tolist()
+    if kind == _EXTRA_INT:
+        return ints.tolist()
+    if kind == _EXTRA_BOOL:
+        return [bool(v) for v in ints.tolist()]
+    if kind >= _EXTRA_TIMESTAMP:
+        # Dates repeat a lot: build each distinct one once (and share it, as the loader does).
+        uniq, inverse = np.unique(ints, return_inverse=True)
+        if kind >= _EXTRA_TIMEDELTA:
+            shared = pd.TimedeltaIndex(uniq.astype(f"timedelta64[{_EXTRA_TIME_UNITS[kind - _EXTRA_TIMEDELTA]}]"))
+        else:
+            shared = pd.DatetimeIndex(uniq.astype(f"datetime64[{_EXTRA_TIME_UNITS[kind - _EXTRA_TIMESTAMP]}]"))
+        objects = shared.to_list()
+        return [objects[i] for i in inverse.tolist()]
+    return [pickle.loads(b) for b in blobs.tolist()]
+
+def _write_ingest_sheet(pa: Any, ws: _Sheet, path: Path, s: int, extras: Dict[str, list]) -> List[Dict[str, bool]]:
+    """One sheet as an Arrow IPC file (dense column arrays); sparse cells go to ``extras``."""
+    import pyarrow.feather as feather
+
+    arrays: Dict[str, Any] = {}
+    layout: List[Dict[str, bool]] = []
+    for c, col in enumerate(ws._columns):
+        arrays[f"{c}.null"] = pa.array(col.null, type=pa.bool_())
+        if col.numeric:
+            arrays[f"{c}.num"] = pa.array(col.values, type=pa.float64(), from_pandas=False)
+            if col.ints is not None:
+                arrays[f"{c}.int"] = pa.array(col.ints, type=pa.bool_())
+            sparse = col.other.items()
+        else:
+            is_str = np.fromiter((type(v) is str for v in col.values), dtype=bool, count=len(col.values))
+            arrays[f"{c}.str"] = pa.array(col.values, type=pa.string(), mask=~is_str)
+            rows = np.flatnonzero(~(is_str | col.null)).tolist()
+            sparse = ((r, col.values[r]) for r in rows)
+        for r, v in sparse:
+            kind, f, i, text, blob = _extra_cell(v)
+            for key, value in zip(("sheet", "col", "row", "kind", "f", "i", "s", "b"), (s, c, r, kind, f, i, text, blob)):
+                extras[key].append(value)
+        layout.append({"numeric": col.numeric, "ints": col.ints is not None})
+    feather.write_feather(pa.table(arrays) if arrays else pa.table({}), str(path), compression="lz4")
+    return layout
+
+@traced("ingest")
+def ingest_workbook(input_xlsx: str, session: WorkbookSession | None = None) -> Path | None:
+    """Parse ``input_xlsx`` once and write its columnar artifact (see ingest_dir).
+
+    Returns the artifact directory, or None when pyarrow is not installed. The
+    artifact is written to a temporary directory first and swapped in whole, so
+    readers see either the previous one or the new one.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+    session = _session_for(input_xlsx, session)
+    target = ingest_dir(session.path)
+    wb = session.wb
+    catalog = session.catalog()
+    tmp = Path(f"{target}.tmp-{os.getpid()}-{threading.get_ident()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        extras: Dict[str, list] = {key: [] for key in ("sheet", "col", "row", "kind", "f", "i", "s", "b")}
+        sheets = []
+        for s, ws in enumerate(wb.worksheets):
+            name = f"sheet{s}.arrow"
+            with trace_span("ingest_sheet", sheet=ws.title):
+                columns = _write_ingest_sheet(pa, ws, tmp / name, s, extras)
+            sheets.append({
+                "title": ws.title,
+                "file": name,
+                "max_row": ws.max_row,
+                "truncated": ws.truncated,
+                "columns": columns,
+            })
+        feather.write_feather(
+            pa.table({
+                "sheet": pa.array(extras["sheet"], type=pa.int32()),
+                "col": pa.array(extras["col"], type=pa.int32()),
+                "row": pa.array(extras["row"], type=pa.int32()),
+                "kind": pa.array(extras["kind"], type=pa.int8()),
+                "f": pa.array(extras["f"], type=pa.float64()),
+                "i": pa.array(extras["i"], type=pa.int64()),
+                "s": pa.array(extras["s"], type=pa.string()),
+                "b": pa.array(extras["b"], type=pa.binary()),
+            }),
+            str(tmp / _INGEST_EXTRAS),
+            compression="lz4",
+        )
+        tables = []
+        for entry in catalog:
+            table = _public_table(entry)
+            table["headers"] = [None if h is None else as_text(h) for h in entry["headers"]]
+            table["week_columns"] = [[idx, week.isoformat()] for idx, week in entry["week_columns"]]
+            tables.append(table)
+        manifest = {
+            "version": INGEST_VERSION,
+            "source": os.path.basename(session.path),
+            "fingerprint": session.fingerprint,
+            "sheets": sheets,
+            "extras": _INGEST_EXTRAS,
+            "tables": tables,
+        }
+        (tmp / _INGEST_MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, default=str), encoding="utf-8")
+        stale = Path(f"{target}.old-{os.getpid()}-{threading.get_ident()}")
+        if target.exists():
+            os.replace(target, stale)
+        os.replace(tmp, target)
+        shutil.rmtree(stale, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    TRACER.annotate(sheets=len(sheets), tables=len(tables), extras=len(extras["row"]))
+    return target
+
+def remove_ingest_artifact(input_xlsx: str) -> None:
+    shutil.rmtree(ingest_dir(input_xlsx), ignore_errors=True)
+
+def ingest_is_current(input_xlsx: str) -> bool:
+    """Whether ``input_xlsx`` has an ingest artifact of its current content."""
+    try:
+        manifest = json.loads((ingest_dir(input_xlsx) / _INGEST_MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return manifest.get("version") == INGEST_VERSION and manifest.get("fingerprint") == _file_fingerprint(
+        os.path.abspath(str(input_xlsx))
+    )
+
+def _read_ingest_sheet(feather: Any, directory: Path, meta: Dict[str, Any]) -> List[_Column]:
+    table = feather.read_table(str(directory / meta["file"]), memory_map=False)
+    columns = []
+    for c, layout in enumerate(meta["columns"]):
+        null = table.column(f"{c}.null").to_numpy()
+        if layout["numeric"]:
+            values = table.column(f"{c}.num").to_numpy()
+            ints = table.column(f"{c}.int").to_numpy() if layout["ints"] else None
+            columns.append(_Column(values, null, ints))
+        else:
+            columns.append(_Column(table.column(f"{c}.str").to_numpy().astype(object, copy=False), null))
+    return columns
+
+def _load_ingested(input_xlsx: str, fingerprint: str) -> Tuple[_Workbook, List[Dict[str, Any]]] | None:
+    """Workbook and detected tables from the ingest artifact, if it matches ``fingerprint``."""
+    directory = ingest_dir(input_xlsx)
+    if not (directory / _INGEST_MANIFEST).is_file():
+        return None
+    return _read_ingested(directory, fingerprint)
+
+@traced("parse")
+def _read_ingested(directory: Path, fingerprint: str) -> Tuple[_Workbook, List[Dict[str, Any]]] | None:
+    manifest_path = directory / _INGEST_MANIFEST
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("version") != INGEST_VERSION or manifest.get("fingerprint") != fingerprint:
+            return None
+        sheet_columns = [_read_ingest_sheet(feather, directory, meta) for meta in manifest["sheets"]]
+        extras = feather.read_table(str(directory / manifest["extras"]), memory_map=False)
+        if extras.num_rows:
+            sheet_idx = extras.column("sheet").to_numpy()
+            col_idx = extras.column("col").to_numpy()
+            kinds = extras.column("kind").to_numpy()
+            # Group the sparse cells by (sheet, column, kind).
+            order = np.lexsort((kinds, col_idx, sheet_idx))
+            sheet_idx, col_idx, kinds = sheet_idx[order], col_idx[order], kinds[order]
+            rows = extras.column("row").to_numpy()[order]
+            floats = extras.column("f").to_numpy(zero_copy_only=False)[order]
+            ints = extras.column("i").fill_null(0).to_numpy()[order]
+            texts = extras.column("s").to_numpy(zero_copy_only=False)[order]
+            blobs = extras.column("b").to_numpy(zero_copy_only=False)[order]
+            change = (np.diff(sheet_idx) != 0) | (np.diff(col_idx) != 0) | (np.diff(kinds) != 0)
+            bounds = [0, *(np.flatnonzero(change) + 1).tolist(), len(order)]
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                col = sheet_columns[int(sheet_idx[start])][int(col_idx[start])]
+                values = _extra_values(
+                    int(kinds[start]), floats[start:stop], ints[start:stop], texts[start:stop], blobs[start:stop]
+                )
+                if col.numeric:
+                    col.other.update(zip(rows[start:stop].tolist(), values))
+                else:
+                    col.values[rows[start:stop]] = np.fromiter(values, dtype=object, count=stop - start)
+        sheets = [
+            _Sheet(meta["title"], columns, meta["max_row"], meta["truncated"])
+            for meta, columns in zip(manifest["sheets"], sheet_columns)
+        ]
+        tables = [{k: t[k] for k in _TABLE_PUBLIC_KEYS if k in t} for t in manifest["tables"]]
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None
+    TRACER.annotate(source="ingest", sheets=len(sheets))
+    return _Workbook(sheets), tables
+
+_SCAN_MAX_COLS = int((os.getenv("EXCEL_SCAN_MAX_COLS") or "600").strip() or "600")
+_SCAN_MAX_ROWS = int((os.getenv("EXCEL_SCAN_MAX_ROWS") or "8000").strip() or "8000")
+# Header probe window; most exports have every table header inside it.
+_FAST_SCAN_ROWS = min(_SCAN_MAX_ROWS, 200)
+_FAST_SCAN_COLS = min(_SCAN_MAX_COLS, 80)
+# Detection scans at most this much of a sheet's used range.
+_DETECT_MAX_ROWS = _SCAN_MAX_ROWS * 2
+_DETECT_MAX_COLS = _SCAN_MAX_COLS * 2
+# Applied to Cum Actual Units week columns to align with reporting week.
+PLANNED_WEEK_SHIFT_DAYS = 7
+
 REQUIRED_COLS = [
     "Planned Finish", "Forecast Finish", "Schedule %", "Earned %",
     "ecart", "impact", "Glissement"
@@ -354,18 +1466,72 @@ def _to_excel_date(v: Any) -> date | None:
 
 
 def _week_header_dates(headers: list[Any]) -> list[date]:
-    dates: list[date] = []
-    for value in headers:
-        parsed = _to_excel_date(value)
-        if parsed is not None:
-            dates.append(parsed)
-    return dates
+    return [d for _, d in _week_index(headers).columns]
 
 
 def _week_start(d: date) -> date:
     from datetime import timedelta
     return d - timedelta(days=d.weekday())
 
+# ---------- Week-header index ----------
+class WeekIndex:
+    """Week columns of one header row, parsed once and shared by every caller.
+
+    ``columns`` are the (index, date) pairs of the headers that parse as dates.
+    Per shift (header date + shift_days, e.g. PLANNED_WEEK_SHIFT_DAYS for
+    Cum Budgeted Units) the index keeps the first column of each week start,
+    sorted, so finding a week's column is a bisect.
+    """
+
+    def __init__(self, headers: list[Any]):
+        dated = [(idx, d, h) for idx, d, h in ((idx, _to_excel_date(h), h) for idx, h in enumerate(headers)) if d]
+        self.columns: List[Tuple[int, date]] = [(idx, d) for idx, d, _ in dated]
+        # Headers _scan_tables counts as week columns (dates or date-like text).
+        self.week_headers = sum(1 for h in headers if _is_week_header(h))
+        self._dated = dated
+        self._shifted: Dict[int, Tuple[Dict[date, int], Dict[date, Any], List[date], List[int]]] = {}
+        for shift_days in (0, PLANNED_WEEK_SHIFT_DAYS):
+            self._shift(shift_days)
+
+    def _shift(self, shift_days: int) -> Tuple[Dict[date, int], Dict[date, Any], List[date], List[int]]:
+        shifted = self._shifted.get(shift_days)
+        if shifted is None:
+            week_map: Dict[date, int] = {}
+            label_map: Dict[date, Any] = {}
+            shift = timedelta(days=shift_days)
+            for idx, d, h in self._dated:
+                week = _week_start(d + shift)
+                if week not in week_map:
+                    week_map[week] = idx
+                    label_map[week] = h
+            weeks = sorted(week_map)
+            shifted = self._shifted[shift_days] = (week_map, label_map, weeks, [week_map[w] for w in weeks])
+        return shifted
+
+    def week_map(self, shift_days: int = 0) -> Tuple[Dict[date, int], Dict[date, Any]]:
+        """(week start -> first column, week start -> its header); shared, do not mutate."""
+        week_map, label_map, _, _ = self._shift(shift_days)
+        return week_map, label_map
+
+    def column(self, week: date, shift_days: int = 0) -> int | None:
+        """First column whose (shifted) header falls in the week starting ``week``."""
+        _, _, weeks, cols = self._shift(shift_days)
+        i = bisect.bisect_left(weeks, week)
+        if i < len(weeks) and weeks[i] == week:
+            return cols[i]
+        return None
+
+@functools.lru_cache(maxsize=256)
+def _cached_week_index(headers: Tuple[Any, ...], types: Tuple[type, ...]) -> WeekIndex:
+    return WeekIndex(list(headers))
+
+def _week_index(headers: list[Any]) -> WeekIndex:
+    """WeekIndex of ``headers``, memoized by header values (and types: 1 and 1.0 differ)."""
+    try:
+        return _cached_week_index(tuple(headers), tuple(map(type, headers)))
+    except TypeError:  # unhashable header cell
+        return WeekIndex(headers)
+
 def _find_header_idx(headers: list[Any], name: str) -> int | None:
     target = str(name).strip().lower()
     for idx, v in enumerate(headers):
@@ -401,7 +1567,43 @@ def _sheet_ref(sheet: str) -> str:
         return "'" + sheet.replace("'", "''") + "'"
     return sheet
 
-def _cell_ref(meta: Dict[str, Any] | None, row_idx: int | None, col_idx: int | None) -> str | None:
+class CellRef:
+    """
+    Worksheet cell coordinates (1-based row/col). The A1 text ("'Sheet'!C12") is
+    only built when the reference is shown: str(ref), f"{ref}" or ref.a1.
+    """
+
+    __slots__ = ("sheet", "row", "col")
+
+    def __init__(self, sheet: str, row: int, col: int) -> None:
+        self.sheet = sheet
+        self.row = row
+        self.col = col
+
+    @property
+    def a1(self) -> str:
+        return f"{_sheet_ref(self.sheet)}!{_col_letter(self.col)}{self.row}"
+
+    def __str__(self) -> str:
+        return self.a1
+
+    def __repr__(self) -> str:
+        return f"CellRef({self.sheet!r}, {self.row}, {self.col})"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, CellRef):
+            return (self.sheet, self.row, self.col) == (other.sheet, other.row, other.col)
+        if isinstance(other, str):
+            return self.a1 == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.a1)
+
+    def __reduce__(self):
+        return (CellRef, (self.sheet, self.row, self.col))
+
+def _cell_ref(meta: Dict[str, Any] | None, row_idx: int | None, col_idx: int | None) -> CellRef | None:
     if meta is None or row_idx is None or col_idx is None:
         return None
     sheet = meta.get("sheet")
@@ -413,7 +1615,7 @@ def _cell_ref(meta: Dict[str, Any] | None, row_idx: int | None, col_idx: int | N
     col_num = col_base + col_idx
     if row_num <= 0 or col_num <= 0:
         return None
-    return f"{_sheet_ref(sheet)}!{_col_letter(col_num)}{row_num}"
+    return CellRef(sheet, row_num, col_num)
 
 def _append_tip_sources(tip: str | None, sources: List[str], prefix: str = "Cells") -> str | None:
     items = [s for s in sources if s]
@@ -480,20 +1682,44 @@ def suggest_column_mapping(raw_headers: list[Any], table_type: str) -> Dict[str,
     return mapping
 
 def get_table_headers(
-    input_xlsx: str,
+    input_xlsx: str | None,
     table_type: str,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
+    header_probe: bool = False,
 ) -> Tuple[list[Any], Dict[str, Any]] | None:
-    table = _load_detected_table(input_xlsx, table_type, column_mapping=column_mapping)
+    """(raw_headers, meta) of the detected table of ``table_type``.
+
+    ``header_probe`` answers from the first rows of each sheet (see
+    open_header_probe) and only falls back to a full parse when they are not enough.
+    """
+    if header_probe and session is None and input_xlsx:
+        probe = open_header_probe(input_xlsx)
+        if probe.probe_complete():
+            session = probe
+    table = _load_detected_table(
+        input_xlsx,
+        table_type,
+        column_mapping=column_mapping,
+        session=session,
+    )
     if not table:
         return None
     _, meta, raw_headers = table
     return raw_headers, meta
 
+_LEADING_WS_RE = re.compile(r"^\s*")
+_WEEK_HEADER_RES = (
+    re.compile(r"\d{4}-\d{2}-\d{2}"),
+    re.compile(r"\d{1,2}-[A-Za-z]{3}-\d{2}"),
+    re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}"),
+)
+_WS_RUN_RE = re.compile(r"\s+")
+
 def leading_spaces(s: Any) -> int:
     if s is None: return 0
     s = str(s).replace("\t","    ")
-    m = re.match(r"^\s*", s)
+    m = _LEADING_WS_RE.match(s)
     return len(m.group(0)) if m else 0
 
 def clean_label(s: Any) -> str:
@@ -504,7 +1730,7 @@ def _normalize_activity_id(value: Any) -> str:
     if value is None:
         return ""
     text = str(value).replace("\u00a0", " ").strip()
-    return re.sub(r"\s+", " ", text)
+    return _WS_RUN_RE.sub(" ", text)
 
 def _extract_activity_id(label: str) -> str:
     if not label:
@@ -514,21 +1740,28 @@ def _extract_activity_id(label: str) -> str:
     parts = label.split()
     return parts[0].strip() if parts else label.strip()
 
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+# Header normalizers are memoized: the same header texts come back for every
+# table, candidate row and canonical field (typed, so 1, 1.0 and True differ).
+@functools.lru_cache(maxsize=16384, typed=True)
 def _norm(x: Any) -> str:
-    return re.sub(r"\s+", " ", str(x or "")).strip().lower()
+    return _WS_RUN_RE.sub(" ", str(x or "")).strip().lower()
 
+@functools.lru_cache(maxsize=16384, typed=True)
 def _norm_header(x: Any) -> str:
     s = str(x or "").strip().lower()
     if not s:
         return ""
     s = s.replace("%", " percent ")
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
+    s = _NON_ALNUM_RE.sub(" ", s)
+    return _WS_RUN_RE.sub(" ", s).strip()
+
+_REQUIRED_NORM = tuple(_norm(rc) for rc in REQUIRED_COLS)
 
 def has_all_required(headers: List[Any]) -> bool:
-    H = [_norm(h) for h in headers]
-    R = [_norm(rc) for rc in REQUIRED_COLS]
-    return all(rc in H for rc in R)
+    H = {_norm(h) for h in headers}
+    return all(rc in H for rc in _REQUIRED_NORM)
 
 def _is_date_like(x: str) -> bool:
     x = x.strip()
@@ -546,122 +1779,184 @@ def _is_week_header(v: Any) -> bool:
     s = str(v or "").strip()
     if not s:
         return False
-    if re.match(r"\d{4}-\d{2}-\d{2}", s):
-        return True
-    if re.match(r"\d{1,2}-[A-Za-z]{3}-\d{2}", s):
-        return True
-    if re.match(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}", s):
-        return True
-    return False
+    return any(pattern.match(s) for pattern in _WEEK_HEADER_RES)
 
-def _match_header_groups(headers: List[Any], groups: dict) -> Tuple[List[str], List[str]]:
-    header_set = { _norm_header(h) for h in headers if _norm_header(h) }
-    matched = []
-    missing = []
+# ---------- Header variant index ----------
+def _variant_index(groups: Dict[str, List[str]]) -> Dict[str, Tuple[str, ...]]:
+    """Normalized variant -> the groups (canonical fields) it names, in group order."""
+    index: Dict[str, List[str]] = {}
     for key, opts in groups.items():
-        norm_opts = [_norm_header(o) for o in opts]
-        if any(opt in header_set for opt in norm_opts):
-            matched.append(key)
-        else:
-            missing.append(key)
+        for opt in opts:
+            keys = index.setdefault(_norm_header(opt), [])
+            if key not in keys:
+                keys.append(key)
+    return {variant: tuple(keys) for variant, keys in index.items()}
+
+_VARIANT_INDEXES = {
+    id(groups): _variant_index(groups)
+    for groups in (SUMMARY_HEADER_GROUPS, ASSIGN_HEADER_GROUPS, SUMMARY_FIELD_VARIANTS, ASSIGN_FIELD_VARIANTS)
+}
+
+def _group_index(groups: Dict[str, List[str]]) -> Dict[str, Tuple[str, ...]]:
+    index = _VARIANT_INDEXES.get(id(groups))
+    return index if index is not None else _variant_index(groups)
+
+def _match_header_groups(headers: List[Any], groups: dict) -> Tuple[List[str], List[str]]:
+    index = _group_index(groups)
+    found: set[str] = set()
+    for h in headers:
+        # Every variant has letters: numbers, dates and blanks never match one.
+        if isinstance(h, str):
+            keys = index.get(_norm_header(h))
+            if keys:
+                found.update(keys)
+    matched = [key for key in groups if key in found]
+    missing = [key for key in groups if key not in found]
     return matched, missing
 
+# ---------- Vectorized scan masks ----------
+class _ScanMasks:
+    """Per-sheet boolean masks shared by the header scanners (built once per sheet)."""
+
+    __slots__ = ("filled", "text")
+
+    def __init__(self, filled: np.ndarray, text: np.ndarray):
+        self.filled = filled  # cell not in (None, "", " ")
+        self.text = text      # non-blank str cell
+
+def _sheet_scan_masks(ws: Any) -> _ScanMasks:
+    masks = getattr(ws, "_scan_masks", None)
+    if masks is not None:
+        return masks
+    if hasattr(ws, "scan_masks"):
+        filled, is_str = ws.scan_masks()
+    else:
+        grid = np.full((ws.max_row, ws.max_column), None, dtype=object)
+        for r, row_vals in enumerate(
+            ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column, values_only=True)
+        ):
+            grid[r, : len(row_vals)] = row_vals
+        is_str = np.fromiter((type(v) is str for v in grid.flat), dtype=bool, count=grid.size).reshape(grid.shape)
+        filled = ~np.equal(grid, None)
+        if is_str.any():
+            blank = np.isin(grid[is_str], ["", " "])
+            filled[is_str] = ~blank
+            is_str[is_str] = ~blank
+    masks = _ScanMasks(filled, is_str)
+    ws._scan_masks = masks
+    return masks
+
+def _header_candidate_rows(
+    ws: Any,
+    masks: _ScanMasks,
+    max_r: int,
+    max_c: int,
+    anchors: set[str],
+    norm: Callable[[Any], str],
+    min_text: int,
+) -> List[int]:
+    """1-based rows with at least ``min_text`` text cells, one of which normalizes into ``anchors``.
+
+    Works column by column: each distinct text of a column is normalized once,
+    so long data blocks (mostly unique IDs and names) cost one hash pass each.
+    Both normalizers keep words as they appear in the lowercased text, so only
+    texts containing the longest word of some anchor are normalized at all.
+    """
+    text = masks.text[:max_r, :max_c]
+    dense = text.sum(axis=1) >= min_text
+    words = sorted({re.escape(max(a.split(), key=len)) for a in anchors if a})
+    if not words or not dense.any():
+        return []
+    cells = text & dense[:, None]
+    columnar = hasattr(ws, "column_is_numeric")
+    has_word = re.compile("|".join(words)).search
+    hits: Dict[Any, bool] = {}
+    found = np.zeros(len(dense), dtype=bool)
+    for c in np.flatnonzero(cells.any(axis=0)).tolist():
+        rows = np.flatnonzero(cells[:, c])
+        if columnar and not ws.column_is_numeric(c + 1):
+            values = ws.column(c + 1, 1, max_r)[rows]
+        else:
+            values = np.array([ws.cell(row=r + 1, column=c + 1).value for r in rows.tolist()], dtype=object)
+        matched = []
+        for v in pd.unique(values).tolist():
+            if not has_word(str(v).lower()):
+                continue
+            hit = hits.get(v)
+            if hit is None:
+                hit = hits[v] = norm(v) in anchors
+            if hit:
+                matched.append(v)
+        if matched:
+            found[rows[pd.Index(values).isin(matched)]] = True
+    return (np.flatnonzero(found) + 1).tolist()
+
+def _block_end(masks: _ScanMasks, r: int, c1: int, c2: int, max_r: int) -> int:
+    """First row after header row ``r`` whose columns c1..c2 are all blank (``max_r + 1`` if none)."""
+    if r >= max_r:
+        return r + 1
+    blank = np.flatnonzero(~masks.filled[r:max_r, c1 - 1 : c2].any(axis=1))
+    return r + 1 + int(blank[0]) if blank.size else max_r + 1
+
 # ---------- Détection de tous les blocs (avec extension gauche pour colonne label) ----------
 def detect_all_blocks_with_left_extension(ws, max_added_left: int = 5) -> List[Tuple[int, int, int, int]]:
     max_r, max_c = ws.max_row, ws.max_column
     scan_max_r = min(max_r, max(50, _SCAN_MAX_ROWS))
     blocks: List[Tuple[int, int, int, int]] = []
-    r = 1
-    while r <= scan_max_r:
-        row_vals = next(
-            ws.iter_rows(
-                min_row=r,
-                max_row=r,
-                min_col=1,
-                max_col=max_c,
-                values_only=True,
-            ),
-            None,
-        )
-        headers = list(row_vals) if row_vals else []
-        if not any(headers):
-            r += 1
+    if scan_max_r <= 0 or max_c <= 0:
+        return blocks
+    masks = _sheet_scan_masks(ws)
+    required = {_norm(rc) for rc in REQUIRED_COLS}
+    anchors = {_norm(REQUIRED_COLS[0])}
+    candidates = _header_candidate_rows(ws, masks, scan_max_r, max_c, anchors, _norm, len(required))
+    next_r = 1
+    for r in candidates:
+        if r < next_r:
             continue
+        headers = list(
+            next(ws.iter_rows(min_row=r, max_row=r, min_col=1, max_col=max_c, values_only=True), ())
+        )
         if not has_all_required(headers):
-            r += 1
-            continue
-
-        nz = [i + 1 for i, v in enumerate(headers) if v not in (None, "", " ")]
-        if not nz:
-            r += 1
             continue
-        c1, c2 = min(nz), max(nz)
+        nz = np.flatnonzero(masks.filled[r - 1, :max_c])
+        c1, c2 = int(nz[0]) + 1, int(nz[-1]) + 1
 
         # Descend to end of block
-        r2 = r + 1
-        while r2 <= scan_max_r:
-            vals = next(
-                ws.iter_rows(
-                    min_row=r2,
-                    max_row=r2,
-                    min_col=c1,
-                    max_col=c2,
-                    values_only=True,
-                ),
-                None,
-            )
-            row_vals = list(vals) if vals else []
-            if all(v in (None, "", " ") for v in row_vals):
-                break
-            r2 += 1
+        r2 = _block_end(masks, r, c1, c2, scan_max_r)
 
         # Extend left if column before has data
         added = 0
-        while c1 > 1 and added < max_added_left:
-            any_data = False
-            for vals in ws.iter_rows(
-                min_row=r + 1,
-                max_row=r2 - 1,
-                min_col=c1 - 1,
-                max_col=c1 - 1,
-                values_only=True,
-            ):
-                v = vals[0] if vals else None
-                if v not in (None, "", " "):
-                    any_data = True
-                    break
-            if any_data:
-                c1 -= 1
-                added += 1
-            else:
-                break
+        while c1 > 1 and added < max_added_left and masks.filled[r : r2 - 1, c1 - 2].any():
+            c1 -= 1
+            added += 1
 
         blocks.append((r, c1, r2 - 1, c2))
-        r = r2 + 1
+        next_r = r2 + 1
     return blocks
 
 # ---------- Detection: summary + assignments tables ----------
+_ACTIVITY_ID_HEADERS = {_norm_header(h) for h in SUMMARY_HEADER_GROUPS["activity id"]} | {
+    _norm_header(h) for h in ASSIGN_HEADER_GROUPS["activity id"]
+}
+
 def _scan_tables(ws: Any, max_r: int, max_c: int) -> List[Dict[str, Any]]:
+    """Tables whose header row is in the first ``max_r`` x ``max_c`` cells of ``ws``."""
     rows: List[Dict[str, Any]] = []
-    r = 1
-    while r <= max_r:
-        row_vals = next(
-            ws.iter_rows(
-                min_row=r,
-                max_row=r,
-                min_col=1,
-                max_col=max_c,
-                values_only=True,
-            ),
-            None,
-        )
-        headers = list(row_vals) if row_vals else []
-        if not any(headers):
-            r += 1
+    if max_r <= 0 or max_c <= 0:
+        return rows
+    masks = _sheet_scan_masks(ws)
+    # Both table types need an Activity ID header plus two more matched text headers.
+    candidates = _header_candidate_rows(ws, masks, max_r, max_c, _ACTIVITY_ID_HEADERS, _norm_header, 3)
+    next_r = 1
+    for r in candidates:
+        if r < next_r:
             continue
+        headers = list(
+            next(ws.iter_rows(min_row=r, max_row=r, min_col=1, max_col=max_c, values_only=True), ())
+        )
         matched_summary, missing_summary = _match_header_groups(headers, SUMMARY_HEADER_GROUPS)
         matched_assign, missing_assign = _match_header_groups(headers, ASSIGN_HEADER_GROUPS)
-        date_cols = sum(1 for h in headers if _is_week_header(h))
+        date_cols = _week_index(headers).week_headers
         summary_ok = (
             "activity id" in matched_summary and
             ("finish" in matched_summary or "bl project finish" in matched_summary) and
@@ -672,29 +1967,10 @@ def _scan_tables(ws: Any, max_r: int, max_c: int) -> List[Dict[str, Any]]:
             date_cols >= 1
         )
         if not summary_ok and not assign_ok:
-            r += 1
-            continue
-        nz = [i + 1 for i, v in enumerate(headers) if v not in (None, "", " ")]
-        if not nz:
-            r += 1
             continue
-        c1, c2 = min(nz), min(max(nz), max_c)
-        r2 = r + 1
-        while r2 <= max_r:
-            vals = next(
-                ws.iter_rows(
-                    min_row=r2,
-                    max_row=r2,
-                    min_col=c1,
-                    max_col=c2,
-                    values_only=True,
-                ),
-                None,
-            )
-            row_vals = list(vals) if vals else []
-            if all(v in (None, "", " ") for v in row_vals):
-                break
-            r2 += 1
+        nz = np.flatnonzero(masks.filled[r - 1, :max_c])
+        c1, c2 = int(nz[0]) + 1, int(nz[-1]) + 1
+        r2 = _block_end(masks, r, c1, c2, max_r)
         rows.append({
             "sheet": ws.title,
             "range": f"R{r}C{c1}:R{r2-1}C{c2}",
@@ -703,31 +1979,116 @@ def _scan_tables(ws: Any, max_r: int, max_c: int) -> List[Dict[str, Any]]:
             "missing": missing_summary if summary_ok else missing_assign,
             "date_columns": date_cols,
         })
-        r = r2 + 1
+        next_r = r2 + 1
     return rows
 
+def _used_extent(masks: _ScanMasks) -> Tuple[int, int]:
+    """(last row, last column), 1-based, holding a filled cell; (0, 0) for an empty sheet."""
+    rows = np.flatnonzero(masks.filled.any(axis=1))
+    if not rows.size:
+        return 0, 0
+    cols = np.flatnonzero(masks.filled.any(axis=0))
+    return int(rows[-1]) + 1, int(cols[-1]) + 1
 
 def detect_expected_tables_in_workbook(wb: Any) -> List[Dict[str, Any]]:
+    """One pass per sheet over its used range (capped at _DETECT_MAX_ROWS x _DETECT_MAX_COLS)."""
     all_results: List[Dict[str, Any]] = []
-    scan_limits = [
-        (min(_SCAN_MAX_ROWS, 200), min(_SCAN_MAX_COLS, 80)),          # fast
-        (min(_SCAN_MAX_ROWS, 8000), min(_SCAN_MAX_COLS, 600)),        # normal
-        (_SCAN_MAX_ROWS * 2, _SCAN_MAX_COLS * 2),                     # wide
-    ]
-
     for ws in wb.worksheets:
-        ws_results: List[Dict[str, Any]] = []
-        for max_r, max_c in scan_limits:
-            ws_results = _scan_tables(ws, min(ws.max_row, max_r), min(ws.max_column, max_c))
-            if ws_results:
-                all_results.extend(ws_results)
-                break
+        if ws.max_row <= 0 or ws.max_column <= 0:
+            continue
+        used_r, used_c = _used_extent(_sheet_scan_masks(ws))
+        all_results.extend(_scan_tables(ws, min(used_r, _DETECT_MAX_ROWS), min(used_c, _DETECT_MAX_COLS)))
     return all_results
 
 
-def detect_expected_tables(input_xlsx: str) -> List[Dict[str, Any]]:
-    wb = _load_workbook_fast(input_xlsx)
-    return detect_expected_tables_in_workbook(wb)
+def _mask_digest(mask: np.ndarray) -> bytes:
+    return hashlib.blake2b(np.packbits(mask).tobytes(), digest_size=16).digest()
+
+def _layout_signature(wb: Any) -> Tuple[Any, ...]:
+    """Per sheet: size, which cells are filled / hold text, and the candidate header rows.
+
+    Table detection and the schedule-table scan only look at these (header
+    values, blank rows, Spreadsheet Field markers aside), so two workbooks with
+    the same signature have the same tables at the same ranges.
+    """
+    sheets: List[Tuple[Any, ...]] = []
+    for ws in wb.worksheets:
+        max_r, max_c = ws.max_row, ws.max_column
+        if max_r <= 0 or max_c <= 0:
+            sheets.append((ws.title, max_r, max_c))
+            continue
+        masks = _sheet_scan_masks(ws)
+        rows = _header_candidate_rows(ws, masks, max_r, max_c, _ACTIVITY_ID_HEADERS, _norm_header, 3)
+        headers = tuple(
+            tuple(next(ws.iter_rows(min_row=r, max_row=r, min_col=1, max_col=max_c, values_only=True), ()))
+            for r in rows
+        )
+        sheets.append(
+            (ws.title, max_r, max_c, _mask_digest(masks.filled), _mask_digest(masks.text), tuple(rows), headers)
+        )
+    return tuple(sheets)
+
+
+# ---------- Table catalog (one detection pass per workbook) ----------
+_TABLE_PUBLIC_KEYS = ("sheet", "range", "header_row", "type", "missing", "date_columns")
+
+def _public_table(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: entry[k] for k in _TABLE_PUBLIC_KEYS if k in entry}
+
+@traced("detect")
+def _build_table_catalog(wb: Any, tables: List[Dict[str, Any]] | None = None) -> List[Dict[str, Any]]:
+    """Catalog of the detected tables (``tables``: reuse a previous detection of the same layout)."""
+    catalog: List[Dict[str, Any]] = []
+    if tables is None:
+        tables = detect_expected_tables_in_workbook(wb)
+    else:
+        TRACER.annotate(reused=True)
+    for table in tables:
+        ws = wb[table["sheet"]]
+        r1, c1, _, c2 = _parse_range(table["range"])
+        header_row = next(
+            ws.iter_rows(min_row=r1, max_row=r1, min_col=c1, max_col=c2, values_only=True),
+            (),
+        )
+        headers = list(header_row)
+        entry = dict(table)
+        entry["headers"] = headers
+        entry["norm_headers"] = [_norm_header(h) for h in headers]
+        entry["week_columns"] = _week_index(headers).columns
+        entry["column_values"] = {}
+        field_idx = _find_header_idx(headers, "Spreadsheet Field")
+        entry["spreadsheet_fields"] = (
+            _table_column_values(wb, entry, field_idx) if field_idx is not None else []
+        )
+        catalog.append(entry)
+    TRACER.annotate(tables=len(catalog))
+    return catalog
+
+def _table_catalog(wb: Any, session: WorkbookSession | None = None) -> List[Dict[str, Any]]:
+    if session is not None:
+        return session.catalog()
+    return _build_table_catalog(wb)
+
+def _table_column_values(wb: Any, entry: Dict[str, Any], idx: int) -> List[str]:
+    """Distinct non-empty values (as text, first-seen order) of one table column, memoized."""
+    cache = entry.setdefault("column_values", {})
+    if idx not in cache:
+        ws = wb[entry["sheet"]]
+        r1, c1, r2, _ = _parse_range(entry["range"])
+        seen: Dict[str, None] = {}
+        for row in ws.iter_rows(min_row=r1 + 1, max_row=r2, min_col=c1 + idx, max_col=c1 + idx, values_only=True):
+            v = row[0] if row else None
+            if v is not None:
+                seen.setdefault(str(v), None)
+        cache[idx] = list(seen)
+    return cache[idx]
+
+def detect_expected_tables(
+    input_xlsx: str | None,
+    session: WorkbookSession | None = None,
+) -> List[Dict[str, Any]]:
+    session = _session_for(input_xlsx, session)
+    return session.tables()
 
 def _parse_range(range_str: str) -> Tuple[int, int, int, int]:
     m = re.match(r"R(\d+)C(\d+):R(\d+)C(\d+)", range_str)
@@ -735,54 +2096,90 @@ def _parse_range(range_str: str) -> Tuple[int, int, int, int]:
         raise ValueError(f"Invalid range: {range_str}")
     return tuple(int(x) for x in m.groups())
 
-def compare_activity_ids(
-    input_xlsx: str,
-    column_mapping: dict[str, dict[str, str]] | None = None,
+def _table_activity_ids(
+    wb: Any,
+    table: Dict[str, Any],
+    column_mapping: dict[str, dict[str, str]] | None,
+) -> set[str] | None:
+    """Distinct stripped, non-blank Activity IDs of one table (None without an Activity ID column)."""
+    header = list(table["headers"])
+    mapping = (column_mapping or {}).get(table["type"])
+    if mapping:
+        _, header = _apply_column_mapping(pd.DataFrame(), header, mapping)
+    id_idx = next((idx for idx, v in enumerate(header) if str(v).strip() == "Activity ID"), None)
+    if id_idx is None:
+        return None
+    r1, c1, r2, _ = _parse_range(table["range"])
+    col = c1 + id_idx
+    column = wb[table["sheet"]].iter_rows(min_row=r1 + 1, max_row=r2, min_col=col, max_col=col, values_only=True)
+    ids = {str(v).strip() for (v,) in column if v is not None}
+    ids.discard("")
+    return ids
+
+def _compare_activity_ids(
+    wb: Any,
+    tables: List[Dict[str, Any]],
+    column_mapping: dict[str, dict[str, str]] | None,
 ) -> Dict[str, Any]:
-    wb = _load_workbook_fast(input_xlsx)
-    tables = detect_expected_tables_in_workbook(wb)
-    summary_ids: List[str] = []
-    assign_ids: List[str] = []
-
+    per_table = []
     for t in tables:
-        ws = wb[t["sheet"]]
-        r1, c1, r2, c2 = _parse_range(t["range"])
-        header = [ws.cell(r1, c).value for c in range(c1, c2 + 1)]
-        mapping = (column_mapping or {}).get(t["type"])
-        if mapping:
-            _, header = _apply_column_mapping(pd.DataFrame(), header, mapping)
-        id_idx = None
-        for idx, v in enumerate(header):
-            if str(v).strip() == "Activity ID":
-                id_idx = idx
-                break
-        if id_idx is None:
+        if t["type"] not in ("activity_summary", "resource_assignments"):
             continue
-        for r in range(r1 + 1, r2 + 1):
-            val = ws.cell(r, c1 + id_idx).value
-            if val is None or str(val).strip() == "":
-                continue
-            if t["type"] == "activity_summary":
-                summary_ids.append(str(val))
-            elif t["type"] == "resource_assignments":
-                assign_ids.append(str(val))
-
-    summary_set = {s.strip() for s in summary_ids}
-    assign_set = {s.strip() for s in assign_ids}
+        ids = _table_activity_ids(wb, t, column_mapping)
+        if ids is not None:
+            per_table.append((t, ids))
+    summary_set: set[str] = set()
+    assign_set: set[str] = set()
+    for t, ids in per_table:
+        (summary_set if t["type"] == "activity_summary" else assign_set).update(ids)
+
+    table_counts = []
+    for t, ids in per_table:
+        other = assign_set if t["type"] == "activity_summary" else summary_set
+        table_counts.append(
+            {
+                "sheet": t["sheet"],
+                "range": t["range"],
+                "type": t["type"],
+                "unique": len(ids),
+                "only_in_table": len(ids - other),
+                "missing_from_table": len(other - ids),
+            }
+        )
     return {
         "summary_unique": len(summary_set),
         "assign_unique": len(assign_set),
         "summary_only": sorted(summary_set - assign_set),
         "assign_only": sorted(assign_set - summary_set),
+        "tables": table_counts,
     }
 
+def compare_activity_ids(
+    input_xlsx: str | None,
+    column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
+) -> Dict[str, Any]:
+    """
+    Unique Activity IDs of the summary vs the assignments tables (both sides
+    should list the same activities). ``tables`` holds, per table, its unique
+    count and how many IDs it has that the other side lacks (only_in_table)
+    and vice versa (missing_from_table). Memoized per session and mapping.
+    """
+    session = _session_for(input_xlsx, session)
+    return session.derived(
+        ("compare_activity_ids", _mapping_key(column_mapping)),
+        lambda: _compare_activity_ids(session.wb, session.catalog(), column_mapping),
+    )
+
 def _row_count(t: Dict[str, Any]) -> int:
     r1, _, r2, _ = _parse_range(t["range"])
     return r2 - r1
 
+@traced("load_table")
 def _load_table_from_meta(
     wb: Any, table: Dict[str, Any]
 ) -> Tuple[pd.DataFrame, Dict[str, Any], list[Any]]:
+    TRACER.annotate(sheet=table["sheet"], range=table["range"])
     ws = wb[table["sheet"]]
     r1, c1, r2, c2 = _parse_range(table["range"])
     rows = list(
@@ -820,37 +2217,57 @@ def _load_table_from_meta(
     trimmed_raw_headers = raw_headers[left_trim:end]
     return df, meta, trimmed_raw_headers
 
+def _load_table_cached(
+    wb: Any,
+    table: Dict[str, Any],
+    session: WorkbookSession | None = None,
+) -> Tuple[pd.DataFrame, Dict[str, Any], list[Any]]:
+    # Loaded frames are shared between callers: treat them as read-only.
+    if session is None:
+        return _load_table_from_meta(wb, table)
+    df, meta, raw_headers = session.derived(
+        ("table", table["sheet"], table["range"]),
+        lambda: _load_table_from_meta(wb, table),
+    )
+    return df, dict(meta), list(raw_headers)
+
 def _load_detected_table_wb(
     wb: Any,
     table_type: str,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, Any], list[Any]] | None:
-    tables = [t for t in detect_expected_tables_in_workbook(wb) if t["type"] == table_type]
+    tables = [t for t in _table_catalog(wb, session) if t["type"] == table_type]
     if not tables:
         return None
     table = max(tables, key=_row_count)
-    df, meta, raw_headers = _load_table_from_meta(wb, table)
+    df, meta, raw_headers = _load_table_cached(wb, table, session)
     mapping = (column_mapping or {}).get(table_type)
     df, raw_headers = _apply_column_mapping(df, raw_headers, mapping)
     return df, meta, raw_headers
 
 
 def _load_detected_table(
-    input_xlsx: str,
+    input_xlsx: str | None,
     table_type: str,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, Any], list[Any]] | None:
-    wb = _load_workbook_fast(input_xlsx)
-    return _load_detected_table_wb(wb, table_type, column_mapping=column_mapping)
+    session = _session_for(input_xlsx, session)
+    return _load_detected_table_wb(
+        session.wb,
+        table_type,
+        column_mapping=column_mapping,
+        session=session,
+    )
 
 def _load_resource_assignments_table_wb(
     wb: Any,
     spreadsheet_field_marker: str | None,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, Any], list[Any], bool] | None:
-    tables = [
-        t for t in detect_expected_tables_in_workbook(wb) if t["type"] == "resource_assignments"
-    ]
+    tables = [t for t in _table_catalog(wb, session) if t["type"] == "resource_assignments"]
     if not tables:
         return None
 
@@ -858,26 +2275,19 @@ def _load_resource_assignments_table_wb(
     if spreadsheet_field_marker:
         marker = spreadsheet_field_marker.lower()
         for t in tables:
-            ws = wb[t["sheet"]]
-            r1, c1, r2, c2 = _parse_range(t["range"])
-            raw_headers = [ws.cell(r1, c).value for c in range(c1, c2 + 1)]
+            raw_headers = list(t["headers"])
             mapping = (column_mapping or {}).get("resource_assignments")
             if mapping:
                 _, raw_headers = _apply_column_mapping(pd.DataFrame(), raw_headers, mapping)
             field_idx = _find_header_idx(raw_headers, "Spreadsheet Field")
             if field_idx is None:
                 continue
-            for r in range(r1 + 1, r2 + 1):
-                val = ws.cell(r, c1 + field_idx).value
-                if val is None:
-                    continue
-                if marker in str(val).lower():
-                    matches.append(t)
-                    break
+            if any(marker in v.lower() for v in _table_column_values(wb, t, field_idx)):
+                matches.append(t)
 
     candidates = matches if matches else tables
     table = max(candidates, key=_row_count)
-    df, meta, raw_headers = _load_table_from_meta(wb, table)
+    df, meta, raw_headers = _load_table_cached(wb, table, session)
     mapping = (column_mapping or {}).get("resource_assignments")
     df, raw_headers = _apply_column_mapping(df, raw_headers, mapping)
     matched = bool(matches) and table in matches
@@ -886,31 +2296,120 @@ def _load_resource_assignments_table_wb(
     return df, meta, raw_headers, matched
 
 def _load_resource_assignments_table(
-    input_xlsx: str,
+    input_xlsx: str | None,
     spreadsheet_field_marker: str | None,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, Any], list[Any], bool] | None:
-    wb = _load_workbook_fast(input_xlsx)
+    session = _session_for(input_xlsx, session)
     return _load_resource_assignments_table_wb(
-        wb,
+        session.wb,
         spreadsheet_field_marker,
         column_mapping=column_mapping,
+        session=session,
     )
 
-def build_schedule_lookup(
-    input_xlsx: str | None = None,
-    today: date | None = None,
-    column_mapping: dict[str, dict[str, str]] | None = None,
-    wb: Any | None = None,
-) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
-    """
-    Calcule Schedule % depuis le tableau Ressource Assignments :
-      Schedule % = valeur de la semaine courante / Budgeted Units * 100
+SCHEDULE_TABLE_MARKER = "Cum Budgeted Units"
+
+def _scan_schedule_table(
+    wb: Any, mapping: Dict[str, str], session: WorkbookSession | None = None
+) -> Dict[str, Any] | None:
+    """Pick the planned (Cum Budgeted Units) assignments table used by build_schedule_lookup.
+
+    Candidates are the catalog's resource_assignments tables, in sheet order:
+    the first whose Spreadsheet Field column holds the marker, else the
+    largest. Only that column of each table up to the pick is read.
     """
-    info: Dict[str, Any] = {
-        "status": "ok",
-        "week_date": None,
-        "week_col": None,
+    marker = SCHEDULE_TABLE_MARKER
+    field_variants = _table_field_variants("resource_assignments")
+
+    def _idx(headers: list[Any], canonical: str) -> int | None:
+        mapped = mapping.get(canonical)
+        if mapped:
+            return _find_header_idx_norm(headers, [mapped])
+        variants = field_variants.get(canonical, [canonical])
+        return _find_header_idx_norm(headers, variants)
+
+    best: dict[str, Any] | None = None
+    scanned: List[Tuple[str, int, int | None, int, bool]] = []
+    for entry in _table_catalog(wb, session):
+        if entry["type"] != "resource_assignments":
+            continue
+        r, c1, last_r, _ = _parse_range(entry["range"])
+        table_headers = list(entry["headers"])
+        field_idx = _idx(table_headers, "Spreadsheet Field")
+        marker_abs_idx = (c1 - 1) + field_idx if field_idx is not None else None
+        matched_marker = field_idx is not None and any(
+            marker.lower() in v.lower() for v in _table_column_values(wb, entry, field_idx)
+        )
+        scanned.append((entry["sheet"], r, marker_abs_idx, last_r + 1, matched_marker))
+
+        candidate = {
+            "sheet": entry["sheet"],
+            "range": entry["range"],
+            "header_row": r,
+            "headers": table_headers,
+            "marker": marker,
+            "marker_matched": matched_marker,
+        }
+        if best is None:
+            best = candidate
+        else:
+            best_rows = (_parse_range(best["range"])[2] - _parse_range(best["range"])[0])
+            if candidate["marker_matched"] and not best["marker_matched"]:
+                best = candidate
+            elif candidate["marker_matched"] == best["marker_matched"] and last_r - r > best_rows:
+                best = candidate
+        if matched_marker:
+            break
+
+    if best is not None:
+        best["scanned"] = scanned
+    return best
+
+def _replay_schedule_scan(wb: Any, best: Dict[str, Any]) -> bool:
+    """Whether ``best`` (a scan of a workbook with the same layout) still holds for ``wb``.
+
+    Same layout means the same candidate tables; only their Spreadsheet Field
+    markers can differ, so those are the only cells re-read.
+    """
+    marker = SCHEDULE_TABLE_MARKER.lower()
+    for sheet, r, marker_abs_idx, r2, matched_marker in best.get("scanned", ()):
+        matched = False
+        if marker_abs_idx is not None and r2 > r + 1:
+            col = marker_abs_idx + 1
+            for row in wb[sheet].iter_rows(min_row=r + 1, max_row=r2 - 1, min_col=col, max_col=col, values_only=True):
+                v = row[0] if row else None
+                if v is not None and marker in str(v).lower():
+                    matched = True
+                    break
+        if matched != matched_marker:
+            return False
+    return True
+
+def _schedule_table(session: WorkbookSession, mapping: Dict[str, str]) -> Dict[str, Any] | None:
+    previous = session.reusable(("schedule_table", _mapping_key(mapping)), same_layout=True)
+    if previous is not None and _replay_schedule_scan(session.wb, previous):
+        TRACER.annotate(reused=True)
+        return previous
+    return _scan_schedule_table(session.wb, mapping, session)
+
+@traced("lookup")
+def build_schedule_lookup(
+    input_xlsx: str | None = None,
+    today: date | None = None,
+    column_mapping: dict[str, dict[str, str]] | None = None,
+    wb: Any | None = None,
+    session: WorkbookSession | None = None,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """
+    Calcule Schedule % depuis le tableau Ressource Assignments :
+      Schedule % = valeur de la semaine courante / Budgeted Units * 100
+    """
+    info: Dict[str, Any] = {
+        "status": "ok",
+        "week_date": None,
+        "week_col": None,
         "table": None,
         "errors": [],
     }
@@ -924,14 +2423,13 @@ def build_schedule_lookup(
             values.append(row[0] if row else None)
         return values
 
-    t0 = perf_counter()
     if wb is None:
-        if not input_xlsx:
+        if not input_xlsx and session is None:
             raise ValueError("input_xlsx is required when wb is not provided")
-        wb = _load_workbook_fast(input_xlsx)
-        info["timings"] = {"open_ms": (perf_counter() - t0) * 1000.0}
+        session = _session_for(input_xlsx, session)
+        wb = session.wb
     else:
-        info["timings"] = {"open_ms": 0.0}
+        session = None
     mapping = (column_mapping or {}).get("resource_assignments") or {}
     field_variants = _table_field_variants("resource_assignments")
 
@@ -942,90 +2440,16 @@ def build_schedule_lookup(
         variants = field_variants.get(canonical, [canonical])
         return _find_header_idx_norm(headers, variants)
 
-    marker = "Cum Budgeted Units"
-    t1 = perf_counter()
-    best: dict[str, Any] | None = None
-    for ws in wb.worksheets:
-        max_r, max_c = ws.max_row, ws.max_column
-        scan_max_c = min(max_c, max(20, _SCAN_MAX_COLS))
-        scan_max_r = min(max_r, max(50, _SCAN_MAX_ROWS))
-        row_iter = ws.iter_rows(
-            min_row=1,
-            max_row=scan_max_r,
-            min_col=1,
-            max_col=scan_max_c,
-            values_only=True,
-        )
-        r = 0
-        for scan_row in row_iter:
-            r += 1
-            scan_headers = list(scan_row) if scan_row else []
-            if not any(scan_headers):
-                continue
-            matched_assign, _missing_assign = _match_header_groups(scan_headers, ASSIGN_HEADER_GROUPS)
-            date_cols = sum(1 for h in scan_headers if _is_week_header(h))
-            assign_ok = (
-                {"activity id", "budgeted units", "spreadsheet field"}.issubset(set(matched_assign))
-                and date_cols >= 1
-            )
-            if not assign_ok:
-                continue
-
-            nz = [i + 1 for i, v in enumerate(scan_headers) if v not in (None, "", " ")]
-            if not nz:
-                continue
-            c1, c2 = min(nz), min(max(nz), scan_max_c)
-
-            table_headers = scan_headers[c1 - 1 : c2]
-            field_idx = _idx(table_headers, "Spreadsheet Field")
-            matched_marker = False
-            if field_idx is not None:
-                marker_abs_idx = (c1 - 1) + field_idx
-            else:
-                marker_abs_idx = None
-
-            r2 = r + 1
-            data_iter = ws.iter_rows(
-                min_row=r + 1,
-                max_row=max_r,
-                min_col=1,
-                max_col=scan_max_c,
-                values_only=True,
+    marker = SCHEDULE_TABLE_MARKER
+    with trace_span("scan_table"):
+        if session is not None:
+            best = session.derived(
+                ("schedule_table", _mapping_key(mapping)),
+                lambda: _schedule_table(session, mapping),
             )
-            for next_row in data_iter:
-                row_vals = list(next_row[c1 - 1 : c2])
-                if all(v in (None, "", " ") for v in row_vals):
-                    break
-                if marker_abs_idx is not None:
-                    v = next_row[marker_abs_idx] if marker_abs_idx < len(next_row) else None
-                    if v is not None and marker.lower() in str(v).lower():
-                        matched_marker = True
-                r2 += 1
-
-            candidate = {
-                "sheet": ws.title,
-                "range": f"R{r}C{c1}:R{r2-1}C{c2}",
-                "header_row": r,
-                "headers": table_headers,
-                "marker": marker,
-                "marker_matched": matched_marker,
-            }
-            cand_rows = (r2 - 1) - r
-            if best is None:
-                best = candidate
-            else:
-                best_rows = (_parse_range(best["range"])[2] - _parse_range(best["range"])[0])
-                if candidate["marker_matched"] and not best["marker_matched"]:
-                    best = candidate
-                elif candidate["marker_matched"] == best["marker_matched"] and cand_rows > best_rows:
-                    best = candidate
-
-            if matched_marker:
-                break
-        if best is not None and best["marker_matched"]:
-            break
+        else:
+            best = _scan_schedule_table(wb, mapping)
 
-    info["timings"]["detect_ms"] = (perf_counter() - t1) * 1000.0
     if best is None:
         info["status"] = "missing_table"
         info["errors"].append("Resource assignments table not found.")
@@ -1052,17 +2476,8 @@ def build_schedule_lookup(
         info["errors"].append("Missing Activity ID or Budgeted Units columns in resource assignments.")
         return {}, info
 
-    week_idx = None
-    for idx, h in enumerate(headers):
-        h_date = _to_excel_date(h)
-        if not h_date:
-            continue
-        planned_shift = timedelta(days=7)  # shift Cum Budgeted Units 1 week into the future
-
-        planned_week = _week_start(h_date + planned_shift)
-        if planned_week == target_week:
-            week_idx = idx
-            break
+    # Cum Budgeted Units is shifted one week into the future.
+    week_idx = _week_index(headers).column(target_week, PLANNED_WEEK_SHIFT_DAYS)
 
     if week_idx is None:
         info["status"] = "week_not_found"
@@ -1080,18 +2495,23 @@ def build_schedule_lookup(
     meta["data_row_start"] = r1 + 1
     meta["data_col_start"] = c1
 
-    t2 = perf_counter()
-    ids = _read_column_values(ws, id_col, r1 + 1, r2)
-    budgets = _read_column_values(ws, budget_col, r1 + 1, r2)
-    if week_col is None:
-        weeks = [None] * len(ids)
-    else:
-        weeks = _read_column_values(ws, week_col, r1 + 1, r2)
-    info["timings"]["read_cols_ms"] = (perf_counter() - t2) * 1000.0
+    with trace_span("read_cols", rows=max(r2 - r1, 0)):
+        ids = _read_column_values(ws, id_col, r1 + 1, r2)
+        budgets = _read_column_values(ws, budget_col, r1 + 1, r2)
+        if week_col is None:
+            weeks = [None] * len(ids)
+        else:
+            weeks = _read_column_values(ws, week_col, r1 + 1, r2)
 
     include_cells = (os.getenv("SCHEDULE_CELL_REFS", "0") or "").strip().lower() in {"1", "true", "yes", "on"}
 
-    t3 = perf_counter()
+    # Activities whose row and cells are unchanged since the previous upload
+    # keep their entry (same object, which to_wbs_tree also skips).
+    rows_key = ("schedule_rows", meta["sheet"], meta["range"], budget_idx, week_idx, target_week, include_cells)
+    previous_rows = session.reusable(rows_key) if session is not None else None
+    rows_state: Dict[str, Tuple[int, Any, Any, Dict[str, Any]]] = {}
+    reused = 0
+
     lookup: Dict[str, Dict[str, Any]] = {}
     for row_idx, (raw_id, budget_raw, week_raw) in enumerate(zip(ids, budgets, weeks)):
         if raw_id is None or str(raw_id).strip() == "":
@@ -1099,6 +2519,13 @@ def build_schedule_lookup(
         key = str(raw_id).strip()
         if key in lookup:
             continue
+        if previous_rows is not None:
+            state = previous_rows.get(key)
+            if state is not None and state[:3] == (row_idx, budget_raw, week_raw):
+                lookup[key] = state[3]
+                rows_state[key] = state
+                reused += 1
+                continue
         budget = _safe_float(budget_raw)
         week_val = _safe_float(week_raw) if week_idx is not None else None
         value = None
@@ -1124,526 +2551,631 @@ def build_schedule_lookup(
             entry["budget_cell"] = _cell_ref(meta, row_idx, budget_idx)
             entry["week_cell"] = _cell_ref(meta, row_idx, week_idx) if week_idx is not None else None
         lookup[key] = entry
-    info["timings"]["build_lookup_ms"] = (perf_counter() - t3) * 1000.0
-    info["timings"]["total_ms"] = (
-        info["timings"].get("open_ms", 0.0)
-        + info["timings"].get("detect_ms", 0.0)
-        + info["timings"].get("read_cols_ms", 0.0)
-        + info["timings"].get("build_lookup_ms", 0.0)
-    )
+        rows_state[key] = (row_idx, budget_raw, week_raw, entry)
+    if session is not None:
+        session.remember(rows_key, rows_state)
+    TRACER.annotate(activities=len(lookup), reused_rows=reused)
     return lookup, info
 
-def build_weekly_progress(
-    input_xlsx: str,
-    activity_id: str,
-    today: date | None = None,
-    column_mapping: dict[str, dict[str, str]] | None = None,
-) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    """
-    Weekly planned progress per activity:
-      Planned % = (week_value - previous_week_value) / Budgeted Units * 100
-    """
-    info: Dict[str, Any] = {
-        "status": "ok",
-        "week_date": None,
-        "current_week_date": None,
-        "current_week_label": None,
-        "table": None,
-        "errors": [],
-    }
-    wb = _load_workbook_fast(input_xlsx)
-    planned_table = _load_resource_assignments_table_wb(
-        wb,
-        "Cum Budgeted Units",
-        column_mapping=column_mapping,
-    )
-    if planned_table is None:
-        info["status"] = "missing_table"
-        info["errors"].append("Resource assignments table not found.")
-        return [], info
-
-    df, meta, raw_headers, planned_matched = planned_table
-    info["table"] = meta
-    if not planned_matched:
-        info["errors"].append("Planned table not found by Spreadsheet Field = Cum Budgeted Units.")
-
-    actual_past_table = _load_resource_assignments_table_wb(
-        wb,
-        "Cum Actual Units",
-        column_mapping=column_mapping,
-    )
-    actual_future_table = _load_resource_assignments_table_wb(
-        wb,
-        "Cum Remaining Early Units",
-        column_mapping=column_mapping,
-    )
-    actual_missing_reason_past = None
-    actual_missing_reason_future = None
-
-    actual_past_df = None
-    actual_past_headers: list[Any] = []
-    actual_past_meta: Dict[str, Any] | None = None
-    actual_past_matched = False
-
-    actual_future_df = None
-    actual_future_headers: list[Any] = []
-    actual_future_meta: Dict[str, Any] | None = None
-    actual_future_matched = False
-
-    if actual_past_table is None:
-        info["errors"].append("Actual table not found by Spreadsheet Field = Cum Actual Units.")
-        actual_missing_reason_past = "Actual unavailable: table with Cum Actual Units not found."
-    else:
-        actual_past_df, actual_past_meta, actual_past_headers, actual_past_matched = actual_past_table
-        info["actual_table_past"] = actual_past_meta
-        if not actual_past_matched:
-            info["errors"].append("Actual table not found by Spreadsheet Field = Cum Actual Units.")
-            actual_missing_reason_past = "Actual unavailable: table with Cum Actual Units not found."
-            actual_past_df = None
-
-    if actual_future_table is None:
-        info["errors"].append("Actual table not found by Spreadsheet Field = Cum Remaining Early Units.")
-        actual_missing_reason_future = "Actual unavailable: table with Cum Remaining Early Units not found."
-    else:
-        actual_future_df, actual_future_meta, actual_future_headers, actual_future_matched = actual_future_table
-        info["actual_table_future"] = actual_future_meta
-        if not actual_future_matched:
-            info["errors"].append("Actual table not found by Spreadsheet Field = Cum Remaining Early Units.")
-            actual_missing_reason_future = "Actual unavailable: table with Cum Remaining Early Units not found."
-            actual_future_df = None
-
-    if actual_future_matched:
-        remaining_dates = _week_header_dates(actual_future_headers)
-        if remaining_dates:
-            current_week = _week_start(today or date.today())
-            if remaining_dates[0] != current_week:
-                info["errors"].append(
-                    "Cum Remaining Early Units weekly columns should start at the current week."
-                )
-
-    id_idx = _find_header_idx(raw_headers, "Activity ID")
-    budget_idx = _find_header_idx(raw_headers, "Budgeted Units")
-    if id_idx is None or budget_idx is None:
-        info["status"] = "missing_columns"
-        info["errors"].append("Missing Activity ID or Budgeted Units columns in resource assignments.")
-        return [], info
-
-    planned_week_map: Dict[date, int] = {}
-    planned_label_map: Dict[date, Any] = {}
-    planned_shift = timedelta(days=7)  # shift Cum Budgeted Units 1 week into the future
-
-    for idx, h in enumerate(raw_headers):
-        h_date = _to_excel_date(h)
-        if not h_date:
+def _activity_row_index(df: pd.DataFrame, id_idx: int) -> Dict[str, int]:
+    """Activity ID -> position of its first row (blank IDs skipped)."""
+    index: Dict[str, int] = {}
+    for pos, raw_id in enumerate(df.iloc[:, id_idx].tolist()):
+        if raw_id is None:
             continue
-        week = _week_start(h_date + planned_shift)
-        if week not in planned_week_map:
-            planned_week_map[week] = idx
-            planned_label_map[week] = h
+        key = str(raw_id).strip()
+        if key and key not in index:
+            index[key] = pos
+    return index
 
+def _float_column(col: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """_safe_float over a frame column as (values, present).
 
-    today = today or date.today()
-    target_week = _week_start(today)
-    info["week_date"] = target_week.isoformat()
-    info["current_week_date"] = target_week.isoformat()
-
-    id_col = df.columns[id_idx]
-    budget_col = df.columns[budget_idx]
-    actual_past_id_col = None
-    actual_past_week_map: Dict[date, int] = {}
-    actual_past_label_map: Dict[date, Any] = {}
-    actual_past_row = None
-    actual_past_row_idx = None
-    actual_past_missing = actual_past_df is None
-
-    if actual_past_df is not None:
-        actual_past_id_idx = _find_header_idx(actual_past_headers, "Activity ID")
-        if actual_past_id_idx is None:
-            actual_past_missing = True
-            info["errors"].append("Missing Activity ID column in Cum Actual Units table.")
-            actual_missing_reason_past = "Actual unavailable: missing Activity ID (Cum Actual Units)."
-        else:
-            actual_past_id_col = actual_past_df.columns[actual_past_id_idx]
-            for idx, h in enumerate(actual_past_headers):
-                h_date = _to_excel_date(h)
-                if not h_date:
-                    continue
-                week = _week_start(h_date)
-                if week not in actual_past_week_map:
-                    actual_past_week_map[week] = idx
-                    actual_past_label_map[week] = h
-
-            for idx, r in actual_past_df.iterrows():
-                raw_id = r.get(actual_past_id_col)
-                if raw_id is None or str(raw_id).strip() == "":
-                    continue
-                if str(raw_id).strip() == str(activity_id).strip():
-                    actual_past_row = r
-                    actual_past_row_idx = idx
-                    break
-            if actual_past_row is None:
-                actual_past_missing = True
-                info["errors"].append("Activity ID not found in Cum Actual Units table.")
-                actual_missing_reason_past = "Actual unavailable: Activity ID not found in Cum Actual Units table."
-            else:
-                pass
-    actual_future_id_col = None
-    actual_future_week_map: Dict[date, int] = {}
-    actual_future_label_map: Dict[date, Any] = {}
-    actual_future_row = None
-    actual_future_row_idx = None
-    actual_future_missing = actual_future_df is None
-
-    if actual_future_df is not None:
-        actual_future_id_idx = _find_header_idx(actual_future_headers, "Activity ID")
-        if actual_future_id_idx is None:
-            actual_future_missing = True
-            info["errors"].append("Missing Activity ID column in Cum Remaining Early Units table.")
-            actual_missing_reason_future = "Actual unavailable: missing Activity ID (Cum Remaining Early Units)."
-        else:
-            actual_future_id_col = actual_future_df.columns[actual_future_id_idx]
-            for idx, h in enumerate(actual_future_headers):
-                h_date = _to_excel_date(h)
-                if not h_date:
-                    continue
-                week = _week_start(h_date)
-                if week not in actual_future_week_map:
-                    actual_future_week_map[week] = idx
-                    actual_future_label_map[week] = h
-            for idx, r in actual_future_df.iterrows():
-                raw_id = r.get(actual_future_id_col)
-                if raw_id is None or str(raw_id).strip() == "":
-                    continue
-                if str(raw_id).strip() == str(activity_id).strip():
-                    actual_future_row = r
-                    actual_future_row_idx = idx
-                    break
-            if actual_future_row is None:
-                actual_future_missing = True
-                info["errors"].append("Activity ID not found in Cum Remaining Early Units table.")
-                actual_missing_reason_future = "Actual unavailable: Activity ID not found in Cum Remaining Early Units table."
-            else:
-                # If Remaining starts at the current week, carry that first value into the next week
-                sorted_future_weeks = sorted(actual_future_week_map.keys())
-                if (
-                    sorted_future_weeks
-                    and sorted_future_weeks[0] == target_week
-                    and len(sorted_future_weeks) > 1
-                ):
-                    cur_week = sorted_future_weeks[0]
-                    next_week = sorted_future_weeks[1]
-                    cur_idx = actual_future_week_map[cur_week]
-                    next_idx = actual_future_week_map[next_week]
-                    cur_val = _safe_float(actual_future_row.get(actual_future_df.columns[cur_idx]))
-                    next_val = _safe_float(actual_future_row.get(actual_future_df.columns[next_idx]))
-                    if cur_val is not None:
-                        actual_future_row.at[actual_future_df.columns[next_idx]] = (next_val or 0.0) + cur_val
-                        # Leave the current-week Remaining value untouched; it will be ignored since
-                        # forecasting only uses weeks after the current week.
-
-    row = None
-    row_idx = None
-    for idx, r in df.iterrows():
-        raw_id = r.get(id_col)
-        if raw_id is None or str(raw_id).strip() == "":
+    NaN cells of numeric columns stay present (as NaN), the same value a row
+    lookup hands to _safe_float.
+    """
+    if isinstance(col.dtype, np.dtype) and col.dtype.kind in "biuf":
+        return col.to_numpy(dtype=np.float64), np.ones(len(col), dtype=bool)
+    vals = [_safe_float(v) for v in col.tolist()]
+    present = np.array([v is not None for v in vals], dtype=bool)
+    return np.array([np.nan if v is None else v for v in vals], dtype=np.float64), present
+
+def _gather_week_matrix(
+    df: pd.DataFrame | None, rows: np.ndarray, week_cols: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(activities x weeks) values/present for table rows ``rows`` (-1 = none) and header columns ``week_cols``."""
+    values = np.full((len(rows), len(week_cols)), np.nan)
+    present = np.zeros((len(rows), len(week_cols)), dtype=bool)
+    hit = rows >= 0
+    if df is None or not hit.any():
+        return values, present
+    sel = rows[hit]
+    for k, c in enumerate(week_cols.tolist()):
+        if c < 0:
             continue
-        if str(raw_id).strip() == str(activity_id).strip():
-            row = r
-            row_idx = idx
-            break
-
-    activity_missing = row is None
-    if activity_missing:
-        info["status"] = "activity_not_found"
-        info["errors"].append("Activity ID not found in resource assignments.")
-
-    budget = _safe_float(row.get(budget_col)) if row is not None else None
-    budget_cell = _cell_ref(meta, row_idx, budget_idx) if row_idx is not None else None
-    if budget in (None, 0):
-        if not activity_missing:
-            info["errors"].append("Budgeted Units missing or 0 for selected activity.")
-
-    planned_start_week = min(planned_week_map.keys()) if planned_week_map else None
-    planned_end_week = max(planned_week_map.keys()) if planned_week_map else None
-
-    baseline_week = planned_start_week - timedelta(days=7) if planned_start_week else None
-
-    week_dates = sorted(
-        set(planned_week_map.keys())
-        | set(actual_past_week_map.keys())
-        | set(actual_future_week_map.keys())
-        | ({baseline_week} if baseline_week else set())
-    )
-    if not week_dates:
-        info["status"] = "missing_week_columns"
-        info["errors"].append("No weekly date columns found in resource assignments.")
-        return [], info
-
-    if planned_start_week:
-        info["planned_start_week"] = planned_start_week.isoformat()
-    if planned_end_week:
-        info["planned_end_week"] = planned_end_week.isoformat()
-    info["available_end_week"] = week_dates[-1].isoformat() if week_dates else None
-    info["table_ranges"] = {
-        "planned": info.get("table"),
-        "actual_past": info.get("actual_table_past"),
-        "actual_future": info.get("actual_table_future"),
-    }
+        col_vals, col_present = _float_column(df.iloc[:, c])
+        values[hit, k] = col_vals[sel]
+        present[hit, k] = col_present[sel]
+    return values, present
+
+def _prev_values(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """Per cell, the last present value in an earlier week of the same row (0.0 if none)."""
+    pos = np.where(present, np.arange(values.shape[1]), -1)
+    last = np.maximum.accumulate(pos, axis=1)
+    prev_pos = np.full_like(last, -1)
+    prev_pos[:, 1:] = last[:, :-1]
+    prev = np.take_along_axis(values, np.maximum(prev_pos, 0), axis=1)
+    return np.where(prev_pos >= 0, prev, 0.0)
+
+class _ActualSource:
+    """One actual-side assignments table (Cum Actual Units / Cum Remaining Early Units)."""
+
+    def __init__(self, field: str, loaded: Tuple[pd.DataFrame, Dict[str, Any], list[Any], bool] | None):
+        self.field = field
+        self.df: pd.DataFrame | None = None
+        self.meta: Dict[str, Any] | None = None
+        self.headers: list[Any] = []
+        self.matched = False
+        self.table_error: str | None = None
+        self.id_error: str | None = None
+        self.reason: str | None = None
+        self.rows: Dict[str, int] = {}
+        self.labels: list[Any] = []
+        self.week_map: Dict[date, int] = {}
+        self.label_map: Dict[date, Any] = {}
+        if loaded is not None:
+            self.df, self.meta, self.headers, self.matched = loaded
+        if loaded is None or not self.matched:
+            self.table_error = f"Actual table not found by Spreadsheet Field = {field}."
+            self.reason = f"Actual unavailable: table with {field} not found."
+            self.df = None
+
+    def index(self) -> None:
+        """Row index and week columns; records the missing Activity ID column instead."""
+        if self.df is None:
+            return
+        id_idx = _find_header_idx(self.headers, "Activity ID")
+        if id_idx is None:
+            self.id_error = f"Missing Activity ID column in {self.field} table."
+            self.reason = f"Actual unavailable: missing Activity ID ({self.field})."
+            return
+        self.week_map, self.label_map = _week_index(self.headers).week_map()
+        self.rows = _activity_row_index(self.df, id_idx)
+        self.labels = self.df.index.tolist()
+
+    @property
+    def usable(self) -> bool:
+        return self.reason is None
+
+class WeeklyProgressMatrix:
+    """Weekly planned/actual progress of every activity, computed in one pass.
+
+    Columns follow ``week_dates``; rows follow ``activity_index`` (Activity ID ->
+    row, union of the planned, actual and remaining tables). Percent matrices
+    hold NaN where build_weekly_progress reports no value and the ``has_*``
+    masks tell those apart from NaN cells. ``series(activity_id)`` returns what
+    build_weekly_progress returns for that activity.
+    """
 
-    if target_week not in week_dates:
-        info["errors"].append(f"Current week {target_week.isoformat()} not found in weekly columns.")
-    else:
-        weeks_before = len([w for w in week_dates if w < target_week])
-        weeks_after = len([w for w in week_dates if w > target_week])
-        info["weeks_before"] = weeks_before
-        info["weeks_after"] = weeks_after
-
-    series: List[Dict[str, Any]] = []
-    prev_val = 0.0
-    prev_actual_val_past = 0.0
-    prev_actual_val_future = 0.0
-    for week_date in week_dates:
-        is_planned_baseline = baseline_week is not None and week_date == baseline_week
-        header = (
-            planned_label_map.get(week_date)
-            or actual_past_label_map.get(week_date)
-            or actual_future_label_map.get(week_date)
+    def __init__(
+        self,
+        session: WorkbookSession,
+        target_week: date,
+        column_mapping: dict[str, dict[str, str]] | None = None,
+    ):
+        self.target_week = target_week
+        self.week_dates: List[date] = []
+        self.activity_index: Dict[str, int] = {}
+        self._info: Dict[str, Any] = {
+            "status": "ok",
+            "week_date": None,
+            "current_week_date": None,
+            "current_week_label": None,
+            "table": None,
+            "errors": [],
+        }
+        # False when the planned table or its key columns are missing (no series at all).
+        self._complete = False
+        self._build(session, column_mapping)
+
+    def _build(self, session: WorkbookSession, column_mapping: dict[str, dict[str, str]] | None) -> None:
+        info = self._info
+        wb = session.wb
+        planned_table = _load_resource_assignments_table_wb(
+            wb, "Cum Budgeted Units", column_mapping=column_mapping, session=session
         )
-        week_label = str(header).strip() if header not in (None, "") else week_date.strftime("%d-%b-%y")
-        if week_date == target_week:
-            info["current_week_label"] = week_label
-        planned_week_idx = planned_week_map.get(week_date)
-        week_val = (
-            _safe_float(row.get(df.columns[planned_week_idx]))
-            if row is not None and planned_week_idx is not None
-            else None
+        if planned_table is None:
+            info["status"] = "missing_table"
+            info["errors"].append("Resource assignments table not found.")
+            return
+        df, meta, raw_headers, planned_matched = planned_table
+        info["table"] = meta
+        if not planned_matched:
+            info["errors"].append("Planned table not found by Spreadsheet Field = Cum Budgeted Units.")
+
+        past = _ActualSource(
+            "Cum Actual Units",
+            _load_resource_assignments_table_wb(wb, "Cum Actual Units", column_mapping=column_mapping, session=session),
         )
-        planned_week_cell = (
-            _cell_ref(meta, row_idx, planned_week_idx)
-            if row_idx is not None and planned_week_idx is not None
-            else None
+        future = _ActualSource(
+            "Cum Remaining Early Units",
+            _load_resource_assignments_table_wb(
+                wb, "Cum Remaining Early Units", column_mapping=column_mapping, session=session
+            ),
         )
-        actual_past_week_val = None
-        actual_past_week_idx = None
-        actual_past_week_cell = None
-        if not actual_past_missing and week_date in actual_past_week_map:
-            actual_past_week_idx = actual_past_week_map[week_date]
-            actual_past_week_val = _safe_float(actual_past_row.get(actual_past_df.columns[actual_past_week_idx])) if actual_past_row is not None else None
-            actual_past_week_cell = (
-                _cell_ref(actual_past_meta, actual_past_row_idx, actual_past_week_idx)
-                if actual_past_row_idx is not None and actual_past_meta is not None
-                else None
+        for source, key in ((past, "actual_table_past"), (future, "actual_table_future")):
+            if source.meta is not None:
+                info[key] = source.meta
+            if source.table_error:
+                info["errors"].append(source.table_error)
+        if future.matched:
+            remaining_dates = _week_header_dates(future.headers)
+            if remaining_dates and remaining_dates[0] != self.target_week:
+                info["errors"].append("Cum Remaining Early Units weekly columns should start at the current week.")
+
+        id_idx = _find_header_idx(raw_headers, "Activity ID")
+        budget_idx = _find_header_idx(raw_headers, "Budgeted Units")
+        if id_idx is None or budget_idx is None:
+            info["status"] = "missing_columns"
+            info["errors"].append("Missing Activity ID or Budgeted Units columns in resource assignments.")
+            return
+        self._complete = True
+        target_week = self.target_week
+        info["week_date"] = target_week.isoformat()
+        info["current_week_date"] = target_week.isoformat()
+
+        # Cum Budgeted Units is shifted one week into the future.
+        planned_week_map, planned_label_map = _week_index(raw_headers).week_map(PLANNED_WEEK_SHIFT_DAYS)
+        past.index()
+        future.index()
+        planned_rows = _activity_row_index(df, id_idx)
+
+        self.planned_start_week = min(planned_week_map) if planned_week_map else None
+        self.planned_end_week = max(planned_week_map) if planned_week_map else None
+        self.baseline_week = self.planned_start_week - timedelta(days=7) if self.planned_start_week else None
+        week_dates = sorted(
+            set(planned_week_map)
+            | set(past.week_map)
+            | set(future.week_map)
+            | ({self.baseline_week} if self.baseline_week else set())
+        )
+        self.week_dates = week_dates
+        self.week_headers = []
+        for week in week_dates:
+            header = planned_label_map.get(week) or past.label_map.get(week) or future.label_map.get(week)
+            self.week_headers.append(
+                str(header).strip() if header not in (None, "") else week.strftime("%d-%b-%y")
+            )
+
+        index: Dict[str, int] = {}
+        for rows in (planned_rows, past.rows, future.rows):
+            for key in rows:
+                index.setdefault(key, len(index))
+        self.activity_index = index
+
+        def _positions(rows: Dict[str, int]) -> np.ndarray:
+            out = np.full(len(index), -1, dtype=np.int64)
+            for key, pos in rows.items():
+                out[index[key]] = pos
+            return out
+
+        def _columns(week_map: Dict[date, int]) -> np.ndarray:
+            return np.array([week_map.get(w, -1) for w in week_dates], dtype=np.int64)
+
+        self.planned_rows = _positions(planned_rows)
+        self.actual_rows = _positions(past.rows)
+        self.forecast_rows = _positions(future.rows)
+        self.planned_cols = _columns(planned_week_map)
+        self.actual_cols = _columns(past.week_map)
+        self.forecast_cols = _columns(future.week_map)
+        self.use_future = np.array([w > target_week for w in week_dates], dtype=bool)
+
+        budget_vals, budget_present = _float_column(df.iloc[:, budget_idx])
+        found = self.planned_rows >= 0
+        self.budget = np.where(found, budget_vals[np.maximum(self.planned_rows, 0)], np.nan)
+        self.budget_present = found & budget_present[np.maximum(self.planned_rows, 0)]
+        budget_ok = (self.budget_present & (self.budget != 0))[:, None]
+        budget = self.budget[:, None]
+
+        planned, planned_present = _gather_week_matrix(df, self.planned_rows, self.planned_cols)
+        actual, actual_present = _gather_week_matrix(past.df, self.actual_rows, self.actual_cols)
+        forecast, forecast_present = _gather_week_matrix(future.df, self.forecast_rows, self.forecast_cols)
+
+        # If Remaining starts at the current week, carry that first value into the next week.
+        future_weeks = sorted(future.week_map)
+        if len(future_weeks) > 1 and future_weeks[0] == target_week:
+            cur = week_dates.index(future_weeks[0])
+            nxt = week_dates.index(future_weeks[1])
+            carry = forecast_present[:, cur]
+            keep = forecast_present[:, nxt] & (forecast[:, nxt] != 0)
+            forecast[carry, nxt] = np.where(keep, forecast[:, nxt], 0.0)[carry] + forecast[carry, cur]
+            forecast_present[carry, nxt] = True
+
+        use_future = self.use_future[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            planned_delta = planned - _prev_values(planned, planned_present)
+            actual_delta = actual - _prev_values(actual, actual_present)
+            # Only future weeks advance the Remaining baseline, so current-week Remaining
+            # does not reduce the next week's delta.
+            forecast_delta = forecast - _prev_values(forecast, forecast_present & use_future)
+
+            planned_ok = planned_present & budget_ok
+            self.has_planned_cum = planned_ok
+            self.has_planned = planned_ok & ~(planned_delta < 0)
+            self.planned_pct = np.where(self.has_planned, (planned_delta / budget) * 100.0, np.nan)
+            self.planned_cum_pct = np.where(planned_ok, (planned / budget) * 100.0, np.nan)
+            beyond_end = (self.planned_cols < 0) & np.array(
+                [bool(self.planned_end_week and w > self.planned_end_week) for w in week_dates]
             )
+            self.has_planned[np.ix_(found, beyond_end)] = True
+            self.planned_pct[np.ix_(found, beyond_end)] = 0.0
+            if self.baseline_week is not None:
+                base = week_dates.index(self.baseline_week)
+                for matrix, mask in (
+                    (self.planned_pct, self.has_planned),
+                    (self.planned_cum_pct, self.has_planned_cum),
+                ):
+                    matrix[:, base] = 0.0
+                    mask[:, base] = True
+
+            units = np.where(use_future, forecast, actual)
+            delta = np.where(use_future, forecast_delta, actual_delta)
+            actual_ok = actual_present & budget_ok
+            self.has_actual_cum = np.where(use_future, forecast_present & budget_ok, actual_ok)
+            self.has_actual = self.has_actual_cum & ~(delta < 0)
+            self.actual_pct = np.where(self.has_actual, (delta / budget) * 100.0, np.nan)
+            self.actual_cum_pct = np.where(self.has_actual_cum, (units / budget) * 100.0, np.nan)
+            self.has_actual_cum_actual = actual_ok
+            self.actual_cum_actual_pct = np.where(actual_ok, (actual / budget) * 100.0, np.nan)
+        # Cum Actual Units up to the current week, Cum Remaining Early Units after it.
+        self.units = units
+        self.units_present = np.where(use_future, forecast_present, actual_present)
+
+        self._planned_meta = meta
+        self._planned_labels = df.index.tolist()
+        self._budget_idx = budget_idx
+        self._past = past
+        self._future = future
+        # Frames are only needed to build the matrices.
+        past.df = future.df = None
+
+    def row(self, activity_id: str) -> int | None:
+        """Matrix row of ``activity_id`` (same matching as the table scan), or None."""
+        return self.activity_index.get(str(activity_id).strip())
+
+    def series(self, activity_id: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Weekly series + info for one activity (see build_weekly_progress)."""
+        info = dict(self._info)
+        info["errors"] = list(self._info["errors"])
+        for key in ("table", "actual_table_past", "actual_table_future"):
+            if info.get(key) is not None:
+                info[key] = dict(info[key])
+        if not self._complete:
+            return [], info
+
+        i = self.row(activity_id)
+        sides = []
+        for source, rows in ((self._past, self.actual_rows), (self._future, self.forecast_rows)):
+            pos = int(rows[i]) if i is not None else -1
+            reason = source.reason
+            if source.id_error:
+                info["errors"].append(source.id_error)
+            elif source.usable and pos < 0:
+                info["errors"].append(f"Activity ID not found in {source.field} table.")
+                reason = f"Actual unavailable: Activity ID not found in {source.field} table."
+            row_idx = source.labels[pos] if reason is None else None
+            sides.append((source, reason, row_idx))
+        (past, past_reason, past_row_idx), (future, future_reason, future_row_idx) = sides
+        actual_past_missing = past_reason is not None
+        actual_future_missing = future_reason is not None
+
+        pos = int(self.planned_rows[i]) if i is not None else -1
+        activity_missing = pos < 0
+        if activity_missing:
+            info["status"] = "activity_not_found"
+            info["errors"].append("Activity ID not found in resource assignments.")
+        row_idx = self._planned_labels[pos] if not activity_missing else None
+        budget = float(self.budget[i]) if not activity_missing and self.budget_present[i] else None
+        budget_cell = _cell_ref(self._planned_meta, row_idx, self._budget_idx) if row_idx is not None else None
+        if budget in (None, 0):
+            if not activity_missing:
+                info["errors"].append("Budgeted Units missing or 0 for selected activity.")
+
+        week_dates = self.week_dates
+        target_week = self.target_week
+        if not week_dates:
+            info["status"] = "missing_week_columns"
+            info["errors"].append("No weekly date columns found in resource assignments.")
+            return [], info
+
+        if self.planned_start_week:
+            info["planned_start_week"] = self.planned_start_week.isoformat()
+        if self.planned_end_week:
+            info["planned_end_week"] = self.planned_end_week.isoformat()
+        info["available_end_week"] = week_dates[-1].isoformat() if week_dates else None
+        info["table_ranges"] = {
+            "planned": info.get("table"),
+            "actual_past": info.get("actual_table_past"),
+            "actual_future": info.get("actual_table_future"),
+        }
 
-        actual_future_week_val = None
-        actual_future_week_idx = None
-        actual_future_week_cell = None
-        if not actual_future_missing and week_date in actual_future_week_map:
-            actual_future_week_idx = actual_future_week_map[week_date]
-            actual_future_week_val = _safe_float(actual_future_row.get(actual_future_df.columns[actual_future_week_idx])) if actual_future_row is not None else None
-            actual_future_week_cell = (
-                _cell_ref(actual_future_meta, actual_future_row_idx, actual_future_week_idx)
-                if actual_future_row_idx is not None and actual_future_meta is not None
+        if target_week not in week_dates:
+            info["errors"].append(f"Current week {target_week.isoformat()} not found in weekly columns.")
+        else:
+            info["weeks_before"] = len([w for w in week_dates if w < target_week])
+            info["weeks_after"] = len([w for w in week_dates if w > target_week])
+
+        def _cell(matrix: np.ndarray, mask: np.ndarray, k: int) -> float | None:
+            return float(matrix[i, k]) if i is not None and mask[i, k] else None
+
+        series: List[Dict[str, Any]] = []
+        for k, week_date in enumerate(week_dates):
+            is_planned_baseline = self.baseline_week is not None and week_date == self.baseline_week
+            week_label = self.week_headers[k]
+            if week_date == target_week:
+                info["current_week_label"] = week_label
+            planned_week_idx = int(self.planned_cols[k]) if self.planned_cols[k] >= 0 else None
+            planned_week_cell = (
+                _cell_ref(self._planned_meta, row_idx, planned_week_idx)
+                if row_idx is not None and planned_week_idx is not None
                 else None
             )
+            use_future = bool(self.use_future[k])
+            units = _cell(self.units, self.units_present, k)
+
+            actual_past_week_val = None
+            actual_past_week_idx = None
+            actual_past_week_cell = None
+            if not actual_past_missing and self.actual_cols[k] >= 0:
+                actual_past_week_idx = int(self.actual_cols[k])
+                actual_past_week_cell = _cell_ref(past.meta, past_row_idx, actual_past_week_idx)
+                if not use_future:
+                    actual_past_week_val = units
+
+            actual_future_week_val = None
+            actual_future_week_idx = None
+            actual_future_week_cell = None
+            if not actual_future_missing and self.forecast_cols[k] >= 0:
+                actual_future_week_idx = int(self.forecast_cols[k])
+                actual_future_week_cell = _cell_ref(future.meta, future_row_idx, actual_future_week_idx)
+                if use_future:
+                    actual_future_week_val = units
+
+            planned_val = None
+            planned_display = "?"
+            planned_tip = "Planned % = (Units this week - Units previous week) / Budgeted Units"
+            planned_cum_val = None
+            planned_cum_display = "?"
+            planned_cum_tip = "Cumulative Planned % = Units (week) / Budgeted Units"
 
-        planned_val = None
-        planned_display = "?"
-        planned_tip = "Planned % = (Units this week - Units previous week) / Budgeted Units"
-        planned_cum_val = None
-        planned_cum_display = "?"
-        planned_cum_tip = "Cumulative Planned % = Units (week) / Budgeted Units"
-
-        if is_planned_baseline:
-            planned_val = 0.0
-            planned_display = "0.00%"
-            planned_cum_val = 0.0
-            planned_cum_display = "0.00%"
-            planned_tip = "Baseline week inserted (planned values are shifted one week later)."
-            planned_cum_tip = planned_tip
-        elif activity_missing:
-            planned_tip = "Planned unavailable: Activity ID not found in resource assignments."
-            planned_cum_tip = "Cumulative planned unavailable: Activity ID not found in resource assignments."
-        elif planned_week_idx is None:
-            if planned_end_week and week_date > planned_end_week:
+            if is_planned_baseline:
                 planned_val = 0.0
                 planned_display = "0.00%"
-                planned_tip = "Planned % = 0 (outside baseline date range)."
-                planned_cum_tip = "Cumulative planned unavailable: week is outside baseline date range."
-            else:
-                planned_tip = f"Planned unavailable: week column {week_date.isoformat()} not found."
-                planned_cum_tip = f"Cumulative planned unavailable: week column {week_date.isoformat()} not found."
-        elif budget in (None, 0):
-            planned_tip = "Planned unavailable: Budgeted Units missing or 0."
-            planned_cum_tip = "Cumulative planned unavailable: Budgeted Units missing or 0."
-        elif week_val is None:
-            planned_tip = "Planned unavailable: week cell is empty."
-            planned_cum_tip = "Cumulative planned unavailable: week cell is empty."
-        else:
-            delta = week_val - prev_val
-            if delta < 0:
-                planned_tip = "Planned unavailable: week value decreased vs previous week."
-            else:
-                planned_val = (delta / budget) * 100.0
-                planned_display = f"{planned_val:.2f}%"
-            planned_cum_val = (week_val / budget) * 100.0
-            planned_cum_display = f"{planned_cum_val:.2f}%"
-        planned_sources = [
-            f"Week: {planned_week_cell}" if planned_week_cell else "",
-            f"Budgeted Units: {budget_cell}" if budget_cell else "",
-        ]
-        planned_tip = _append_tip_sources(planned_tip, planned_sources)
-        planned_cum_tip = _append_tip_sources(planned_cum_tip, planned_sources)
-        if week_val is not None:
-            prev_val = week_val
-
-        use_future = week_date > target_week
-        actual_val = None
-        actual_display = "?"
-        actual_cum_val = None
-        actual_cum_display = "?"
-        actual_cum_actual_val = None
-        actual_cum_actual_display = "?"
-        actual_cum_actual_tip = "Cumulative Actual % = Units (week) / Budgeted Units"
-        if use_future:
-            actual_tip = "Actual % = (Units this week - Units previous week) / Budgeted Units"
-            actual_cum_tip = "Cumulative Actual % = Units (week) / Budgeted Units"
-            if actual_future_missing:
-                actual_tip = actual_missing_reason_future or "Actual unavailable: table with Cum Remaining Early Units not found."
-                actual_cum_tip = actual_tip.replace("Actual %", "Cumulative Actual %")
-            elif actual_future_week_idx is None:
-                actual_tip = f"Actual unavailable: week column {week_date.isoformat()} not found (Cum Remaining Early Units)."
-                actual_cum_tip = f"Cumulative actual unavailable: week column {week_date.isoformat()} not found (Cum Remaining Early Units)."
+                planned_cum_val = 0.0
+                planned_cum_display = "0.00%"
+                planned_tip = "Baseline week inserted (planned values are shifted one week later)."
+                planned_cum_tip = planned_tip
+            elif activity_missing:
+                planned_tip = "Planned unavailable: Activity ID not found in resource assignments."
+                planned_cum_tip = "Cumulative planned unavailable: Activity ID not found in resource assignments."
+            elif planned_week_idx is None:
+                if self.planned_end_week and week_date > self.planned_end_week:
+                    planned_val = 0.0
+                    planned_display = "0.00%"
+                    planned_tip = "Planned % = 0 (outside baseline date range)."
+                    planned_cum_tip = "Cumulative planned unavailable: week is outside baseline date range."
+                else:
+                    planned_tip = f"Planned unavailable: week column {week_date.isoformat()} not found."
+                    planned_cum_tip = f"Cumulative planned unavailable: week column {week_date.isoformat()} not found."
             elif budget in (None, 0):
-                actual_tip = "Actual unavailable: Budgeted Units missing or 0."
-                actual_cum_tip = "Cumulative actual unavailable: Budgeted Units missing or 0."
-            elif actual_future_week_val is None:
-                actual_tip = "Actual unavailable: week cell is empty (Cum Remaining Early Units)."
-                actual_cum_tip = "Cumulative actual unavailable: week cell is empty (Cum Remaining Early Units)."
+                planned_tip = "Planned unavailable: Budgeted Units missing or 0."
+                planned_cum_tip = "Cumulative planned unavailable: Budgeted Units missing or 0."
+            elif not self.has_planned_cum[i, k]:
+                planned_tip = "Planned unavailable: week cell is empty."
+                planned_cum_tip = "Cumulative planned unavailable: week cell is empty."
             else:
-                delta_actual = actual_future_week_val - prev_actual_val_future
-                if delta_actual < 0:
-                    actual_tip = "Actual unavailable: week value decreased vs previous week (Cum Remaining Early Units)."
-                    actual_cum_tip = "Cumulative actual unavailable: week value decreased vs previous week (Cum Remaining Early Units)."
+                planned_val = _cell(self.planned_pct, self.has_planned, k)
+                if planned_val is None:
+                    planned_tip = "Planned unavailable: week value decreased vs previous week."
                 else:
-                    actual_val = (delta_actual / budget) * 100.0
-                    actual_display = f"{actual_val:.2f}%"
-                actual_cum_val = (actual_future_week_val / budget) * 100.0
-                actual_cum_display = f"{actual_cum_val:.2f}%"
-            actual_sources = [
-                f"Week: {actual_future_week_cell}" if actual_future_week_cell else "",
+                    planned_display = f"{planned_val:.2f}%"
+                planned_cum_val = _cell(self.planned_cum_pct, self.has_planned_cum, k)
+                planned_cum_display = f"{planned_cum_val:.2f}%"
+            planned_sources = [
+                f"Week: {planned_week_cell}" if planned_week_cell else "",
                 f"Budgeted Units: {budget_cell}" if budget_cell else "",
             ]
-        else:
+            planned_tip = _append_tip_sources(planned_tip, planned_sources)
+            planned_cum_tip = _append_tip_sources(planned_cum_tip, planned_sources)
+
+            actual_val = None
+            actual_display = "?"
+            actual_cum_val = None
+            actual_cum_display = "?"
+            actual_cum_actual_val = None
+            actual_cum_actual_display = "?"
             actual_tip = "Actual % = (Units this week - Units previous week) / Budgeted Units"
             actual_cum_tip = "Cumulative Actual % = Units (week) / Budgeted Units"
-            if actual_past_missing:
-                actual_tip = actual_missing_reason_past or "Actual unavailable: table with Cum Actual Units not found."
+            if use_future:
+                field, missing, reason = future.field, actual_future_missing, future_reason
+                week_idx, week_cell = actual_future_week_idx, actual_future_week_cell
+            else:
+                field, missing, reason = past.field, actual_past_missing, past_reason
+                week_idx, week_cell = actual_past_week_idx, actual_past_week_cell
+            if missing:
+                actual_tip = reason
                 actual_cum_tip = actual_tip.replace("Actual %", "Cumulative Actual %")
-            elif actual_past_week_idx is None:
-                actual_tip = f"Actual unavailable: week column {week_date.isoformat()} not found (Cum Actual Units)."
-                actual_cum_tip = f"Cumulative actual unavailable: week column {week_date.isoformat()} not found (Cum Actual Units)."
+            elif week_idx is None:
+                actual_tip = f"Actual unavailable: week column {week_date.isoformat()} not found ({field})."
+                actual_cum_tip = f"Cumulative actual unavailable: week column {week_date.isoformat()} not found ({field})."
             elif budget in (None, 0):
                 actual_tip = "Actual unavailable: Budgeted Units missing or 0."
                 actual_cum_tip = "Cumulative actual unavailable: Budgeted Units missing or 0."
-            elif actual_past_week_val is None:
-                actual_tip = "Actual unavailable: week cell is empty (Cum Actual Units)."
-                actual_cum_tip = "Cumulative actual unavailable: week cell is empty (Cum Actual Units)."
+            elif not self.has_actual_cum[i, k]:
+                actual_tip = f"Actual unavailable: week cell is empty ({field})."
+                actual_cum_tip = f"Cumulative actual unavailable: week cell is empty ({field})."
             else:
-                delta_actual = actual_past_week_val - prev_actual_val_past
-                if delta_actual < 0:
-                    actual_tip = "Actual unavailable: week value decreased vs previous week (Cum Actual Units)."
-                    actual_cum_tip = "Cumulative actual unavailable: week value decreased vs previous week (Cum Actual Units)."
+                actual_val = _cell(self.actual_pct, self.has_actual, k)
+                if actual_val is None:
+                    actual_tip = f"Actual unavailable: week value decreased vs previous week ({field})."
+                    actual_cum_tip = f"Cumulative actual unavailable: week value decreased vs previous week ({field})."
                 else:
-                    actual_val = (delta_actual / budget) * 100.0
                     actual_display = f"{actual_val:.2f}%"
-                actual_cum_val = (actual_past_week_val / budget) * 100.0
+                actual_cum_val = _cell(self.actual_cum_pct, self.has_actual_cum, k)
                 actual_cum_display = f"{actual_cum_val:.2f}%"
             actual_sources = [
+                f"Week: {week_cell}" if week_cell else "",
+                f"Budgeted Units: {budget_cell}" if budget_cell else "",
+            ]
+            actual_tip = _append_tip_sources(actual_tip, actual_sources)
+            actual_cum_tip = _append_tip_sources(actual_cum_tip, actual_sources)
+
+            actual_cum_actual_sources = [
                 f"Week: {actual_past_week_cell}" if actual_past_week_cell else "",
                 f"Budgeted Units: {budget_cell}" if budget_cell else "",
             ]
-        actual_tip = _append_tip_sources(actual_tip, actual_sources)
-        actual_cum_tip = _append_tip_sources(actual_cum_tip, actual_sources)
-        actual_cum_actual_sources = [
-            f"Week: {actual_past_week_cell}" if actual_past_week_cell else "",
-            f"Budgeted Units: {budget_cell}" if budget_cell else "",
-        ]
-        if actual_past_missing:
-            actual_cum_actual_tip = actual_missing_reason_past or "Cumulative actual unavailable: table with Cum Actual Units not found."
-        elif actual_past_week_idx is None:
-            actual_cum_actual_tip = f"Cumulative actual unavailable: week column {week_date.isoformat()} not found (Cum Actual Units)."
-        elif budget in (None, 0):
-            actual_cum_actual_tip = "Cumulative actual unavailable: Budgeted Units missing or 0."
-        elif actual_past_week_val is None:
-            actual_cum_actual_tip = "Cumulative actual unavailable: week cell is empty (Cum Actual Units)."
-        else:
-            actual_cum_actual_val = (actual_past_week_val / budget) * 100.0
-            actual_cum_actual_display = f"{actual_cum_actual_val:.2f}%"
-        actual_cum_actual_tip = _append_tip_sources(actual_cum_actual_tip, actual_cum_actual_sources)
-
-        if actual_past_week_val is not None:
-            prev_actual_val_past = actual_past_week_val
-        # Only advance future baseline when we're in future weeks; otherwise current-week Remaining
-        # would reduce the next week's delta.
-        if use_future and actual_future_week_val is not None:
-            prev_actual_val_future = actual_future_week_val
-
-        if week_date == target_week and actual_display == "?":
-            current_source = "Cum Remaining Early Units" if use_future else "Cum Actual Units"
-            detail = actual_tip or "Actual unavailable for current week."
-            warn = f"Actual current week unavailable ({current_source}). {detail}"
-            if warn not in info["errors"]:
-                info["errors"].append(warn)
-
-        series.append(
-            {
-                "week": week_label,
-                "week_date": week_date,
-                "week_label": week_date.strftime("%d-%b"),
-                "planned": planned_val,
-                "planned_display": planned_display,
-                "planned_tip": planned_tip,
-                "planned_cum": planned_cum_val,
-                "planned_cum_display": planned_cum_display,
-                "planned_cum_tip": planned_cum_tip,
-                "actual": actual_val,
-                "actual_display": actual_display,
-                "actual_tip": actual_tip,
-                "actual_cum": actual_cum_val,
-                "actual_cum_display": actual_cum_display,
-                "actual_cum_tip": actual_cum_tip,
-                "actual_cum_actual": actual_cum_actual_val,
-                "actual_cum_actual_display": actual_cum_actual_display,
-                "actual_cum_actual_tip": actual_cum_actual_tip,
-                "actual_cum_units": actual_past_week_val if not use_future else None,
-                "actual_week_cell": actual_past_week_cell if not use_future else None,
-                "budgeted_units": budget,
-                "budgeted_units_cell": budget_cell,
-                "forecast_cum_units": actual_future_week_val if use_future else None,
-                "forecast_week_cell": actual_future_week_cell if use_future else None,
-            }
-        )
+            if actual_past_missing:
+                actual_cum_actual_tip = past_reason
+            elif actual_past_week_idx is None:
+                actual_cum_actual_tip = f"Cumulative actual unavailable: week column {week_date.isoformat()} not found (Cum Actual Units)."
+            elif budget in (None, 0):
+                actual_cum_actual_tip = "Cumulative actual unavailable: Budgeted Units missing or 0."
+            elif not self.has_actual_cum_actual[i, k]:
+                actual_cum_actual_tip = "Cumulative actual unavailable: week cell is empty (Cum Actual Units)."
+            else:
+                actual_cum_actual_val = _cell(self.actual_cum_actual_pct, self.has_actual_cum_actual, k)
+                actual_cum_actual_display = f"{actual_cum_actual_val:.2f}%"
+                actual_cum_actual_tip = "Cumulative Actual % = Units (week) / Budgeted Units"
+            actual_cum_actual_tip = _append_tip_sources(actual_cum_actual_tip, actual_cum_actual_sources)
+
+            if week_date == target_week and actual_display == "?":
+                current_source = future.field if use_future else past.field
+                detail = actual_tip or "Actual unavailable for current week."
+                warn = f"Actual current week unavailable ({current_source}). {detail}"
+                if warn not in info["errors"]:
+                    info["errors"].append(warn)
+
+            series.append(
+                {
+                    "week": week_label,
+                    "week_date": week_date,
+                    "week_label": week_date.strftime("%d-%b"),
+                    "planned": planned_val,
+                    "planned_display": planned_display,
+                    "planned_tip": planned_tip,
+                    "planned_cum": planned_cum_val,
+                    "planned_cum_display": planned_cum_display,
+                    "planned_cum_tip": planned_cum_tip,
+                    "actual": actual_val,
+                    "actual_display": actual_display,
+                    "actual_tip": actual_tip,
+                    "actual_cum": actual_cum_val,
+                    "actual_cum_display": actual_cum_display,
+                    "actual_cum_tip": actual_cum_tip,
+                    "actual_cum_actual": actual_cum_actual_val,
+                    "actual_cum_actual_display": actual_cum_actual_display,
+                    "actual_cum_actual_tip": actual_cum_actual_tip,
+                    "actual_cum_units": actual_past_week_val if not use_future else None,
+                    "actual_week_cell": actual_past_week_cell if not use_future else None,
+                    "budgeted_units": budget,
+                    "budgeted_units_cell": budget_cell,
+                    "forecast_cum_units": actual_future_week_val if use_future else None,
+                    "forecast_week_cell": actual_future_week_cell if use_future else None,
+                }
+            )
+
+        return series, info
+
+@traced("weekly_matrix")
+def build_weekly_progress_matrix(
+    input_xlsx: str | None,
+    today: date | None = None,
+    column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
+) -> WeeklyProgressMatrix:
+    """All-activities weekly progress, memoized per workbook, reporting week and mapping."""
+    session = _session_for(input_xlsx, session)
+    target_week = _week_start(today or date.today())
+    return session.derived(
+        ("weekly_progress_matrix", target_week, _mapping_key(column_mapping)),
+        lambda: WeeklyProgressMatrix(session, target_week, column_mapping=column_mapping),
+    )
 
-    return series, info
+def build_weekly_progress(
+    input_xlsx: str | None,
+    activity_id: str,
+    today: date | None = None,
+    column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Weekly planned progress per activity:
+      Planned % = (week_value - previous_week_value) / Budgeted Units * 100
+
+    Slices the all-activities WeeklyProgressMatrix, so switching activities
+    does not rescan the assignments tables.
+    """
+    matrix = build_weekly_progress_matrix(
+        input_xlsx, today=today, column_mapping=column_mapping, session=session
+    )
+    return matrix.series(activity_id)
+
+def _header_positions(headers: list[Any]) -> Dict[str, int]:
+    """Normalized header -> index of its first occurrence."""
+    positions: Dict[str, int] = {}
+    for idx, h in enumerate(headers):
+        positions.setdefault(_norm_header(h), idx)
+    return positions
 
 def _find_header_idx_norm(headers: list[Any], candidates: list[str]) -> int | None:
-    norm_headers = [_norm_header(h) for h in headers]
+    positions = _header_positions(headers)
     for cand in candidates:
-        cand_norm = _norm_header(cand)
-        for idx, h in enumerate(norm_headers):
-            if h == cand_norm:
-                return idx
+        idx = positions.get(_norm_header(cand))
+        if idx is not None:
+            return idx
     return None
 
+# str() of a number, bool, date or duration normalizes to these tokens only.
+_NON_TEXT_NORM_RE = re.compile(r"(?:(?:\d+e?|e|nan|inf|true|false|days?)(?: |$))*")
+
+def _preview_header_rows(ws: Any, masks: _ScanMasks, id_norms: set[str]):
+    """Rows (1-based, ascending, lazily) where a cell of the row's non-blank span normalizes into ``id_norms``.
+
+    When no non-text cell can normalize into ``id_norms`` (the usual case:
+    Activity ID variants are words), only text cells are looked at.
+    """
+    max_r, max_c = ws.max_row, ws.max_column
+    if not any(_NON_TEXT_NORM_RE.fullmatch(n) for n in id_norms):
+        rows_idx, cols_idx = np.nonzero(masks.text[:max_r, :max_c])
+        hits: Dict[Any, bool] = {}
+        last = -1
+        for r, c in zip(rows_idx.tolist(), cols_idx.tolist()):
+            if r == last:
+                continue
+            v = ws.cell(row=r + 1, column=c + 1).value
+            hit = hits.get(v)
+            if hit is None:
+                hit = hits[v] = _norm_header(v) in id_norms
+            if hit:
+                last = r
+                yield r + 1
+        return
+    for r, row in enumerate(ws.iter_rows(min_row=1, max_row=max_r, min_col=1, max_col=max_c, values_only=True), 1):
+        nz = [i for i, v in enumerate(row) if v not in (None, "", " ")]
+        if nz and any(_norm_header(v) in id_norms for v in row[nz[0] : nz[-1] + 1]):
+            yield r
+
+@traced("preview_rows")
 def build_preview_rows(
-    input_xlsx: str,
+    input_xlsx: str | None,
     table_type: str = "activity_summary",
     prefer_first_table: bool = False,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
 ) -> List[Dict[str, Any]]:
-    wb = _load_workbook_fast(input_xlsx)
-    tables = [t for t in detect_expected_tables_in_workbook(wb) if t["type"] == table_type]
+    session = _session_for(input_xlsx, session)
+    wb = session.wb
+    tables = [t for t in session.catalog() if t["type"] == table_type]
     rows: List[Dict[str, Any]] = []
     mapping = (column_mapping or {}).get(table_type, {})
     field_variants = _table_field_variants(table_type)
@@ -1662,17 +3194,24 @@ def build_preview_rows(
         return _find_header_idx_norm(headers, variants)
 
     if prefer_first_table:
+        # First block (any sheet, top to bottom) with an Activity ID header and data.
+        mapped_id = mapping.get("Activity ID")
+        id_candidates = [mapped_id] if mapped_id else field_variants.get("Activity ID", ["Activity ID"])
+        id_norms = {_norm_header(c) for c in id_candidates}
         for ws in wb.worksheets:
             max_r, max_c = ws.max_row, ws.max_column
-            for r in range(1, max_r + 1):
-                headers = [ws.cell(r, c).value for c in range(1, max_c + 1)]
+            if max_r <= 0 or max_c <= 0:
+                continue
+            masks = _sheet_scan_masks(ws)
+            for r in _preview_header_rows(ws, masks, id_norms):
+                headers = list(next(ws.iter_rows(min_row=r, max_row=r, min_col=1, max_col=max_c, values_only=True)))
                 if not any(headers):
                     continue
                 nz = [i + 1 for i, v in enumerate(headers) if v not in (None, "", " ")]
                 if not nz:
                     continue
                 c1, c2 = min(nz), max(nz)
-                header = [ws.cell(r, c).value for c in range(c1, c2 + 1)]
+                header = headers[c1 - 1 : c2]
                 id_idx = _idx(header, "Activity ID")
                 if id_idx is None:
                     continue
@@ -1684,44 +3223,54 @@ def build_preview_rows(
                 variance_idx = _idx(header, "Variance - BL Project Finish Date")
                 budget_idx = _idx(header, "Budgeted Labor Units")
 
-                r2 = r + 1
-                while r2 <= max_r:
-                    row_vals = [ws.cell(r2, c).value for c in range(c1, c2 + 1)]
-                    if all(v in (None, "", " ") for v in row_vals):
-                        break
-                    r2 += 1
+                r2 = _block_end(masks, r, c1, c2, max_r)
+                block_range = f"R{r}C{c1}:R{r2-1}C{c2}"
+
+                def _col(idx: int | None) -> list:
+                    if idx is None:
+                        return [None] * (r2 - r - 1)
+                    col = c1 + idx
+                    return [v for (v,) in ws.iter_rows(min_row=r + 1, max_row=r2 - 1, min_col=col, max_col=col, values_only=True)]
+
+                ids = _col(id_idx)
+                names = _col(name_idx)
+                statuses = _col(status_idx)
+                units = _col(units_idx)
+                bl_finishes = _col(bl_finish_idx)
+                finishes = _col(finish_idx)
+                variances = _col(variance_idx)
+                budgets = _col(budget_idx)
 
                 rows = []
-                sheet_ref = _sheet_ref(ws.title)
-                for rr in range(r + 1, r2):
-                    id_val = ws.cell(rr, c1 + id_idx).value
+                for k, id_val in enumerate(ids):
                     if id_val is None or str(id_val).strip() == "":
                         continue
+                    rr = r + 1 + k
                     raw_id = str(id_val)
                     activity_id = raw_id.strip()
-                    name_val = ws.cell(rr, c1 + name_idx).value if name_idx is not None else None
+                    name_val = names[k]
                     name_text = str(name_val).strip() if name_val is not None else ""
                     display_label = f"{activity_id} - {name_text}".strip(" -")
                     rows.append(
                         {
                             "sheet": ws.title,
-                            "range": f"R{r}C{c1}:R{r2-1}C{c2}",
+                            "range": block_range,
                             "raw": raw_id,
                             "label": name_text if name_text else activity_id,
                             "display_label": display_label,
                             "indent": _lead_spaces(raw_id),
                             "activity_name": name_text,
                             "activity_id": activity_id,
-                            "activity_status": ws.cell(rr, c1 + status_idx).value if status_idx is not None else None,
-                            "units_complete": ws.cell(rr, c1 + units_idx).value if units_idx is not None else None,
-                            "bl_project_finish": ws.cell(rr, c1 + bl_finish_idx).value if bl_finish_idx is not None else None,
-                            "finish": ws.cell(rr, c1 + finish_idx).value if finish_idx is not None else None,
-                            "variance_days": ws.cell(rr, c1 + variance_idx).value if variance_idx is not None else None,
-                            "budgeted_units": ws.cell(rr, c1 + budget_idx).value if budget_idx is not None else None,
-                            "units_complete_cell": f"{sheet_ref}!{_col_letter(c1 + units_idx)}{rr}" if units_idx is not None else None,
-                            "bl_project_finish_cell": f"{sheet_ref}!{_col_letter(c1 + bl_finish_idx)}{rr}" if bl_finish_idx is not None else None,
-                            "finish_cell": f"{sheet_ref}!{_col_letter(c1 + finish_idx)}{rr}" if finish_idx is not None else None,
-                            "variance_days_cell": f"{sheet_ref}!{_col_letter(c1 + variance_idx)}{rr}" if variance_idx is not None else None,
+                            "activity_status": statuses[k],
+                            "units_complete": units[k],
+                            "bl_project_finish": bl_finishes[k],
+                            "finish": finishes[k],
+                            "variance_days": variances[k],
+                            "budgeted_units": budgets[k],
+                            "units_complete_cell": CellRef(ws.title, rr, c1 + units_idx) if units_idx is not None else None,
+                            "bl_project_finish_cell": CellRef(ws.title, rr, c1 + bl_finish_idx) if bl_finish_idx is not None else None,
+                            "finish_cell": CellRef(ws.title, rr, c1 + finish_idx) if finish_idx is not None else None,
+                            "variance_days_cell": CellRef(ws.title, rr, c1 + variance_idx) if variance_idx is not None else None,
                         }
                     )
 
@@ -1763,7 +3312,7 @@ def build_preview_rows(
     if id_idx is None:
         return []
 
-    sheet_ref = _sheet_ref(table["sheet"])
+    sheet = table["sheet"]
     excel_row = r1 + 1
     for row in rows_iter:
         val = row[id_idx] if id_idx is not None else None
@@ -1796,10 +3345,10 @@ def build_preview_rows(
                 "variance_days": variance_val,
                 "bl_project_finish": bl_finish_val,
                 "finish": finish_val,
-                "units_complete_cell": f"{sheet_ref}!{_col_letter(c1 + units_idx)}{excel_row}" if units_idx is not None else None,
-                "variance_days_cell": f"{sheet_ref}!{_col_letter(c1 + variance_idx)}{excel_row}" if variance_idx is not None else None,
-                "bl_project_finish_cell": f"{sheet_ref}!{_col_letter(c1 + bl_finish_idx)}{excel_row}" if bl_finish_idx is not None else None,
-                "finish_cell": f"{sheet_ref}!{_col_letter(c1 + finish_idx)}{excel_row}" if finish_idx is not None else None,
+                "units_complete_cell": CellRef(sheet, excel_row, c1 + units_idx) if units_idx is not None else None,
+                "variance_days_cell": CellRef(sheet, excel_row, c1 + variance_idx) if variance_idx is not None else None,
+                "bl_project_finish_cell": CellRef(sheet, excel_row, c1 + bl_finish_idx) if bl_finish_idx is not None else None,
+                "finish_cell": CellRef(sheet, excel_row, c1 + finish_idx) if finish_idx is not None else None,
             }
         )
         excel_row += 1
@@ -1814,26 +3363,25 @@ def build_preview_rows(
     return rows
 
 def _match_column(columns: list[Any], candidates: list[str]) -> Any | None:
-    for cand in candidates:
-        cand_norm = _norm_header(cand)
-        for col in columns:
-            if _norm_header(col) == cand_norm:
-                return col
-    return None
+    idx = _find_header_idx_norm(columns, candidates)
+    return None if idx is None else columns[idx]
 
 def _build_activity_name_map(
     input_xlsx: str | None = None,
     column_mapping: dict[str, dict[str, str]] | None = None,
     wb: Any | None = None,
+    session: WorkbookSession | None = None,
 ) -> Dict[str, str]:
     if wb is None:
-        if not input_xlsx:
+        if not input_xlsx and session is None:
             raise ValueError("input_xlsx is required when wb is not provided")
-        wb = _load_workbook_fast(input_xlsx)
+        session = _session_for(input_xlsx, session)
+        wb = session.wb
     table = _load_detected_table_wb(
         wb,
         "activity_summary",
         column_mapping=column_mapping,
+        session=session,
     )
     if not table:
         return {}
@@ -1893,6 +3441,618 @@ def pick_label_col(df: pd.DataFrame) -> str:
             best_score, best = score, c
     return best or df.columns[0]
 
+def _column_values(df: pd.DataFrame, col: str | None) -> list:
+    if col is None or col not in df.columns:
+        return [None] * len(df)
+    return df[col].tolist()
+
+# str() of these is never blank.
+_NEVER_BLANK_TYPES = (int, float, datetime, date)
+
+def _is_blank_cell(v: Any) -> bool:
+    if v is None:
+        return True
+    if isinstance(v, str):
+        return not v.strip()
+    if isinstance(v, _NEVER_BLANK_TYPES):
+        return False
+    return str(v).strip() == ""
+
+def _map_unique(values: list, fn: Callable[[Any], Any]) -> list:
+    """fn over a column, evaluated once per distinct (type, value) of non-float cells."""
+    cache: Dict[Any, Any] = {}
+    out = []
+    for v in values:
+        if type(v) is float:
+            # -0.0 == 0.0 (and NaN != NaN): not worth a cache entry.
+            out.append(fn(v))
+            continue
+        try:
+            key = (type(v), v)
+            res = cache[key]
+        except KeyError:
+            res = cache[key] = fn(v)
+        except TypeError:
+            res = fn(v)
+        out.append(res)
+    return out
+
+def _earned_floats(values: np.ndarray) -> list:
+    """_earned_value over finite floats: tidy_num(parse_percent_float(v)) without the per-cell calls."""
+    pct = np.where((values >= -1.0) & (values <= 1.0), values * 100.0, values)
+    rounded = np.round(pct)
+    integral = (np.abs(pct - rounded) < 1e-9).tolist()
+    return [int(r) if ok else p for ok, r, p in zip(integral, rounded.tolist(), pct.tolist())]
+
+def _days_floats(values: np.ndarray) -> list:
+    """_parse_days over floats (NaN -> None)."""
+    return [None if v != v else v for v in values.tolist()]
+
+# Whole-column versions of the per-cell parsers, used on plain numeric columns.
+_NUMERIC_COLUMN_FNS: Dict[Callable[[Any], Any], Callable[[np.ndarray], list]] = {}
+
+def _map_column(df: pd.DataFrame, col: str | None, fn: Callable[[Any], Any]) -> list:
+    """fn over one frame column (fn(None) per row when the column is missing)."""
+    if col is None or col not in df.columns:
+        return [fn(None)] * len(df)
+    series = df[col]
+    column_fn = _NUMERIC_COLUMN_FNS.get(fn)
+    if column_fn is not None and isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+        values = series.to_numpy(dtype=np.float64)
+        # NaN/inf keep the per-cell path (and its errors).
+        if fn is _parse_days or np.isfinite(values).all():
+            return column_fn(values)
+    if series.dtype.kind == "M":
+        # Dates repeat a lot: map the distinct values, not one Timestamp per row.
+        codes, uniques = pd.factorize(series)
+        mapped = [fn(v) for v in uniques]
+        if (codes < 0).any():
+            mapped.append(fn(pd.NaT))
+        return [mapped[c] for c in codes.tolist()]
+    return _map_unique(series.tolist(), fn)
+
+def _blank_cells(df: pd.DataFrame, col: str | None) -> list:
+    if col is None or col not in df.columns:
+        return [True] * len(df)
+    series = df[col]
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcM":
+        return [False] * len(df)
+    return [_is_blank_cell(v) for v in series.tolist()]
+
+def _cell_ref_column(
+    meta: Dict[str, Any] | None, df: pd.DataFrame, col: str | None, row_idx: np.ndarray
+) -> Tuple[str | None, np.ndarray]:
+    """
+    Cell references of one frame column, unformatted: the A1 column prefix
+    ("'Sheet'!C") and the Excel row of every frame row (0 where it has no cell).
+    """
+    no_cells = np.zeros(len(row_idx), dtype=np.int64)
+    if meta is None or col is None or col not in df.columns:
+        return None, no_cells
+    sheet = meta.get("sheet")
+    row_base = meta.get("data_row_start")
+    col_base = meta.get("data_col_start")
+    if sheet is None or row_base is None or col_base is None:
+        return None, no_cells
+    col_num = col_base + int(df.columns.get_loc(col))
+    if col_num <= 0:
+        return None, no_cells
+    rows = row_base + row_idx
+    return f"{_sheet_ref(sheet)}!{_col_letter(col_num)}", np.where(rows > 0, rows, 0)
+
+def _wbs_source_column(
+    df: pd.DataFrame,
+    primary: str,
+    fallback: str,
+    fn: Callable[[Any], Any],
+    meta: Dict[str, Any] | None,
+    row_idx: np.ndarray,
+) -> Tuple[list, list, list, np.ndarray]:
+    """
+    Per row: fn(value) of ``primary`` (``fallback`` when blank), the column used,
+    and its cell reference as (column prefix, Excel row) (see _cell_ref_column).
+    """
+    values = _map_column(df, primary, fn)
+    cols = [primary] * len(values)
+    prefix, refs = _cell_ref_column(meta, df, primary, row_idx)
+    prefixes = [prefix] * len(values)
+    blank = _blank_cells(df, primary)
+    if any(blank):
+        rows = [i for i, is_blank in enumerate(blank) if is_blank]
+        fallback_raw = _column_values(df, fallback)
+        fallback_values = _map_unique([fallback_raw[i] for i in rows], fn)
+        fallback_prefix, fallback_refs = _cell_ref_column(meta, df, fallback, row_idx)
+        for i, value in zip(rows, fallback_values):
+            values[i] = value
+            cols[i] = fallback
+            prefixes[i] = fallback_prefix
+        refs[rows] = fallback_refs[rows]
+    return values, cols, prefixes, refs
+
+def _earned_value(raw: Any) -> float | int | None:
+    return None if _is_blank_cell(raw) else tidy_num(parse_percent_float(raw))
+
+_NUMERIC_COLUMN_FNS[_earned_value] = _earned_floats
+_NUMERIC_COLUMN_FNS[_parse_days] = _days_floats
+
+def _ref_heads(heads: list, prefixes: list, refs: np.ndarray) -> list:
+    """heads[i] followed by row i's column prefix ("None" when the row has no cell)."""
+    pool: Dict[Tuple[str, str | None], str] = {}
+    out = []
+    for head, prefix, has_cell in zip(heads, prefixes, (refs > 0).tolist()):
+        key = (head, prefix if has_cell else None)
+        text = pool.get(key)
+        if text is None:
+            text = pool[key] = f"{head}{key[1]}"
+        out.append(text)
+    return out
+
+def _cell_tips(tip: str, cols: list, prefixes: list, refs: np.ndarray) -> Tuple[list, np.ndarray, None]:
+    """_append_tip_sources(tip, [f"{col}: {ref}"]) for every row, as a tip column."""
+    heads = {col: f"{tip}\nCells:\n- {col}: " for col in set(cols)}
+    return _ref_heads([heads[col] for col in cols], prefixes, refs), refs, None
+
+def _wbs_metric_columns(
+    df: pd.DataFrame,
+    activity_id_col: str,
+    schedule_lookup: Dict[str, Dict[str, Any]] | None,
+    root_budget: Any,
+    root_budget_cell: str | None,
+    source_meta: Dict[str, Any] | None,
+) -> Dict[str, list]:
+    """
+    Metric columns (one list per key of a node's metrics) of a summary table.
+    Tooltip keys are (heads, rows, extras) columns, rendered on demand as
+    head + Excel row (when non-zero) + extra; rows/extras may be None.
+    """
+    row_idx = df["_row_idx"].to_numpy(dtype=np.int64)
+    planned_text, planned_cols, planned_prefixes, planned_refs = _wbs_source_column(
+        df, "BL Project Finish", "Planned Finish", as_text, source_meta, row_idx
+    )
+    forecast_text, forecast_cols, forecast_prefixes, forecast_refs = _wbs_source_column(
+        df, "Finish", "Forecast Finish", as_text, source_meta, row_idx
+    )
+    earned, earned_cols, earned_prefixes, earned_refs = _wbs_source_column(
+        df, "Units % Complete", "Earned %", _earned_value, source_meta, row_idx
+    )
+    gliss, gliss_cols, gliss_prefixes, gliss_refs = _wbs_source_column(
+        df, "Variance - BL Project Finish Date", "Glissement", _parse_days, source_meta, row_idx
+    )
+    activity_ids = [str(v or "").strip() for v in _column_values(df, activity_id_col)]
+    root_source = f"\n- Root Budgeted Units: {root_budget_cell}" if root_budget_cell else ""
+    root_ok = root_budget not in (None, 0)
+    ecart_head = f"{TOOLTIPS['variance']}\nSources:\n- Earned: "
+    impact_tip = TOOLTIPS["impact"]
+
+    schedule: list = []
+    schedule_display: list = []
+    ecart: list = []
+    ecart_display: list = []
+    ecart_extra: list = []
+    impact: list = []
+    impact_display: list = []
+    impact_head: list = []
+    impact_tail: list = []
+    impact_sourced = f"{impact_tip}\nSources:"
+    no_entry: Dict[str, Any] = {}
+    for i, activity_id in enumerate(activity_ids):
+        entry = no_entry
+        if schedule_lookup is not None and activity_id and activity_id in schedule_lookup:
+            entry = schedule_lookup[activity_id]
+        schedule_val = entry.get("value")
+        activity_budget = entry.get("budgeted_units")
+        schedule_week_cell = entry.get("week_cell")
+        budget_cell = entry.get("budget_cell")
+
+        earned_val = earned[i]
+        ecart_val = None
+        ecart_text = "?"
+        if isinstance(earned_val, (int, float)) and isinstance(schedule_val, (int, float)):
+            ecart_val = earned_val - schedule_val
+            ecart_text = f"{ecart_val:+.2f}%"
+        impact_val = None
+        impact_text = "?"
+        if ecart_val is not None and root_ok and activity_budget not in (None, 0):
+            impact_val = (activity_budget / root_budget) * ecart_val
+            impact_text = f"{impact_val:+.2f}%"
+        budget_source = f"\n- Budgeted Units: {budget_cell}" if budget_cell else ""
+        impact_sources = budget_source + root_source
+        schedule.append(schedule_val)
+        schedule_display.append(entry.get("display", "?"))
+        ecart.append(ecart_val)
+        ecart_display.append(ecart_text)
+        ecart_extra.append(
+            (f"\n- Schedule: {schedule_week_cell}" if schedule_week_cell else "") + budget_source
+        )
+        impact.append(impact_val)
+        impact_display.append(impact_text)
+        impact_head.append(impact_sourced if impact_sources else impact_tip)
+        impact_tail.append(impact_sources)
+
+    return {
+        "planned_finish": planned_text,
+        "planned_display": [text or "?" for text in planned_text],
+        "planned_tip": _cell_tips(TOOLTIPS["planned_finish"], planned_cols, planned_prefixes, planned_refs),
+        "forecast_finish": forecast_text,
+        "forecast_display": [text or "?" for text in forecast_text],
+        "forecast_tip": _cell_tips(TOOLTIPS["forecast_finish"], forecast_cols, forecast_prefixes, forecast_refs),
+        "schedule": schedule,
+        "schedule_display": schedule_display,
+        "schedule_tip": ([TOOLTIPS["schedule"]] * len(activity_ids), None, None),
+        "earned": earned,
+        "earned_display": ["?" if v is None else f"{v:.2f}%" for v in earned],
+        "earned_tip": _cell_tips(TOOLTIPS["earned"], earned_cols, earned_prefixes, earned_refs),
+        "ecart": ecart,
+        "ecart_display": ecart_display,
+        "ecart_tip": (
+            _ref_heads([ecart_head] * len(activity_ids), earned_prefixes, earned_refs),
+            earned_refs,
+            ecart_extra,
+        ),
+        "impact": impact,
+        "impact_display": impact_display,
+        "impact_tip": (impact_head, None, impact_tail),
+        "glissement": gliss,
+        "glissement_display": ["?" if v is None else f"{int(v)}d" for v in gliss],
+        "glissement_tip": _cell_tips(TOOLTIPS["glissement"], gliss_cols, gliss_prefixes, gliss_refs),
+    }
+
+# ---------- Compact WBS tree ----------
+# A 10k-row summary used to become 10k nested dicts of 21 metrics each (with the
+# tooltip text repeated per node), held in st.session_state for every session.
+# The tree is now stored column-wise and handed out as read-only dict views.
+WBS_METRIC_KEYS = (
+    "planned_finish", "planned_display", "planned_tip",
+    "forecast_finish", "forecast_display", "forecast_tip",
+    "schedule", "schedule_display", "schedule_tip",
+    "earned", "earned_display", "earned_tip",
+    "ecart", "ecart_display", "ecart_tip",
+    "impact", "impact_display", "impact_tip",
+    "glissement", "glissement_display", "glissement_tip",
+)
+_WBS_NODE_KEYS = ("label", "level", "activity_id", "metrics", "children")
+
+# Metric storage kinds
+_COL_OBJECT = 0   # plain list (values of unexpected types)
+_COL_NUMBER = 1   # float64 values + kind codes (0 None, 1 float, 2 int)
+_COL_TEXT = 2     # int32 codes into the tree's string pool (-1 None)
+_COL_TIP = 3      # pooled tooltip head + Excel row of its cell + per-node extra text
+
+_MAX_EXACT_INT = 2 ** 53
+
+class CompactWbsTree:
+    """
+    WBS tree stored as parallel arrays (node i: parent[i], level[i], labels[i],
+    activity_ids[i], one packed column per metric). Nodes are in row order, so a
+    node's children are the later nodes whose parent is that node, in order.
+    Texts and tooltip heads are interned in one string pool.
+    """
+
+    def __init__(
+        self,
+        parent: List[int],
+        level: List[int],
+        labels: List[str],
+        activity_ids: List[str],
+        metric_columns: Dict[str, Any],
+        rows: List[int],
+    ) -> None:
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.level = np.asarray(level, dtype=np.int16)
+        self.labels = list(labels)
+        self.activity_ids = list(activity_ids)
+        order = np.argsort(self.parent, kind="stable")
+        counts = np.bincount(self.parent[self.parent >= 0], minlength=len(self.parent))
+        self._child_ptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+        self._child_idx = order[int((self.parent < 0).sum()):].astype(np.int32)
+        self.strings: List[str] = []
+        self._pool: Dict[str, int] = {}
+
+        def pick(column: list) -> list:
+            if len(rows) == len(column):
+                return column
+            return [column[r] for r in rows]
+
+        self._metrics: Dict[str, Tuple[int, Any]] = {}
+        for key in WBS_METRIC_KEYS:
+            column = metric_columns[key]
+            if key.endswith("_tip"):
+                heads, refs, extras = column
+                if refs is not None:
+                    refs = np.asarray(refs, dtype=np.int32)[np.asarray(rows, dtype=np.int64)]
+                    if not refs.any():
+                        refs = None
+                if extras is not None:
+                    extras = pick(extras)
+                    if all(extra == "" for extra in extras):
+                        extras = None
+                self._metrics[key] = (_COL_TIP, (self._codes(pick(heads)), refs, extras))
+                continue
+            values = pick(column)
+            if key in ("planned_finish", "forecast_finish") or key.endswith("_display"):
+                packed = self._pack_text(values)
+            else:
+                packed = self._pack_numbers(values)
+            self._metrics[key] = packed or (_COL_OBJECT, values)
+        del self._pool
+
+    def _codes(self, texts: list) -> np.ndarray:
+        pool = self._pool
+        for text in set(texts):
+            if text is not None and text not in pool:
+                pool[text] = len(self.strings)
+                self.strings.append(text)
+        pool[None] = -1
+        try:
+            return np.fromiter((pool[t] for t in texts), dtype=np.int32, count=len(texts))
+        finally:
+            del pool[None]
+
+    def _pack_text(self, values: list):
+        if not set(map(type, values)) <= {str, type(None)}:
+            return None
+        return _COL_TEXT, self._codes(values)
+
+    @staticmethod
+    def _pack_numbers(values: list):
+        types = set(map(type, values))
+        if not types <= {float, int, type(None)}:
+            return None
+        if int in types and any(
+            type(v) is int and not -_MAX_EXACT_INT <= v <= _MAX_EXACT_INT for v in values
+        ):
+            return None
+        kind_of = {type(None): 0, float: 1, int: 2}
+        kinds = np.fromiter((kind_of[type(v)] for v in values), dtype=np.uint8, count=len(values))
+        data = np.fromiter((0.0 if v is None else v for v in values), dtype=np.float64, count=len(values))
+        return _COL_NUMBER, (data, kinds)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def metric(self, i: int, key: str) -> Any:
+        kind, data = self._metrics[key]
+        if kind == _COL_NUMBER:
+            values, kinds = data
+            k = kinds[i]
+            if k == 0:
+                return None
+            return float(values[i]) if k == 1 else int(values[i])
+        if kind == _COL_TEXT:
+            code = data[i]
+            return None if code < 0 else self.strings[code]
+        if kind == _COL_TIP:
+            heads, refs, extras = data
+            tip = self.strings[heads[i]]
+            if refs is not None and refs[i]:
+                tip = f"{tip}{refs[i]}"
+            if extras is not None:
+                tip = f"{tip}{extras[i]}"
+            return tip
+        return data[i]
+
+    def numeric(self, key: str) -> np.ndarray:
+        """One numeric metric for every node as float64 (NaN where None)."""
+        kind, data = self._metrics[key]
+        if kind == _COL_NUMBER:
+            values, kinds = data
+            return np.where(kinds == 0, np.nan, values)
+        return np.array([np.nan if v is None else float(v) for v in data], dtype=np.float64)
+
+    def children_of(self, i: int) -> np.ndarray:
+        return self._child_idx[self._child_ptr[i] : self._child_ptr[i + 1]]
+
+    def node(self, i: int) -> "WbsNodeView":
+        return WbsNodeView(self, i)
+
+    def root(self) -> "WbsNodeView":
+        return WbsNodeView(self, 0)
+
+class WbsMetricsView(Mapping):
+    """Read-only dict view of one node's metrics."""
+
+    __slots__ = ("_tree", "_i")
+
+    def __init__(self, tree: CompactWbsTree, i: int) -> None:
+        self._tree = tree
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._tree._metrics:
+            raise KeyError(key)
+        return self._tree.metric(self._i, key)
+
+    def __iter__(self):
+        return iter(WBS_METRIC_KEYS)
+
+    def __len__(self) -> int:
+        return len(WBS_METRIC_KEYS)
+
+    def __reduce__(self):
+        return (WbsMetricsView, (self._tree, self._i))
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self._tree.metric(self._i, key) for key in WBS_METRIC_KEYS}
+
+class WbsNodeView(Mapping):
+    """
+    Dict view of one node: label, level, activity_id, metrics, children.
+    Only "label" can be assigned (display labels are applied after extraction).
+    """
+
+    __slots__ = ("_tree", "_i")
+
+    def __init__(self, tree: CompactWbsTree, i: int) -> None:
+        self._tree = tree
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        tree, i = self._tree, self._i
+        if key == "label":
+            return tree.labels[i]
+        if key == "level":
+            return int(tree.level[i])
+        if key == "activity_id":
+            return tree.activity_ids[i]
+        if key == "metrics":
+            return WbsMetricsView(tree, i)
+        if key == "children":
+            return [WbsNodeView(tree, c) for c in tree.children_of(i).tolist()]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key != "label":
+            raise TypeError(f"WBS node field {key!r} is read-only")
+        self._tree.labels[self._i] = value
+
+    def __iter__(self):
+        return iter(_WBS_NODE_KEYS)
+
+    def __len__(self) -> int:
+        return len(_WBS_NODE_KEYS)
+
+    def __reduce__(self):
+        return (WbsNodeView, (self._tree, self._i))
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    @property
+    def tree(self) -> CompactWbsTree:
+        return self._tree
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain nested dicts (the pre-compact tree shape), e.g. for JSON."""
+        tree, i = self._tree, self._i
+        return {
+            "label": tree.labels[i],
+            "level": int(tree.level[i]),
+            "activity_id": tree.activity_ids[i],
+            "metrics": WbsMetricsView(tree, i).to_dict(),
+            "children": [WbsNodeView(tree, c).to_dict() for c in tree.children_of(i).tolist()],
+        }
+
+# ---------- Incremental metrics ----------
+class _MetricRows:
+    """Metric columns of one to_wbs_tree call plus what they were computed from,
+    so the next upload recomputes only the rows that changed."""
+
+    __slots__ = ("context", "keys", "hashes", "entries", "columns")
+
+    def __init__(self, context: Tuple[Any, ...], keys: list, hashes: np.ndarray, entries: list, columns: Dict[str, Any]):
+        self.context = context
+        self.keys = keys
+        self.hashes = hashes
+        self.entries = entries
+        self.columns = columns
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """One uint64 per row over its values (and their types, for object columns)."""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            types = series.map(lambda v: type(v).__name__)
+            hashes = hashes * np.uint64(31) + pd.util.hash_pandas_object(types, index=False).to_numpy()
+    return hashes
+
+def _splice_metric_columns(
+    old: Dict[str, Any],
+    fresh: Dict[str, Any],
+    from_old: np.ndarray,
+    source: np.ndarray,
+) -> Dict[str, Any]:
+    """Row i of the result is old[source[i]] where from_old[i], else fresh[source[i]]."""
+    picks = list(zip(from_old.tolist(), source.tolist()))
+
+    def gather(old_col: list, fresh_col: list) -> list:
+        return [old_col[j] if keep else fresh_col[j] for keep, j in picks]
+
+    out: Dict[str, Any] = {}
+    for key in WBS_METRIC_KEYS:
+        if not key.endswith("_tip"):
+            out[key] = gather(old[key], fresh[key])
+            continue
+        (old_heads, old_refs, old_extras), (new_heads, new_refs, new_extras) = old[key], fresh[key]
+        refs = None
+        if old_refs is not None or new_refs is not None:
+            old_refs = np.zeros(len(old_heads), dtype=np.int32) if old_refs is None else np.asarray(old_refs)
+            new_refs = np.zeros(len(new_heads), dtype=np.int32) if new_refs is None else np.asarray(new_refs)
+            refs = np.zeros(len(source), dtype=np.int32)
+            refs[from_old] = old_refs[source[from_old]]
+            refs[~from_old] = new_refs[source[~from_old]]
+        extras = None
+        if old_extras is not None or new_extras is not None:
+            extras = gather(
+                [""] * len(old_heads) if old_extras is None else old_extras,
+                [""] * len(new_heads) if new_extras is None else new_extras,
+            )
+        out[key] = (gather(old_heads, new_heads), refs, extras)
+    return out
+
+def _incremental_metric_columns(
+    df: pd.DataFrame,
+    activity_id_col: str,
+    schedule_lookup: Dict[str, Dict[str, Any]] | None,
+    root_budget: Any,
+    root_budget_cell: str | None,
+    source_meta: Dict[str, Any] | None,
+    previous: _MetricRows | None,
+) -> _MetricRows:
+    """_wbs_metric_columns, reusing ``previous`` for the rows that did not change.
+
+    Metrics are per row: a row is recomputed when its values, position or
+    schedule entry changed. Anything table-wide (columns, source cells, root
+    budget) changing recomputes all rows.
+    """
+    context = (
+        tuple(df.columns),
+        activity_id_col,
+        tuple(sorted((source_meta or {}).items())),
+        root_budget,
+        root_budget_cell,
+    )
+    activity_ids = [str(v or "").strip() for v in _column_values(df, activity_id_col)]
+    keys = list(zip(df["_row_idx"].tolist(), activity_ids))
+    entries = [
+        schedule_lookup.get(activity_id) if schedule_lookup is not None and activity_id else None
+        for activity_id in activity_ids
+    ]
+    hashes = _row_hashes(df)
+    if previous is None or previous.context != context:
+        columns = _wbs_metric_columns(df, activity_id_col, schedule_lookup, root_budget, root_budget_cell, source_meta)
+        TRACER.annotate(recomputed=len(df))
+        return _MetricRows(context, keys, hashes, entries, columns)
+
+    old_pos = {key: i for i, key in enumerate(previous.keys)}
+    from_old = np.zeros(len(keys), dtype=bool)
+    source = np.zeros(len(keys), dtype=np.int64)
+    fresh: List[int] = []
+    for i, key in enumerate(keys):
+        j = old_pos.get(key)
+        if j is not None and previous.hashes[j] == hashes[i]:
+            old_entry, entry = previous.entries[j], entries[i]
+            if old_entry is entry or old_entry == entry:
+                from_old[i] = True
+                source[i] = j
+                continue
+        source[i] = len(fresh)
+        fresh.append(i)
+    TRACER.annotate(recomputed=len(fresh))
+    if not fresh and len(keys) == len(previous.keys):
+        columns = previous.columns
+    else:
+        fresh_columns = previous.columns  # rows removed only: nothing is taken from it
+        if fresh:
+            fresh_columns = _wbs_metric_columns(
+                df.iloc[fresh], activity_id_col, schedule_lookup, root_budget, root_budget_cell, source_meta
+            )
+        columns = _splice_metric_columns(previous.columns, fresh_columns, from_old, source)
+    return _MetricRows(context, keys, hashes, entries, columns)
+
 # ---------- WBS builder ----------
 def to_wbs_tree(
     df: pd.DataFrame,
@@ -1901,15 +4061,29 @@ def to_wbs_tree(
     schedule_info: Dict[str, Any] | None = None,
     source_meta: Dict[str, Any] | None = None,
     activity_name_map: Dict[str, str] | None = None,
-) -> Dict:
-    prof_enabled = _wbs_profile_enabled()
-    prof_row_limit = _wbs_profile_rows()
-    prof_skip_after = _wbs_profile_skip_after()
-    prof_start = perf_counter() if prof_enabled else None
-    prof_metrics_ms = 0.0
-    prof_metrics_rows = 0
-    prof_metrics_min = None
-    prof_metrics_max = None
+) -> Mapping[str, Any]:
+    return _build_wbs_tree(
+        df,
+        label_col,
+        schedule_lookup=schedule_lookup,
+        schedule_info=schedule_info,
+        source_meta=source_meta,
+        activity_name_map=activity_name_map,
+    )[0]
+
+@traced("tree")
+def _build_wbs_tree(
+    df: pd.DataFrame,
+    label_col: str,
+    schedule_lookup: Dict[str, Dict[str, Any]] | None = None,
+    schedule_info: Dict[str, Any] | None = None,
+    source_meta: Dict[str, Any] | None = None,
+    activity_name_map: Dict[str, str] | None = None,
+    previous: _MetricRows | None = None,
+) -> Tuple[Mapping[str, Any], _MetricRows]:
+    """to_wbs_tree, plus its metric rows (``previous``: those of the previous upload)."""
+    # Debug aid: WBS_PROFILE_SKIP_AFTER=N stops after N rows (with WBS_PROFILE=1).
+    skip_after = _wbs_profile_skip_after() if _wbs_profile_enabled() else 0
     processed_rows = 0
 
     df = df.copy()
@@ -1942,194 +4116,41 @@ def to_wbs_tree(
         root_budget = root_entry.get("budgeted_units")
         root_budget_cell = root_entry.get("budget_cell")
 
-    def _cell_for(col_name: str | None, row_idx: int | None) -> str | None:
-        if col_name is None or row_idx is None or source_meta is None:
-            return None
-        if col_name not in df.columns:
-            return None
-        col_idx = int(df.columns.get_loc(col_name))
-        return _cell_ref(source_meta, row_idx, col_idx)
-
-    def row_metrics(r: pd.Series, row_idx: int | None) -> dict:
-        # NOTE: ecart/impact -> ENTIER, schedule/earned -> tidy (int si rond)
-        planned_source_col = "BL Project Finish"
-        planned = r.get(planned_source_col)
-        if planned is None or str(planned).strip() == "":
-            planned_source_col = "Planned Finish"
-            planned = r.get(planned_source_col)
-
-        forecast_source_col = "Finish"
-        forecast = r.get(forecast_source_col)
-        if forecast is None or str(forecast).strip() == "":
-            forecast_source_col = "Forecast Finish"
-            forecast = r.get(forecast_source_col)
-
-        earned_source_col = "Units % Complete"
-        earned_raw = r.get(earned_source_col)
-        if earned_raw is None or str(earned_raw).strip() == "":
-            earned_source_col = "Earned %"
-            earned_raw = r.get(earned_source_col)
-
-        schedule_val = None
-        schedule_display = "?"
-        schedule_tip = TOOLTIPS["schedule"]
-        activity_id = str(r.get(activity_id_col) or "").strip()
-        schedule_week_cell = None
-        schedule_budget_cell = None
-        activity_budget_cell = None
-        if schedule_lookup is not None:
-            if activity_id and activity_id in schedule_lookup:
-                entry = schedule_lookup[activity_id]
-                schedule_val = entry.get("value")
-                schedule_display = entry.get("display", "?")
-                schedule_tip = TOOLTIPS["schedule"]
-                activity_budget = entry.get("budgeted_units")
-                schedule_week_cell = entry.get("week_cell")
-                schedule_budget_cell = entry.get("budget_cell")
-                activity_budget_cell = entry.get("budget_cell")
-            else:
-                if schedule_info and schedule_info.get("status") in ("missing_table", "missing_columns", "week_not_found"):
-                    schedule_tip = TOOLTIPS["schedule"]
-                else:
-                    schedule_tip = TOOLTIPS["schedule"]
-                activity_budget = None
-        else:
-            schedule_tip = TOOLTIPS["schedule"]
-            activity_budget = None
-
-        if earned_raw is None or str(earned_raw).strip() == "":
-            earned_val = None
-            earned_display = "?"
-            earned_tip = TOOLTIPS["earned"]
-        else:
-            earned_val = tidy_num(parse_percent_float(earned_raw))
-            earned_display = f"{earned_val:.2f}%"
-            earned_tip = TOOLTIPS["earned"]
-
-        ecart_val = None
-        if isinstance(earned_val, (int, float)) and isinstance(schedule_val, (int, float)):
-            ecart_val = earned_val - schedule_val
-            ecart_display = f"{ecart_val:+.2f}%"
-            ecart_tip = TOOLTIPS["variance"]
-        else:
-            ecart_display = "?"
-            ecart_tip = TOOLTIPS["variance"]
-        impact_val = None
-        if isinstance(ecart_val, (int, float)):
-            if root_budget in (None, 0):
-                impact_display = "?"
-                impact_tip = TOOLTIPS["impact"]
-            elif activity_budget in (None, 0):
-                impact_display = "?"
-                impact_tip = TOOLTIPS["impact"]
-            else:
-                impact_val = (activity_budget / root_budget) * ecart_val
-                impact_display = f"{impact_val:+.2f}%"
-                impact_tip = TOOLTIPS["impact"]
-        else:
-            impact_display = "?"
-            impact_tip = TOOLTIPS["impact"]
-        gliss_source_col = "Variance - BL Project Finish Date"
-        gliss_raw = r.get(gliss_source_col)
-        if gliss_raw is None or str(gliss_raw).strip() == "":
-            gliss_source_col = "Glissement"
-            gliss_raw = r.get(gliss_source_col)
-        gliss_val = _parse_days(gliss_raw)
-        if gliss_val is None:
-            gliss_display = "?"
-            gliss_tip = TOOLTIPS["glissement"]
-        else:
-            gliss_display = f"{int(gliss_val)}d"
-            gliss_tip = TOOLTIPS["glissement"]
-        planned_text = as_text(planned)
-        if planned_text:
-            planned_display = planned_text
-            planned_tip = TOOLTIPS["planned_finish"]
-        else:
-            planned_display = "?"
-            planned_tip = TOOLTIPS["planned_finish"]
-        forecast_text = as_text(forecast)
-        if forecast_text:
-            forecast_display = forecast_text
-            forecast_tip = TOOLTIPS["forecast_finish"]
-        else:
-            forecast_display = "?"
-            forecast_tip = TOOLTIPS["forecast_finish"]
-
-        planned_tip = _append_tip_sources(
-            planned_tip,
-            [f"{planned_source_col}: {_cell_for(planned_source_col, row_idx)}"] if planned_source_col else [],
-        )
-        forecast_tip = _append_tip_sources(
-            forecast_tip,
-            [f"{forecast_source_col}: {_cell_for(forecast_source_col, row_idx)}"] if forecast_source_col else [],
-        )
-        earned_tip = _append_tip_sources(
-            earned_tip,
-            [f"{earned_source_col}: {_cell_for(earned_source_col, row_idx)}"] if earned_source_col else [],
-        )
-        gliss_tip = _append_tip_sources(
-            gliss_tip,
-            [f"{gliss_source_col}: {_cell_for(gliss_source_col, row_idx)}"] if gliss_source_col else [],
-        )
-
-        ecart_tip = _append_tip_sources(
-            ecart_tip,
-            [
-                f"Earned: {_cell_for(earned_source_col, row_idx)}" if earned_source_col else "",
-                f"Schedule: {schedule_week_cell}" if schedule_week_cell else "",
-                f"Budgeted Units: {schedule_budget_cell}" if schedule_budget_cell else "",
-            ],
-            prefix="Sources",
-        )
-        impact_tip = _append_tip_sources(
-            impact_tip,
-            [
-                f"Budgeted Units: {activity_budget_cell}" if activity_budget_cell else "",
-                f"Root Budgeted Units: {root_budget_cell}" if root_budget_cell else "",
-            ],
-            prefix="Sources",
+    with trace_span("metrics", rows=len(df)):
+        metric_rows = _incremental_metric_columns(
+            df,
+            activity_id_col,
+            schedule_lookup,
+            root_budget,
+            root_budget_cell,
+            source_meta,
+            previous,
         )
-        return {
-            "planned_finish": planned_text,
-            "planned_display": planned_display,
-            "planned_tip": planned_tip,
-            "forecast_finish": forecast_text,
-            "forecast_display": forecast_display,
-            "forecast_tip": forecast_tip,
-            "schedule": schedule_val,
-            "schedule_display": schedule_display,
-            "schedule_tip": schedule_tip,
-            "earned": earned_val,
-            "earned_display": earned_display,
-            "earned_tip": earned_tip,
-            "ecart": ecart_val,
-            "ecart_display": ecart_display,
-            "ecart_tip": ecart_tip,
-            "impact": impact_val,
-            "impact_display": impact_display,
-            "impact_tip": impact_tip,
-            "glissement": gliss_val,
-            "glissement_display": gliss_display,
-            "glissement_tip": gliss_tip,
-        }
 
-    root: Dict | None = None
-    stack: List[Dict] = []
-
-    for _, r in df.iterrows():
+    parents: List[int] = []
+    levels: List[int] = []
+    node_labels: List[str] = []
+    node_ids: List[str] = []
+    node_rows: List[int] = []
+    stack: List[int] = []
+
+    labels = df[label_col].tolist()
+    indents = df["_indent"].tolist()
+    raw_ids = _column_values(df, activity_id_col)
+    names = (
+        [str(v or "").strip() for v in _column_values(df, activity_name_col)]
+        if activity_name_col
+        else [""] * len(df)
+    )
+    for i, raw_label in enumerate(labels):
         processed_rows += 1
-        base_label = clean_label(r[label_col])
+        base_label = clean_label(raw_label)
         if not base_label:
             continue
-        lvl0 = int(space2lvl.get(r["_indent"], len(space2lvl)))  # 0-based
+        lvl0 = int(space2lvl.get(indents[i], len(space2lvl)))  # 0-based
         lvl = lvl0 + 1  # 1-based (IMPORTANT pour l'UI)  # fallback = plus profond
-        row_idx = int(r.get("_row_idx")) if "_row_idx" in r else None
-        activity_id = _normalize_activity_id(r.get(activity_id_col))
-        if activity_name_col:
-            activity_name = str(r.get(activity_name_col) or "").strip()
-        else:
-            activity_name = str(r.get("Activity Name") or r.get("ActivityName") or "").strip()
+        activity_id = _normalize_activity_id(raw_ids[i])
+        activity_name = names[i]
         if activity_name_map:
             lookup_id = activity_id
             if not lookup_id:
@@ -2150,92 +4171,126 @@ def to_wbs_tree(
             display_label = activity_id
         else:
             display_label = base_label
-        node = {
-            "label": display_label,
-            "level": lvl,
-            "activity_id": activity_id or base_label,
-            "metrics": None,
-            "children": [],
-        }
-        if prof_enabled and (prof_row_limit <= 0 or prof_metrics_rows < prof_row_limit):
-            t0 = perf_counter()
-            node["metrics"] = row_metrics(r, row_idx)
-            elapsed_ms = (perf_counter() - t0) * 1000.0
-            prof_metrics_ms += elapsed_ms
-            prof_metrics_min = elapsed_ms if prof_metrics_min is None else min(prof_metrics_min, elapsed_ms)
-            prof_metrics_max = elapsed_ms if prof_metrics_max is None else max(prof_metrics_max, elapsed_ms)
-            prof_metrics_rows += 1
-        else:
-            node["metrics"] = row_metrics(r, row_idx)
+        node = len(levels)
+        levels.append(lvl)
+        node_labels.append(display_label)
+        node_ids.append(activity_id or base_label)
+        node_rows.append(i)
 
         if not stack:
-            root = node
+            parents.append(-1)
             stack = [node]
             continue
 
-        while stack and stack[-1]["level"] >= lvl:
+        while stack and levels[stack[-1]] >= lvl:
             stack.pop()
 
         if not stack:
             # nouveau L1 → frère du root
-            if root is None:
-                root = node
-                stack = [node]
-            else:
-                root.setdefault("children", []).append(node)
-                stack = [root, node]
+            parents.append(0)
+            stack = [0, node]
         else:
-            stack[-1]["children"].append(node)
+            parents.append(stack[-1])
             stack.append(node)
-        if prof_enabled and prof_skip_after > 0 and processed_rows >= prof_skip_after:
+        if skip_after > 0 and processed_rows >= skip_after:
             break
 
-    if prof_enabled:
-        total_ms = (perf_counter() - prof_start) * 1000.0 if prof_start else 0.0
-        avg_ms = (prof_metrics_ms / prof_metrics_rows) if prof_metrics_rows else 0.0
-        print(
-            "wbs_profile to_wbs_tree "
-            f"df_rows={len(df)} processed_rows={processed_rows} total_ms={total_ms:.1f} "
-            f"row_metrics_rows={prof_metrics_rows} "
-            f"row_metrics_ms={prof_metrics_ms:.1f} "
-            f"row_metrics_avg_ms={avg_ms:.2f} "
-            f"row_metrics_min_ms={(prof_metrics_min or 0.0):.2f} "
-            f"row_metrics_max_ms={(prof_metrics_max or 0.0):.2f}",
-            flush=True,
-        )
-    return root or {}
+    TRACER.annotate(rows=len(df), processed_rows=processed_rows, nodes=len(levels))
+    if not levels:
+        return {}, metric_rows
+    tree = CompactWbsTree(parents, levels, node_labels, node_ids, metric_rows.columns, node_rows)
+    return tree.root(), metric_rows
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, (WbsNodeView, WbsMetricsView)):
+        return obj.to_dict()
+    return str(obj)
 
 # ---------- Extraction (tous les tableaux) ----------
+@traced("scan_blocks")
+def _scan_sheet_blocks(
+    job: Tuple[Any, Dict[str, Dict[str, Any]] | None, Dict[str, Any] | None, Dict[str, str] | None],
+) -> List[Dict]:
+    """WBS packs of every block of one sheet that has the REQUIRED_COLS (WBS_SCAN_ALL_BLOCKS)."""
+    ws, schedule_lookup, schedule_info, activity_name_map = job
+    TRACER.annotate(sheet=ws.title)
+    results: List[Dict] = []
+    blocks = detect_all_blocks_with_left_extension(ws)
+    for (r1, c1, r2, c2) in blocks:
+        data = list(
+            ws.iter_rows(
+                min_row=r1,
+                max_row=r2,
+                min_col=c1,
+                max_col=c2,
+                values_only=True,
+            )
+        )
+        if len(data) < 2:
+            continue
+
+        df = pd.DataFrame(
+            data[1:],
+            columns=make_unique_columns([str(x).strip() if x is not None else "" for x in data[0]]),
+        )
+        df, top_trim, left_trim, _, _ = trim_empty_border_with_offsets(df)
+        source_meta = {
+            "sheet": ws.title,
+            "range": f"R{r1}C{c1}:R{r2}C{c2}",
+            "data_row_start": r1 + 1 + top_trim,
+            "data_col_start": c1 + left_trim,
+        }
+
+        if not all(col in df.columns for col in REQUIRED_COLS):
+            continue
+
+        label_col = pick_label_col(df)
+        tree = to_wbs_tree(
+            df,
+            label_col,
+            schedule_lookup=schedule_lookup,
+            schedule_info=schedule_info,
+            source_meta=source_meta,
+            activity_name_map=activity_name_map,
+        )
+        if tree:
+            results.append({"sheet": ws.title, "range": source_meta["range"], "wbs": tree})
+    return results
+
+@traced("extract")
 def extract_all_wbs(
-    input_xlsx: str,
+    input_xlsx: str | None,
     schedule_lookup: Dict[str, Dict[str, Any]] | None = None,
     schedule_info: Dict[str, Any] | None = None,
     column_mapping: dict[str, dict[str, str]] | None = None,
+    session: WorkbookSession | None = None,
 ) -> List[Dict]:
-    prof_enabled = _wbs_profile_enabled()
-
-    wb = _load_workbook_fast(input_xlsx)
+    session = _session_for(input_xlsx, session)
+    wb = session.wb
     results: List[Dict] = []
 
     if schedule_lookup is None or schedule_info is None:
         schedule_lookup, schedule_info = build_schedule_lookup(
             input_xlsx=None,
             column_mapping=column_mapping,
-            wb=wb,
+            session=session,
         )
-    activity_name_map = _build_activity_name_map(
-        input_xlsx=None,
-        column_mapping=column_mapping,
-        wb=wb,
+    activity_name_map = session.derived(
+        ("activity_name_map", _mapping_key(column_mapping)),
+        lambda: _build_activity_name_map(
+            column_mapping=column_mapping,
+            wb=wb,
+            session=session,
+        ),
     )
 
-    t0 = perf_counter() if prof_enabled else None
     # --- FORCE same Activity Summary block as Select Activity ---
     preview_rows = build_preview_rows(
-        input_xlsx,
+        None,
         table_type="activity_summary",
         prefer_first_table=True,
         column_mapping=column_mapping,
+        session=session,
     )
 
     summary = None
@@ -2245,7 +4300,7 @@ def extract_all_wbs(
             "sheet": first["sheet"],
             "range": first["range"],
         }
-        summary = _load_table_from_meta(wb, table)
+        summary = _load_table_cached(wb, table, session)
 
     # Fallback (sécurité)
     if summary is None:
@@ -2253,30 +4308,23 @@ def extract_all_wbs(
             wb,
             "activity_summary",
             column_mapping=column_mapping,
+            session=session,
         )
 
-    if prof_enabled and t0 is not None:
-        print(
-            f"wbs_profile _load_detected_table_ms={(perf_counter() - t0) * 1000.0:.1f}",
-            flush=True,
-        )
     if summary is not None:
         df, meta, _ = summary
         label_col = "Activity ID" if "Activity ID" in df.columns else pick_label_col(df)
-        t1 = perf_counter() if prof_enabled else None
-        tree = to_wbs_tree(
+        tree_key = ("tree_rows", meta["sheet"], meta["range"], label_col, _mapping_key(column_mapping))
+        tree, metric_rows = _build_wbs_tree(
             df,
             label_col,
             schedule_lookup=schedule_lookup,
             schedule_info=schedule_info,
             source_meta=meta,
             activity_name_map=activity_name_map,
+            previous=session.reusable(tree_key),
         )
-        if prof_enabled and t1 is not None:
-            print(
-                f"wbs_profile to_wbs_tree_ms={(perf_counter() - t1) * 1000.0:.1f}",
-                flush=True,
-            )
+        session.remember(tree_key, metric_rows)
         if tree:
             results.append({"sheet": meta["sheet"], "range": meta["range"], "wbs": tree})
 
@@ -2288,57 +4336,134 @@ def extract_all_wbs(
     }
     if scan_all_blocks:
         wanted_ws = [ws for ws in wb.worksheets if _is_wanted_sheet(ws.title)]
-        for ws in wanted_ws:
-            blocks = detect_all_blocks_with_left_extension(ws)
-            for (r1, c1, r2, c2) in blocks:
-                data = list(
-                    ws.iter_rows(
-                        min_row=r1,
-                        max_row=r2,
-                        min_col=c1,
-                        max_col=c2,
-                        values_only=True,
-                    )
-                )
-                if len(data) < 2:
-                    continue
+        jobs = [(ws, schedule_lookup, schedule_info, activity_name_map) for ws in wanted_ws]
+        for packs in _parallel_map(_scan_sheet_blocks, jobs, session.workers):
+            results.extend(packs)
 
-                df = pd.DataFrame(
-                    data[1:],
-                    columns=make_unique_columns([str(x).strip() if x is not None else "" for x in data[0]]),
-                )
-                df, top_trim, left_trim, _, _ = trim_empty_border_with_offsets(df)
-                source_meta = {
-                    "sheet": ws.title,
-                    "range": f"R{r1}C{c1}:R{r2}C{c2}",
-                    "data_row_start": r1 + 1 + top_trim,
-                    "data_col_start": c1 + left_trim,
-                }
+    return results
 
-                if not all(col in df.columns for col in REQUIRED_COLS):
-                    continue
+# ---------- Batch extraction (NDJSON) ----------
+def batch_inputs(target: str) -> List[str]:
+    """Workbooks to extract: a file, every .xlsx under a directory, or a glob."""
+    if os.path.isdir(target):
+        paths = [str(p) for p in Path(target).rglob("*.xlsx")]
+    elif glob.has_magic(target):
+        paths = [p for p in glob.glob(target, recursive=True) if os.path.isfile(p)]
+    else:
+        paths = [target]
+    # Skip Excel's "~$" lock files next to open workbooks.
+    return sorted(p for p in paths if not os.path.basename(p).startswith("~$"))
 
-                label_col = pick_label_col(df)
-                tree = to_wbs_tree(
-                    df,
-                    label_col,
-                    schedule_lookup=schedule_lookup,
-                    schedule_info=schedule_info,
-                    source_meta=source_meta,
-                    activity_name_map=activity_name_map,
-                )
-                if tree:
-                    results.append({"sheet": ws.title, "range": source_meta["range"], "wbs": tree})
+def _ndjson_line(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_json_default)
 
-    return results
+def _extract_file_job(path: str) -> Dict[str, Any]:
+    """One file of a batch: its WBS packs as compact NDJSON lines (or the error).
+
+    The session is private to the job (not in the registry), so the parsed
+    workbook is freed as soon as the lines are built. It parses and scans its
+    sheets serially: files, not sheets, are the unit of parallelism here.
+    """
+    t0 = perf_counter()
+    result: Dict[str, Any] = {"file": path, "lines": [], "error": None, "bytes": 0}
+    try:
+        result["bytes"] = os.path.getsize(path)
+        packs = extract_all_wbs(None, session=WorkbookSession(path, workers=1))
+        result["lines"] = [_ndjson_line({"file": path, **pack}) for pack in packs]
+    except Exception as exc:  # one bad export must not stop a nightly batch
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["ms"] = (perf_counter() - t0) * 1000.0
+    return result
+
+def extract_batch(paths: List[str], workers: int = 1):
+    """_extract_file_job results in completion order, extracting ``workers`` files at a time."""
+    for _, result in _imap_unordered(_extract_file_job, paths, max(workers, 1)):
+        yield result
+
+def _run_batch(paths: List[str], out: str, workers: int) -> int:
+    """Stream every table of ``paths`` as NDJSON to ``out`` ("-" = stdout); summary on stderr."""
+    stream = sys.stdout if out == "-" else open(out, "w", encoding="utf-8")
+    t0 = perf_counter()
+    ok = tables = total_bytes = 0
+    empty: List[str] = []
+    failures: List[Tuple[str, str]] = []
+    try:
+        for done, result in enumerate(extract_batch(paths, workers), 1):
+            total_bytes += result["bytes"]
+            if result["error"]:
+                failures.append((result["file"], result["error"]))
+                stream.write(_ndjson_line({"file": result["file"], "error": result["error"]}) + "\n")
+            else:
+                ok += 1
+                tables += len(result["lines"])
+                if not result["lines"]:
+                    empty.append(result["file"])
+                for line in result["lines"]:
+                    stream.write(line + "\n")
+            stream.flush()
+            print(
+                f"[{done}/{len(paths)}] {result['file']}: "
+                + (f"FAILED ({result['error']})" if result["error"] else f"{len(result['lines'])} table(s)")
+                + f" in {result['ms'] / 1000.0:.1f}s",
+                file=sys.stderr,
+            )
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    elapsed = max(perf_counter() - t0, 1e-9)
+    print(
+        f"Files: {len(paths)} ({ok} ok, {len(failures)} failed, {len(empty)} without WBS table)  |  "
+        f"Tables: {tables}  |  {elapsed:.1f}s, {len(paths) / elapsed:.2f} files/s, "
+        f"{total_bytes / (1024 * 1024) / elapsed:.1f} MB/s with {workers} worker(s)",
+        file=sys.stderr,
+    )
+    for path, error in failures:
+        print(f"  FAILED {path}: {error}", file=sys.stderr)
+    return 1 if failures else 0
 
 # ---------- CLI ----------
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Build an array of WBS JSONs from all valid tables in Excel.")
-    p.add_argument("input_xlsx", help="Path to Excel file, e.g., Book1.xlsx")
-    p.add_argument("--out", default="wbs_all.json", help="Output JSON path")
+    p.add_argument(
+        "input_xlsx",
+        help="Path to Excel file, e.g., Book1.xlsx; a directory or glob (quoted) runs a batch",
+    )
+    p.add_argument("--out", help="Output path (default: wbs_all.json; stdout '-' for batches)")
+    p.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="One compact JSON record per table, streamed as each file finishes (implied for batches)",
+    )
+    p.add_argument(
+        "--workers",
+        default="auto",
+        help="Files extracted in parallel in batch mode ('auto' = one per CPU)",
+    )
+    p.add_argument(
+        "--ingest",
+        action="store_true",
+        help="Write the columnar ingest artifact next to each input instead of extracting",
+    )
     args = p.parse_args()
 
+    inputs = batch_inputs(args.input_xlsx)
+    if args.ingest:
+        if not inputs:
+            p.error(f"no .xlsx files match {args.input_xlsx}")
+        for path in inputs:
+            t0 = perf_counter()
+            target = ingest_workbook(path, session=WorkbookSession(path))
+            if target is None:
+                raise SystemExit("pyarrow is required for --ingest")
+            print(f"Ingested: {target}  |  {(perf_counter() - t0) * 1000.0:.0f} ms")
+        raise SystemExit(0)
+    if args.ndjson or os.path.isdir(args.input_xlsx) or glob.has_magic(args.input_xlsx):
+        if not inputs:
+            p.error(f"no .xlsx files match {args.input_xlsx}")
+        workers = (os.cpu_count() or 1) if args.workers == "auto" else max(int(args.workers), 1)
+        raise SystemExit(_run_batch(inputs, args.out or "-", min(workers, len(inputs))))
+
+    out = args.out or "wbs_all.json"
     all_wbs = extract_all_wbs(args.input_xlsx)
-    Path(args.out).write_text(json.dumps(all_wbs, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
-    print(f"Saved: {args.out}  |  Tables matched: {len(all_wbs)}")
+    Path(out).write_text(json.dumps(all_wbs, ensure_ascii=False, indent=2, default=_json_default), encoding="utf-8")
+    print(f"Saved: {out}  |  Tables matched: {len(all_wbs)}")
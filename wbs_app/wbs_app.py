@@ -28,12 +28,7 @@ from projects import (
     store_project_upload,
 )
 from billing_store import access_status, get_account_by_email
-from extract_wbs_json_calamine import (
-    extract_all_wbs,
-    detect_expected_tables,
-    compare_activity_ids,
-    build_preview_rows,
-    build_schedule_lookup,
+from wbs_app.extract_wbs_json_calamine import (
     parse_percent_float,
     as_text,
     get_table_headers,
@@ -42,7 +37,12 @@ from extract_wbs_json_calamine import (
     SUMMARY_OPTIONAL_FIELDS,
     ASSIGN_REQUIRED_FIELDS,
     ASSIGN_OPTIONAL_FIELDS,
+    TRACER,
+    trace_span,
 )
+from perf_panel import render_perf_panel
+from extraction_jobs import FAILED, submit_extraction
+from extraction_panel import render_extraction_progress
 from theme import inject_theme
 
 _icon_path = ROOT / "Chronoplan_ico.png"
@@ -427,8 +427,8 @@ def _maybe_open_mapping_dialog(source_path: str | None) -> None:
     _sync_mapping_for_upload()
     mapping = _init_column_mapping_state()
 
-    summary_headers = get_table_headers(source_path, "activity_summary")
-    assign_headers = get_table_headers(source_path, "resource_assignments")
+    summary_headers = get_table_headers(source_path, "activity_summary", header_probe=True)
+    assign_headers = get_table_headers(source_path, "resource_assignments", header_probe=True)
     summary_missing = _missing_required_fields(
         summary_headers[0] if summary_headers else None,
         "activity_summary",
@@ -1078,6 +1078,7 @@ st.sidebar.page_link("pages/3_S_Curve.py", label="S-Curve")
 st.sidebar.page_link("pages/2_WBS.py", label="WBS")
 st.sidebar.markdown("<hr>", unsafe_allow_html=True)
 
+TRACER.start_request("wbs")
 with st.sidebar:
     if PREVIEW_ENABLED:
         use_test = st.toggle(
@@ -1097,33 +1098,27 @@ with st.sidebar:
         else:
             st.info("Test file not found at artifacts/W_example.xlsx.")
 
+    extraction_job = None
     if source_path:
+        # Extraction runs in the background (extraction_jobs); poll until it is done.
         try:
-            schedule_lookup, schedule_info = build_schedule_lookup(
+            extraction_job = submit_extraction(
                 source_path,
                 column_mapping=st.session_state.get("column_mapping"),
             )
-            st.session_state["_schedule_lookup"] = schedule_lookup
-            st.session_state["_schedule_info"] = schedule_info
-            packs = extract_all_wbs(
-                source_path,
-                schedule_lookup=schedule_lookup,
-                schedule_info=schedule_info,
-                column_mapping=st.session_state.get("column_mapping"),
-            )
-            st.session_state["_packs"] = packs
-            st.session_state["_detected_tables"] = []
-            if not packs:
-                st.session_state["_detected_tables"] = detect_expected_tables(source_path)
-            st.session_state["_table_mismatch"] = None
-            st.session_state["_preview_rows"] = build_preview_rows(
-                source_path,
-                table_type="activity_summary",
-                prefer_first_table=True,
-                column_mapping=st.session_state.get("column_mapping"),
-            )
         except Exception as e:
             st.error(f"Extraction error: {e}")
+        if extraction_job is not None and extraction_job.status == FAILED:
+            st.error(f"Extraction error: {extraction_job.error}")
+        elif extraction_job is not None and not extraction_job.pending:
+            result = extraction_job.result
+            packs = result["packs"]
+            st.session_state["_schedule_lookup"] = result["schedule_lookup"]
+            st.session_state["_schedule_info"] = result["schedule_info"]
+            st.session_state["_packs"] = packs
+            st.session_state["_detected_tables"] = result["detected_tables"]
+            st.session_state["_table_mismatch"] = result["table_mismatch"]
+            st.session_state["_preview_rows"] = result["preview_rows"]
 
     if packs:
         preview_rows = st.session_state.get("_preview_rows", [])
@@ -1134,6 +1129,11 @@ with st.sidebar:
                 fallback_max_depth_key="wbs_max_depth",
             )
 
+if extraction_job is not None and extraction_job.pending:
+    render_extraction_progress(extraction_job.id)
+    TRACER.end_request()
+    st.stop()
+
 packs = st.session_state.get("_packs", [])
 detected_tables = st.session_state.get("_detected_tables", [])
 mismatch = st.session_state.get("_table_mismatch")
@@ -1156,6 +1156,13 @@ if mismatch and (mismatch.get("summary_only") or mismatch.get("assign_only")):
     if mismatch.get("assign_only"):
         sample = ", ".join(mismatch["assign_only"][:10])
         st.markdown(f"- Only in assignments: {sample}")
+    for table in mismatch.get("tables", []):
+        if table["only_in_table"] or table["missing_from_table"]:
+            st.markdown(
+                f"- {table['sheet']} ({table['range']}): {table['unique']} IDs, "
+                f"{table['only_in_table']} not in the other tables, "
+                f"{table['missing_from_table']} missing"
+            )
 if schedule_info and schedule_info.get("status") not in (None, "ok"):
     st.warning(
         "Schedule % may be unavailable. "
@@ -1468,7 +1475,7 @@ st.session_state["_idx_prev"] = wbs_idx
 
 if debug_remount:
     st.sidebar.caption(f"[dbg] anim_seq={st.session_state['_anim_seq']} active_ctx={st.session_state['_active_ctx']} idx_prev={st.session_state['_idx_prev']}")
-with st.container(key="glass_wrap"):
+with trace_span("render"), st.container(key="glass_wrap"):
     with st.container(key=f"anim_wrap__{st.session_state['_anim_seq']%2}"):
         render_all(
             root,
@@ -1479,3 +1486,4 @@ with st.container(key="glass_wrap"):
             truncate_labels=truncate_labels,
             start_depth=start_depth_level,
         )
+render_perf_panel(TRACER.end_request())